@@ -0,0 +1,245 @@
+import argparse
+import json
+import os
+import time
+from datetime import date
+
+import pandas as pd
+
+from .price_provider import (
+    NO_DATA_REASON,
+    PriceDownloadError,
+    YFinanceProvider,
+    backoff_delay,
+    is_transient_failure,
+)
+from .price_store import PriceStore
+from .stock_api import normalize_tickers, fetch_with_store
+
+
+def _load_checkpoint(path: str, params: dict) -> dict:
+    """Load the checkpoint for this run, or start an empty one."""
+    if not os.path.exists(path):
+        return {**params, "shards": {}}
+
+    with open(path) as f:
+        checkpoint = json.load(f)
+
+    for key, value in params.items():
+        if checkpoint.get(key) != value:
+            raise ValueError(
+                f"Checkpoint {path} was written for a different run "
+                f"({key} differs). Use a new checkpoint path or delete it."
+            )
+
+    return checkpoint
+
+
+def _save_checkpoint(path: str, checkpoint: dict):
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+
+    # write-then-rename, so a crash never leaves a half-written checkpoint
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def _refetch(provider, store, shard_report: dict, tickers, start_date, end_date):
+    """
+    Download `tickers` again over the whole range, straight from the
+    provider (the store may already hold their empty answer), save what
+    comes back and update `shard_report` in place.
+    """
+    try:
+        df, report = provider.fetch(tickers, start_date, end_date)
+    except PriceDownloadError as e:
+        shard_report["failed"].update({t: str(e) for t in tickers})
+        return
+
+    df = df.set_index("Date")
+    for t in report["valid"]:
+        store.write(t, df[t], start_date, end_date, provider.price_field)
+        shard_report["failed"].pop(t, None)
+        shard_report["valid"].append(t)
+    shard_report["failed"].update(report["failed"])
+
+
+def ingest_universe(
+    tickers,
+    start_date,
+    end_date,
+    store: PriceStore,
+    checkpoint_path: str,
+    shard_size: int = 100,
+    provider=None,
+    on_shard=None,
+    no_data_attempts: int = 3,
+    retry_sleep_seconds: float = 2.0,
+    max_backoff_seconds: float = 30.0,
+) -> dict:
+    """
+    Load price history for a whole universe into a `PriceStore`, shard by
+    shard, so an interrupted run can be resumed.
+
+    Each shard is fetched through `fetch_with_store` (only the ranges the
+    store is missing are downloaded) and recorded in a JSON checkpoint
+    once every ticker in it either has its full range in the store or
+    failed for a ticker-level reason. Running again with the same
+    arguments and checkpoint skips completed shards; shards hit by a
+    download failure (rate limit, network) are retried.
+
+    A ticker that comes back without any data may be delisted, or may
+    have been rate limited (Yahoo then returns an all-NaN column), so it
+    is downloaded again, with jittered exponential backoff, up to
+    `no_data_attempts` times in all; after that it is recorded as failed.
+
+    Parameters
+    ----------
+    on_shard : callable, optional
+        Called as `on_shard(shard_index, n_shards, shard_report)` after
+        each shard, e.g. for progress logging.
+    no_data_attempts : int
+        Downloads (the first one included) a ticker must come back
+        without data before it is accepted as a permanent failure.
+    retry_sleep_seconds, max_backoff_seconds : float
+        Backoff between those downloads, as in `YFinanceProvider`.
+
+    Returns
+    -------
+    dict
+        {
+          "requested": [...],
+          "valid": [...],
+          "failed": { "TICKER": "reason", ... },
+          "complete": bool   # False when some shards still need a rerun
+        }
+    """
+    if start_date >= end_date:
+        raise ValueError("Start date must be before end date.")
+    if shard_size < 1:
+        raise ValueError("shard_size must be at least 1.")
+    if no_data_attempts < 1:
+        raise ValueError("no_data_attempts must be at least 1.")
+
+    tickers_norm = normalize_tickers(tickers)
+
+    if provider is None:
+        provider = YFinanceProvider()
+
+    params = {
+        "tickers": tickers_norm,
+        "start_date": str(start_date),
+        "end_date": str(end_date),
+        "shard_size": shard_size,
+        "price_field": provider.price_field,
+    }
+    checkpoint = _load_checkpoint(checkpoint_path, params)
+
+    shards = [
+        tickers_norm[i:i + shard_size]
+        for i in range(0, len(tickers_norm), shard_size)
+    ]
+
+    # the store never holds today's (unfinished) bar, so do not wait for it
+    held_end = min(pd.Timestamp(end_date).date(), date.today())
+
+    valid = set()
+    failed = {}
+
+    for i, shard in enumerate(shards):
+        done = checkpoint["shards"].get(str(i))
+
+        if done is None:
+            _, shard_report = fetch_with_store(
+                provider, None, store, shard, start_date, end_date
+            )
+
+            # all-NaN tickers may have been rate limited: try them again
+            for attempt in range(1, no_data_attempts):
+                no_data = [
+                    t for t, reason in shard_report["failed"].items()
+                    if reason == NO_DATA_REASON
+                ]
+                if not no_data:
+                    break
+                time.sleep(backoff_delay(attempt, retry_sleep_seconds, max_backoff_seconds))
+                _refetch(provider, store, shard_report, no_data, start_date, end_date)
+            shard_report["valid"] = [t for t in shard if t in shard_report["valid"]]
+
+            missing = [
+                t for t in shard_report["valid"]
+                if store.missing_segments(t, start_date, held_end, provider.price_field)
+            ]
+            transient = [
+                t for t, reason in shard_report["failed"].items()
+                if is_transient_failure(reason)
+            ]
+
+            done = {"valid": shard_report["valid"], "failed": shard_report["failed"]}
+
+            if not missing and not transient:
+                checkpoint["shards"][str(i)] = done
+                _save_checkpoint(checkpoint_path, checkpoint)
+            else:
+                for t in missing:
+                    done["failed"][t] = "Price download incomplete; rerun to resume."
+
+            if on_shard is not None:
+                on_shard(i, len(shards), done)
+
+        valid.update(done["valid"])
+        failed.update(done["failed"])
+
+    valid = [t for t in tickers_norm if t in valid and t not in failed]
+
+    return {
+        "requested": tickers_norm,
+        "valid": valid,
+        "failed": {t: failed[t] for t in tickers_norm if t in failed},
+        "complete": len(checkpoint["shards"]) == len(shards),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Pre-load a ticker universe into the local price store."
+    )
+    parser.add_argument("tickers_file", help="text file with one ticker per line")
+    parser.add_argument("start_date", help="YYYY-MM-DD")
+    parser.add_argument("end_date", help="YYYY-MM-DD (exclusive)")
+    parser.add_argument("--store", default=".price_cache/prices.sqlite")
+    parser.add_argument("--checkpoint", default=".price_cache/ingest_checkpoint.json")
+    parser.add_argument("--shard-size", type=int, default=100)
+    parser.add_argument("--no-data-attempts", type=int, default=3,
+                        help="downloads a ticker must return no data before it counts as failed")
+    args = parser.parse_args()
+
+    with open(args.tickers_file) as f:
+        tickers = [line.strip() for line in f if line.strip()]
+
+    report = ingest_universe(
+        tickers,
+        args.start_date,
+        args.end_date,
+        store=PriceStore(args.store),
+        checkpoint_path=args.checkpoint,
+        shard_size=args.shard_size,
+        no_data_attempts=args.no_data_attempts,
+        provider=YFinanceProvider(chunk_size=50),
+        on_shard=lambda i, n, r: print(
+            f"shard {i + 1}/{n}: {len(r['valid'])} valid, {len(r['failed'])} failed"
+        ),
+    )
+
+    print(f"valid: {len(report['valid'])}, failed: {len(report['failed'])}")
+    for t, reason in report["failed"].items():
+        print(f"- {t}: {reason}")
+    if not report["complete"]:
+        print("Some shards did not finish; run again to resume.")
+
+
+if __name__ == "__main__":
+    main()
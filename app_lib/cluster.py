@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+from scipy.cluster.hierarchy import linkage, leaves_list, optimal_leaf_ordering
+
+
+# optimal leaf ordering grows as O(n^3): about 0.3 s for 500 assets, 3 s
+# for 1,000 and 25 s for 2,000
+_OPTIMAL_ORDERING_MAX_ASSETS = 500
+
+
+def corr_distance(corr: pd.DataFrame) -> np.ndarray:
+    """
+    Condensed correlation distance d = sqrt((1 - corr) / 2), as used by
+    scipy's `linkage` (n(n-1)/2 values). The upper triangle is copied
+    row by row into the condensed vector and transformed there, so no
+    n x n working array is built.
+
+    Pairs with no correlation (NaN, e.g. too few common dates) are
+    treated as uncorrelated.
+    """
+    values = corr.to_numpy(dtype=np.float64)
+    n = len(values)
+
+    # same layout as scipy's squareform: row i holds the pairs (i, j > i)
+    dist = np.empty(n * (n - 1) // 2)
+    k = 0
+    for i in range(n - 1):
+        dist[k:k + n - 1 - i] = values[i, i + 1:]
+        k += n - 1 - i
+
+    np.nan_to_num(dist, copy=False, nan=0.0)
+    dist = np.subtract(1.0, dist, out=dist)
+    dist /= 2.0
+    np.clip(dist, 0.0, 1.0, out=dist)
+    return np.sqrt(dist, out=dist)
+
+
+def cluster_corr(
+    corr: pd.DataFrame,
+    method: str = "average",
+    optimal_ordering: bool | None = None,
+):
+    """
+    Reorder a correlation matrix so that correlated assets sit together.
+
+    Assets are clustered hierarchically on the correlation distance (see
+    `corr_distance`); with `optimal_ordering` the leaves are then flipped
+    so that neighbouring assets are as close as possible. The clustering
+    itself takes well under a second for 2,000 assets, but the optimal
+    ordering grows as O(n^3), so by default (None) it is only applied up
+    to 500 assets; pass True to force it.
+
+    Returns
+    -------
+    (pd.DataFrame, np.ndarray)
+        The matrix with rows and columns in cluster order, and the scipy
+        linkage matrix (for `scipy.cluster.hierarchy.dendrogram`, with
+        labels in the original order of `corr`).
+    """
+    if len(corr) < 2:
+        # nothing to cluster
+        return corr.copy(), np.empty((0, 4))
+
+    dist = corr_distance(corr)
+    tree = linkage(dist, method=method)
+
+    if optimal_ordering is None:
+        optimal_ordering = len(corr) <= _OPTIMAL_ORDERING_MAX_ASSETS
+    if optimal_ordering:
+        tree = optimal_leaf_ordering(tree, dist)
+
+    order = leaves_list(tree)
+    return corr.iloc[order, order], tree
@@ -0,0 +1,237 @@
+import heapq
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .corr_matrix import _corr_from_moments, _shift_by_mean
+
+
+def _prepare(df: pd.DataFrame, date_col: str = "Date"):
+    """
+    Column names, zero-filled mean-shifted returns and validity mask of a
+    return frame (see `_shift_by_mean`).
+    """
+    columns = [c for c in df.columns if c != date_col]
+    z, mask, _ = _shift_by_mean(df[columns].to_numpy(dtype=np.float64, na_value=np.nan))
+    return columns, z, mask
+
+
+def _tile_corr(z_a, mask_a, z_b, mask_b, min_periods: int = 3, diagonal: bool = False):
+    """
+    Pairwise-complete correlation between two column blocks, and the
+    overlap counts. Same rules as `corr_matrix` (NaN below `min_periods`
+    common rows or with no variance).
+    """
+    count = mask_a.T @ mask_b
+    sums_a = z_a.T @ mask_b            # a_i over rows where b_j is valid
+    sums_b = mask_a.T @ z_b            # b_j over rows where a_i is valid
+    sq_a = (z_a * z_a).T @ mask_b
+    sq_b = mask_a.T @ (z_b * z_b)
+    cross = z_a.T @ z_b
+
+    mean_a = np.divide(sums_a, count, out=np.zeros_like(count), where=count > 0)
+    mean_b = np.divide(sums_b, count, out=np.zeros_like(count), where=count > 0)
+
+    m2_a = sq_a - sums_a * mean_a
+    m2_b = sq_b - sums_b * mean_b
+    comom = cross - sums_a * mean_b
+
+    # a tile on the diagonal pairs a block with itself: m2_b is m2_a.T
+    if diagonal:
+        corr = _corr_from_moments(count, mean_a, m2_a, comom, min_periods)
+    else:
+        corr = _corr_from_moments(count, mean_a, m2_a, comom, min_periods, mean_cols=mean_b, m2_cols=m2_b)
+
+    return corr, count.astype(np.int64)
+
+
+def _tile_task(args):
+    i0, j0, z_a, mask_a, z_b, mask_b, min_periods = args
+    corr, count = _tile_corr(z_a, mask_a, z_b, mask_b, min_periods, diagonal=(i0 == j0))
+    return i0, j0, corr, count
+
+
+def _iter_tiles(z, mask, block_size: int, min_periods: int = 3, max_workers: int | None = None):
+    """
+    Yield `(i0, j0, corr_tile, count_tile)` for every upper-triangle tile
+    (column blocks starting at i0 <= j0).
+
+    With `max_workers`, tiles are computed on a process pool; at most
+    2 * max_workers tiles are in flight, so memory stays bounded by a few
+    tiles on top of the input.
+    """
+    if block_size < 1:
+        raise ValueError("block_size must be at least 1.")
+
+    n = z.shape[1]
+    starts = range(0, n, block_size)
+
+    tasks = (
+        (
+            i0, j0,
+            z[:, i0:i0 + block_size], mask[:, i0:i0 + block_size],
+            z[:, j0:j0 + block_size], mask[:, j0:j0 + block_size],
+            min_periods,
+        )
+        for i0 in starts for j0 in starts if j0 >= i0
+    )
+
+    if max_workers is None:
+        for task in tasks:
+            yield _tile_task(task)
+        return
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        pending = deque()
+        for task in tasks:
+            pending.append(pool.submit(_tile_task, task))
+            if len(pending) >= 2 * max_workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def blocked_corr(
+    df: pd.DataFrame,
+    block_size: int = 512,
+    path: str | None = None,
+    max_workers: int | None = None,
+    min_periods: int = 3,
+    date_col: str = "Date",
+    dtype=np.float64,
+):
+    """
+    Correlation matrix of a very wide return frame, computed tile by tile
+    over column blocks, for universes where `corr_matrix` would not fit
+    in memory.
+
+    Each (block x block) tile of the upper triangle is computed from
+    masked matrix products (pairwise-complete, as in `corr_matrix`) and
+    written, with its mirror, straight into the output. Peak memory is
+    the input plus a few tiles, and with `path` the output is a `.npy`
+    memmap on disk (reload with `np.load(path, mmap_mode="r")`).
+
+    Unlike `corr_matrix` there is no check for 3 rows where every asset
+    is valid (rare in a whole market); pairs with fewer than
+    `min_periods` common rows are NaN.
+
+    Parameters
+    ----------
+    block_size : int
+        Columns per block.
+    path : str, optional
+        Write the (n x n) result into a `.npy` memmap at this path.
+    max_workers : int, optional
+        Compute tiles on a process pool of this size. Mostly useful when
+        NumPy's BLAS is single-threaded; a multi-threaded BLAS already
+        spreads each tile's products over the cores.
+    dtype :
+        Dtype of the stored matrix (np.float32 halves the size).
+
+    Returns
+    -------
+    (np.ndarray, list)
+        The correlation matrix (a `numpy.memmap` with `path`) and the
+        column names in matrix order.
+    """
+    columns, z, mask = _prepare(df, date_col)
+    n = len(columns)
+
+    if path is not None:
+        out = np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=(n, n))
+    else:
+        out = np.empty((n, n), dtype=dtype)
+
+    for i0, j0, corr, _ in _iter_tiles(z, mask, block_size, min_periods, max_workers):
+        rows, cols = corr.shape
+        out[i0:i0 + rows, j0:j0 + cols] = corr
+        out[j0:j0 + cols, i0:i0 + rows] = corr.T
+
+    if isinstance(out, np.memmap):
+        out.flush()
+
+    return out, columns
+
+
+def correlated_pairs(
+    df: pd.DataFrame,
+    k: int | None = None,
+    threshold: float | None = None,
+    absolute: bool = False,
+    block_size: int = 512,
+    max_workers: int | None = None,
+    min_periods: int = 3,
+    date_col: str = "Date",
+) -> pd.DataFrame:
+    """
+    The most correlated pairs of assets, without building the full matrix.
+
+    Streams over the same tiles as `blocked_corr` and keeps only the pairs
+    that qualify: the `k` highest correlations (a bounded heap, so memory
+    is O(k) plus one tile), and/or all pairs at or above `threshold`.
+
+    Parameters
+    ----------
+    k : int, optional
+        Keep the top `k` pairs.
+    threshold : float, optional
+        Keep only pairs with correlation >= `threshold`.
+    absolute : bool
+        Rank and filter by |corr|, so strong negative pairs count too.
+
+    Returns
+    -------
+    pd.DataFrame
+        Columns ticker_a, ticker_b, corr, overlap_n (common rows), sorted
+        from the strongest pair down. Pairs with a NaN correlation are
+        skipped.
+    """
+    if k is None and threshold is None:
+        raise ValueError("Give k, threshold, or both.")
+    if k is not None and k < 1:
+        raise ValueError("k must be at least 1.")
+
+    columns, z, mask = _prepare(df, date_col)
+
+    heap = []
+    kept = []
+
+    for i0, j0, corr, count in _iter_tiles(z, mask, block_size, min_periods, max_workers):
+        score = np.abs(corr) if absolute else corr
+
+        # each pair once: upper triangle only on diagonal tiles
+        candidate = ~np.isnan(score)
+        if i0 == j0:
+            candidate &= np.triu(np.ones_like(candidate), k=1)
+        if threshold is not None:
+            candidate &= score >= threshold
+
+        rows, cols = np.nonzero(candidate)
+        scores = score[rows, cols]
+
+        if k is not None and len(scores) > k:
+            # only this tile's top k can make it into the overall top k
+            top = np.argpartition(scores, -k)[-k:]
+            rows, cols, scores = rows[top], cols[top], scores[top]
+
+        for r, c, s in zip(rows, cols, scores):
+            pair = (float(s), i0 + int(r), j0 + int(c), float(corr[r, c]), int(count[r, c]))
+            if k is None:
+                kept.append(pair)
+            elif len(heap) < k:
+                heapq.heappush(heap, pair)
+            elif pair > heap[0]:
+                heapq.heapreplace(heap, pair)
+
+    pairs = sorted(heap if k is not None else kept, reverse=True)
+
+    return pd.DataFrame(
+        {
+            "ticker_a": [columns[i] for _, i, _, _, _ in pairs],
+            "ticker_b": [columns[j] for _, _, j, _, _ in pairs],
+            "corr": [c for _, _, _, c, _ in pairs],
+            "overlap_n": pd.array([n for *_, n in pairs], dtype="int64"),
+        }
+    )
@@ -1,3 +1,5 @@
+import math
+
 import pandas as pd
 import numpy as np
 
@@ -35,20 +37,544 @@ def main():
 
 
 
-def corr_matrix(df):
+def _shift_by_mean(values: np.ndarray):
+    """
+    Columns of a (rows x n) block with NaNs shifted by their own mean,
+    missing entries as 0, plus the validity mask (as floats) and the
+    means. Sums of squares of the shifted values do not lose precision
+    to cancellation.
+    """
+    valid = ~np.isnan(values)
+    mask = valid.astype(np.float64)
+
+    n_valid = mask.sum(axis=0)
+    shift = np.divide(
+        np.where(valid, values, 0.0).sum(axis=0), n_valid,
+        out=np.zeros(values.shape[1]), where=n_valid > 0,
+    )
+    z = np.where(valid, values - shift, 0.0)
+
+    return z, mask, shift
+
+
+def _pairwise_moments(values: np.ndarray):
+    """
+    Pairwise-complete moments of a (rows x n) block with NaNs.
+
+    Entry [i, j] of each returned matrix covers only the rows where both
+    column i and column j are valid:
+    - count: number of such rows
+    - mean:  mean of column i over them
+    - m2:    sum of squared deviations of column i from that mean
+    - comom: co-moment of columns i and j (symmetric)
+
+    Everything is built from matrix products of the zero-filled values and
+    the validity mask, after shifting each column by its own mean (see
+    `_shift_by_mean`).
+    """
+    z, mask, shift = _shift_by_mean(values)
+
+    count = mask.T @ mask
+    sums = z.T @ mask              # sum of z_i over rows where j is valid
+    sq_sums = (z * z).T @ mask
+    cross = z.T @ z                # z is 0 where invalid, so pairs only
+
+    mean_z = np.divide(sums, count, out=np.zeros_like(count), where=count > 0)
+
+    mean = mean_z + shift[:, None]
+    m2 = sq_sums - sums * mean_z
+    comom = cross - sums * mean_z.T
+
+    return count, mean, m2, comom
+
+
+def _merge_moments(a, b):
+    """Combine two sets of `_pairwise_moments` (Chan et al. parallel update)."""
+    count_a, mean_a, m2_a, comom_a = a
+    count_b, mean_b, m2_b, comom_b = b
+
+    count = count_a + count_b
+    weight = np.divide(count_a * count_b, count, out=np.zeros_like(count), where=count > 0)
+    share_b = np.divide(count_b, count, out=np.zeros_like(count), where=count > 0)
+
+    delta = mean_b - mean_a
+
+    mean = mean_a + delta * share_b
+    m2 = m2_a + m2_b + delta * delta * weight
+    comom = comom_a + comom_b + delta * delta.T * weight
+
+    return count, mean, m2, comom
+
+
+# relative size below which an m2 is taken as rounding noise of a constant
+# series: the running sums of `rolling_corr` leave noise of about 1e-13;
+# a real series would need a standard deviation below 1e-5 of its level
+_M2_RTOL = 1e-10
+
+
+def _drop_rounding(count, mean, m2):
+    """
+    `m2` with rounding noise set to 0: a sum of squared deviations within
+    `_M2_RTOL` of the sum of squares it came from belongs to a constant
+    series.
+    """
+    return np.where(m2 > _M2_RTOL * (m2 + count * mean * mean), m2, 0.0)
+
+
+def _corr_from_moments(count, mean, m2, comom, min_periods: int = 3, mean_cols=None, m2_cols=None) -> np.ndarray:
+    """
+    Correlation matrix from pairwise moments (as from `_pairwise_moments`);
+    NaN below `min_periods` or with no variance. Also works on stacks of
+    matrices (..., n, n).
+
+    For a block between two different sets of assets, `mean_cols` and
+    `m2_cols` are the mean and m2 of the column assets, laid out like
+    `m2`; such a block has no diagonal.
+    """
+    square = m2_cols is None
+    if square:
+        mean_cols = np.swapaxes(mean, -1, -2)
+        m2_cols = np.swapaxes(m2, -1, -2)
+
+    m2 = _drop_rounding(count, mean, m2)
+    m2_cols = _drop_rounding(count, mean_cols, m2_cols)
+    denom = np.sqrt(np.maximum(m2, 0.0) * np.maximum(m2_cols, 0.0))
+
+    ok = (count >= min_periods) & (denom > 0)
+    corr = np.divide(comom, denom, out=np.full_like(denom, np.nan), where=ok)
+    corr = np.clip(corr, -1.0, 1.0)
+
+    if square:
+        diagonal = np.arange(corr.shape[-1])
+        corr[..., diagonal, diagonal] = np.where(ok[..., diagonal, diagonal], 1.0, np.nan)
+
+    return corr
+
+
+def _ranks(values: np.ndarray, method: str = "average") -> np.ndarray:
+    """Rank each column over its own valid rows (NaN stays NaN)."""
+    return pd.DataFrame(values).rank(method=method).to_numpy()
+
+
+def _run_pairs(sorted_values: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    """
+    Per row of an array sorted along its last axis (invalid entries last
+    among equal values), the number of pairs of valid entries with equal
+    values: sum of t(t-1)/2 over runs of length t.
+    """
+    same = (sorted_values[..., 1:] == sorted_values[..., :-1]) & valid[..., 1:]
+    run = np.cumsum(same, axis=-1)
+    # position within the current run: reset the running count at each break
+    run_base = np.maximum.accumulate(np.where(same, 0, run), axis=-1)
+    return (run - run_base).sum(axis=-1)
+
+
+def _count_inversions(values: np.ndarray, sentinel: int) -> np.ndarray:
+    """
+    Per row of an integer array, the number of pairs a < b (position)
+    with values[a] > values[b]. Values must be in [0, sentinel].
+
+    Bottom-up merge sort vectorised over all rows, O(T log T) per row:
+    blocks of 8 are counted by brute force, then each level merges pairs
+    of sorted blocks with a stable sort, which numpy's timsort does in
+    linear time for two sorted runs. The right block's entries carry a
+    tag bit, so they sort after equal left entries, and the level's count
+    comes from their positions alone: the j-th right entry, merged to
+    position p, is smaller than the left entries not among the p - j
+    before it.
+    """
+    n_cols, n_rows = values.shape
+    levels = max(0, n_rows - 1).bit_length()
+    base = 1 << min(3, levels)
+    size = -(-n_rows // base) * base
+
+    # values in the high bits, one tag bit per level below them;
+    # padding sorts last and is never greater than anything
+    dtype = np.int32 if int(sentinel).bit_length() + levels < 31 else np.int64
+    keys = np.full((n_cols, size), sentinel << levels, dtype=dtype)
+    keys[:, :n_rows] = values << levels
+    total = np.zeros(n_cols, dtype=np.int64)
+
+    if base > 1:
+        blocks = keys.reshape(n_cols, size // base, base)
+        later = np.triu(np.ones((base, base), dtype=bool), 1)
+        total += ((blocks[..., :, None] > blocks[..., None, :]) & later).sum(axis=(1, 2, 3))
+        blocks.sort(axis=-1, kind="stable")
+
+    width = base
+    while width < size:
+        n_full = size // (2 * width)
+        cut = n_full * 2 * width
+        parts = [keys[:, :cut].reshape(n_cols, n_full, 2 * width)]
+        if size - cut > width:
+            # shorter last block
+            parts.append(keys[:, None, cut:])
+
+        for blocks in parts:
+            right = blocks.shape[-1] - width
+            blocks[..., width:] |= width
+            blocks.sort(axis=-1, kind="stable")
+            right_positions = ((blocks & width) > 0) @ np.arange(blocks.shape[-1])
+            total += blocks.shape[1] * (right * width + right * (right - 1) // 2) - right_positions.sum(axis=1)
+        width *= 2
+
+    return total
+
+
+def _tie_groups(values: np.ndarray):
+    """
+    Sort order of each column (NaN last), and for each sorted position the
+    first and last position of its group of equal values.
+    """
+    n_rows = len(values)
+    order = np.argsort(values, axis=0)
+    sorted_values = np.take_along_axis(values, order, axis=0)
+
+    position = np.arange(n_rows)[:, None]
+    starts = np.ones(sorted_values.shape, dtype=bool)
+    starts[1:] = sorted_values[1:] != sorted_values[:-1]
+
+    ends = np.ones(sorted_values.shape, dtype=bool)
+    ends[:-1] = starts[1:]
+
+    group_start = np.maximum.accumulate(np.where(starts, position, 0), axis=0)
+    group_end = np.minimum.accumulate(np.where(ends, position, n_rows)[::-1], axis=0)[::-1]
+
+    return order, group_start, group_end
+
+
+def _overlap_ranks(order, first, last, others_valid: np.ndarray) -> np.ndarray:
+    """
+    Twice the average ranks (ties share their mean rank) of each of a
+    block of columns over only the rows it shares with each of `others`,
+    as integers in a (rows x columns x others) array. Rows where the
+    column itself is missing are 0; rows where only the other asset is
+    missing are meaningless.
+
+    `order` is the block's sort order, and `first` / `last` give, per
+    row, the first position of its tie group in that order and one past
+    the last (see `_spearman_corr`). One running count of the valid rows
+    of `others` in each column's order gives every pair's ranks.
+    """
+    n_rows, n_cols = order.shape
+    n_others = others_valid.shape[1]
+    in_order = others_valid[order].astype(np.int32)
+
+    # a 0 row in front (nothing before the first position) and a -1 row
+    # at the back, which missing rows point to so that they rank 0
+    seen = np.zeros((n_rows + 2, n_cols, n_others), dtype=np.int32)
+    seen[-1] = -1
+    # row by row: much faster than np.cumsum along the first axis
+    for t in range(n_rows):
+        np.add(seen[t], in_order[t], out=seen[t + 1])
+
+    # ranks in a tie group run from (count before the group + 1) to (count at its end)
+    seen = seen.reshape(-1, n_others)
+    columns = np.arange(n_cols)
+    before = seen.take((first * n_cols + columns).ravel(), axis=0)
+    at_end = seen.take((last * n_cols + columns).ravel(), axis=0)
+    return (before + 1 + at_end).reshape(n_rows, n_cols, n_others)
+
+
+# peak size of a block pair's (rows x assets x assets) arrays in
+# `_spearman_corr`, in entries
+_SPEARMAN_BLOCK_ENTRIES = 4_000_000
+
+
+def _spearman_corr(values: np.ndarray, min_periods: int = 3) -> np.ndarray:
+    """
+    Pairwise-complete Spearman correlation: each pair's two columns ranked
+    over only the rows the pair shares, then Pearson on the ranks.
+
+    All columns are ranked in one pass first. For a pair with the same
+    missing dates on both sides those ranks are already the pair's, so
+    such pairs come from one matrix product (as in `corr_matrix`). The
+    other pairs are re-ranked over their common rows, a block of columns
+    against a block at a time (see `_overlap_ranks`), with the columns
+    grouped by their missing dates so that blocks where every pair
+    shares them are skipped. The diagonal is left NaN.
+    """
+    n_rows, n = values.shape
+    valid = ~np.isnan(values)
+
+    # columns with the same missing dates next to each other
+    _, pattern = np.unique(valid.T, axis=0, return_inverse=True)
+    pattern = pattern.ravel()
+    perm = np.argsort(pattern, kind="stable")
+    values, valid, pattern = values[:, perm], valid[:, perm], pattern[perm]
+
+    corr = _corr_from_moments(*_pairwise_moments(_ranks(values)), min_periods)
+
+    order, group_start, group_end = _tie_groups(values)
+    position = np.empty_like(order)
+    np.put_along_axis(position, order, np.arange(n_rows)[:, None], axis=0)
+    first = np.where(valid, np.take_along_axis(group_start, position, axis=0), n_rows + 1)
+    last = np.where(valid, np.take_along_axis(group_end, position, axis=0) + 1, 0)
+
+    block_size = max(1, math.isqrt(_SPEARMAN_BLOCK_ENTRIES // max(1, n_rows)))
+    blocks = [slice(b0, min(b0 + block_size, n)) for b0 in range(0, n, block_size)]
+    for b, rows_block in enumerate(blocks):
+        for cols_block in blocks[b:]:
+            if (pattern[rows_block, None] == pattern[None, cols_block]).all():
+                continue
+
+            # [t, i, j]: twice the ranks of asset i (x) and asset j (y) over
+            # the pair's common rows, 0 elsewhere
+            x = _overlap_ranks(order[:, rows_block], first[:, rows_block], last[:, rows_block], valid[:, cols_block])
+            y = _overlap_ranks(order[:, cols_block], first[:, cols_block], last[:, cols_block], valid[:, rows_block])
+            x *= valid[:, None, cols_block]
+            y = y.transpose(0, 2, 1) * valid[:, rows_block, None]
+
+            count = np.einsum("ti,tj->ij", valid[:, rows_block].astype(np.int64), valid[:, cols_block].astype(np.int64))
+            shift = count * (count + 1) ** 2  # count x (twice the mean rank)^2
+            numerator = np.einsum("tij,tij->ij", x, y, dtype=np.int64) - shift
+            var_x = np.einsum("tij,tij->ij", x, x, dtype=np.int64) - shift
+            var_y = np.einsum("tij,tij->ij", y, y, dtype=np.int64) - shift
+
+            ok = (count >= min_periods) & (var_x > 0) & (var_y > 0)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                block = np.where(ok, numerator / np.sqrt(var_x.astype(np.float64) * var_y), np.nan)
+            corr[rows_block, cols_block] = np.clip(block, -1.0, 1.0)
+            corr[cols_block, rows_block] = corr[rows_block, cols_block].T
+
+    np.fill_diagonal(corr, np.nan)
+
+    # back to the input's column order
+    out = np.empty_like(corr)
+    out[np.ix_(perm, perm)] = corr
+    return out
+
+
+def _kendall_row(x_ranks, others_ranks, both: np.ndarray):
+    """
+    Kendall tau-b numerator and tie-adjusted pair counts of one asset with
+    each of `others`, from dense ranks (only the order of values matters,
+    so ranks over all dates give the same answer as ranks per pair).
+    """
+    (x_rank,), (others_rank,) = x_ranks, others_ranks
+    sentinel = len(x_rank) + 1
+
+    # order the rows by x once for every pair (missing x last), then each
+    # pair by y within equal x; one row per pair from here on, and a
+    # missing y sorts last among its equal x
+    x = np.where(np.isnan(x_rank[:, 0]), sentinel, x_rank[:, 0]).astype(np.int64)
+    order = np.argsort(x, kind="stable")
+    x = x[order]
+    y = np.where(both, others_rank, sentinel)[order].T.astype(np.int64)
+    key = np.sort(x * (sentinel + 1) + y, axis=1, kind="stable")
+    y = key % (sentinel + 1)
+    valid = y != sentinel
+
+    count = valid.sum(axis=1)
+    pairs = count * (count - 1) // 2
+    ties_x = _run_pairs(np.broadcast_to(x, y.shape), valid)
+    ties_xy = _run_pairs(key, valid)
+    sorted_y = np.sort(y, axis=1)
+    ties_y = _run_pairs(sorted_y, sorted_y != sentinel)
+
+    # y out of order after sorting by x: discordant pairs, less those of
+    # a missing y with every valid row after it
+    missing_before = np.where(valid, 0, count[:, None] - np.cumsum(valid, axis=1)).sum(axis=1)
+    discordant = _count_inversions(y, sentinel) - missing_before
+
+    numerator = pairs - ties_x - ties_y + ties_xy - 2 * discordant
+    return numerator.astype(np.float64), (pairs - ties_x).astype(np.float64), (pairs - ties_y).astype(np.float64)
+
+
+# beyond this many rows pandas' compiled per-pair Kendall loop is faster
+_KENDALL_MAX_ROWS = 10_000
+
+
+def _rank_corr(values: np.ndarray, method: str, min_periods: int = 3) -> np.ndarray:
+    """
+    Spearman or Kendall (tau-b) correlation matrix, pairwise-complete.
+
+    Spearman: see `_spearman_corr`. Kendall: each asset is compared with
+    all later ones at once, over only the rows each pair shares, without
+    a per-pair loop.
+    """
+    n = values.shape[1]
+    valid = ~np.isnan(values)
+
+    if method == "spearman":
+        corr = _spearman_corr(values, min_periods)
+    elif len(values) > _KENDALL_MAX_ROWS:
+        corr = pd.DataFrame(values).corr(method="kendall", min_periods=min_periods).to_numpy(copy=True)
+        np.fill_diagonal(corr, np.nan)
+    else:
+        corr = np.full((n, n), np.nan)
+        ranks = _ranks(values, "dense")
+
+        for i in range(n - 1):
+            both = valid[:, [i]] & valid[:, i + 1:]
+            numerator, var_x, var_y = _kendall_row((ranks[:, [i]],), (ranks[:, i + 1:],), both)
+
+            ok = (both.sum(axis=0) >= min_periods) & (var_x > 0) & (var_y > 0)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                row = np.where(ok, numerator / np.sqrt(var_x * var_y), np.nan)
+
+            corr[i, i + 1:] = corr[i + 1:, i] = np.clip(row, -1.0, 1.0)
+
+    # an asset with itself: 1 when it has enough distinct values
+    for i in range(n):
+        column = values[valid[:, i], i]
+        if len(column) >= min_periods and np.unique(column).size > 1:
+            corr[i, i] = 1.0
+
+    return corr
+
+
+CORR_METHODS = ("pearson", "spearman", "kendall")
+
+
+def pairwise_corr(
+    df: pd.DataFrame,
+    min_periods: int = 3,
+    date_col: str = "Date",
+    method: str = "pearson",
+):
+    """
+    Pairwise-complete correlation of the return columns, plus how many
+    rows each pair had in common.
+
+    Same result as `DataFrame.corr(method=..., min_periods=...)` (up to
+    float rounding), without pandas' per-pair loops:
+    - "pearson": a few matrix products over zero-filled returns and
+      validity masks (see `_pairwise_moments`);
+    - "spearman": ranks over each pair's common rows, then Pearson on the
+      ranks; one matrix product for the pairs with the same missing
+      dates, blocks of pairs re-ranked together for the others (see
+      `_spearman_corr`);
+    - "kendall": tau-b, counting discordant pairs with a merge sort
+      (O(T log T) per pair, vectorised over assets); past 10,000 rows
+      pandas' own per-pair loop is faster and is used instead.
+
+    One difference: an asset without variance (constant over its valid
+    rows) has NaN on the diagonal for every method, where pandas' Kendall
+    gives 1.
+
+    Returns
+    -------
+    (pd.DataFrame, pd.DataFrame)
+        The correlation matrix and the overlap-count matrix (rows where
+        both assets have a return; the diagonal is each asset's count).
+    """
+    if method not in CORR_METHODS:
+        raise ValueError(f"Unknown correlation method {method!r}; use one of {CORR_METHODS}.")
+
+    returns = df.drop(columns=date_col, errors="ignore")
+    columns = returns.columns
+    values = returns.to_numpy(dtype=np.float64, na_value=np.nan)
+
+    valid = ~np.isnan(values)
+    same_dates = (valid == valid[:, [0]]).all() if values.size else True
+
+    if method == "pearson" or (method == "spearman" and same_dates):
+        if method == "spearman":
+            values = _ranks(values)
+        count, mean, m2, comom = _pairwise_moments(values)
+        corr = _corr_from_moments(count, mean, m2, comom, min_periods)
+    else:
+        mask = valid.astype(np.float64)
+        count = mask.T @ mask
+        corr = _rank_corr(values, method, min_periods)
+
+    corr = pd.DataFrame(corr, index=columns, columns=columns)
+    counts = pd.DataFrame(count.astype(np.int64), index=columns, columns=columns)
+
+    return corr, counts
+
+
+def corr_matrix(df, return_counts: bool = False, method: str = "pearson"):
     nrow = len(df.dropna(axis=0))
 
-    # dates with na are excluded in the calculation by default in the corr() function
+    # dates with na are excluded pair by pair (pairwise-complete), and a
+    # pair needs at least 3 common dates
     if nrow >= 3:
-        matrix = (
-            df
-            .drop('Date', axis = 1)
-            .corr(min_periods = 3)
-        )
-        return matrix
+        matrix, counts = pairwise_corr(df, min_periods=3, method=method)
+        # counts: overlapping dates per pair, to flag thin pairs
+        return (matrix, counts) if return_counts else matrix
     else:
         raise ValueError("There are less then 3 rows with valid price data")
 
+
+class CorrelationAccumulator:
+    """
+    Online, mergeable version of `corr_matrix`.
+
+    Feed return rows in batches with `update` (e.g. one shard of a long
+    history at a time, or each new day as it arrives) and read the matrix
+    with `corr`. Two accumulators built on separate shards, threads or
+    processes combine with `merge`; the state is plain NumPy arrays, so
+    it pickles.
+
+    Per pair of assets it keeps the pairwise-complete count, means,
+    sums of squared deviations and co-moment, so the result matches
+    `corr_matrix` (pairwise-complete, `min_periods` overlapping rows per
+    pair, at least 3 rows where every asset is valid) up to float rounding,
+    whatever the batch order.
+    """
+
+    def __init__(self, columns, min_periods: int = 3, date_col: str = "Date"):
+        self.columns = list(columns)
+        self.min_periods = min_periods
+        self.date_col = date_col
+
+        n = len(self.columns)
+        self.complete_rows = 0
+        self._moments = (
+            np.zeros((n, n)), np.zeros((n, n)), np.zeros((n, n)), np.zeros((n, n))
+        )
+
+    def _values(self, returns) -> np.ndarray:
+        if isinstance(returns, pd.DataFrame):
+            returns = returns.drop(columns=self.date_col, errors="ignore")
+            missing = [c for c in self.columns if c not in returns.columns]
+            if missing:
+                raise ValueError(f"Columns missing from the batch: {missing}")
+            return returns[self.columns].to_numpy(dtype=np.float64, na_value=np.nan)
+
+        values = np.asarray(returns, dtype=np.float64)
+        if values.ndim != 2 or values.shape[1] != len(self.columns):
+            raise ValueError(f"Expected a 2-D array with {len(self.columns)} columns.")
+        return values
+
+    def update(self, returns) -> "CorrelationAccumulator":
+        """Add a batch of return rows (DataFrame with the same columns, or 2-D array)."""
+        values = self._values(returns)
+        if len(values) == 0:
+            return self
+
+        self.complete_rows += int((~np.isnan(values)).all(axis=1).sum())
+        self._moments = _merge_moments(self._moments, _pairwise_moments(values))
+        return self
+
+    def merge(self, other: "CorrelationAccumulator") -> "CorrelationAccumulator":
+        """Fold another accumulator over the same columns into this one."""
+        if other.columns != self.columns:
+            raise ValueError("Cannot merge accumulators over different columns.")
+
+        self.complete_rows += other.complete_rows
+        self._moments = _merge_moments(self._moments, other._moments)
+        return self
+
+    def counts(self) -> pd.DataFrame:
+        """Overlapping valid rows per pair of assets."""
+        return pd.DataFrame(
+            self._moments[0].astype(np.int64), index=self.columns, columns=self.columns
+        )
+
+    def corr(self) -> pd.DataFrame:
+        """The correlation matrix so far (same rules as `corr_matrix`)."""
+        if self.complete_rows < 3:
+            raise ValueError("There are less then 3 rows with valid price data")
+
+        return pd.DataFrame(
+            _corr_from_moments(*self._moments, self.min_periods),
+            index=self.columns,
+            columns=self.columns,
+        )
+
 #     # Corelation matrix
 # # dates with na are excluded in the calculation
 # matrix = (
@@ -0,0 +1,160 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from .corr_matrix import _corr_from_moments, _shift_by_mean
+
+
+# peak size of the per-block working arrays, in matrix entries
+_BLOCK_ENTRIES = 1_000_000
+
+
+@dataclass
+class RollingCorrelation:
+    """
+    Rolling correlation matrices, one per date.
+
+    `values[t]` is the (n x n) matrix for the window ending at `dates[t]`,
+    with rows and columns in `columns` order. `values` is a NumPy array,
+    or a `numpy.memmap` over a `.npy` file when `rolling_corr` was given
+    a `path` (reload it later with `np.load(path, mmap_mode="r")`).
+    """
+    dates: pd.DatetimeIndex
+    columns: list
+    values: np.ndarray
+
+    def at(self, date) -> pd.DataFrame:
+        """The correlation matrix of the window ending at `date`."""
+        t = self.dates.get_loc(pd.Timestamp(date))
+        return pd.DataFrame(np.asarray(self.values[t]), index=self.columns, columns=self.columns)
+
+    def pair(self, ticker_a: str, ticker_b: str) -> pd.Series:
+        """Rolling correlation of one pair of assets over time."""
+        i, j = self.columns.index(ticker_a), self.columns.index(ticker_b)
+        return pd.Series(
+            np.asarray(self.values[:, i, j]),
+            index=self.dates,
+            name=f"{ticker_a}/{ticker_b}",
+        )
+
+
+def _running_sums(first: np.ndarray, left: np.ndarray, right: np.ndarray, out: np.ndarray):
+    """
+    Fill `out` (steps + 1, n, n) with `first` followed by the running
+    total of the per-step updates `left[t] @ right[t]`.
+    """
+    out[0] = first
+    np.matmul(left, right, out=out[1:])
+
+    # row by row: much faster than np.cumsum along the stacked axis
+    for t in range(1, len(out)):
+        np.add(out[t], out[t - 1], out=out[t])
+    return out
+
+
+def _window_sums(z: np.ndarray, mask: np.ndarray):
+    """Window sums of a block of rows, straight from matrix products."""
+    return mask.T @ mask, z.T @ mask, (z * z).T @ mask, z.T @ z
+
+
+def rolling_corr(
+    df: pd.DataFrame,
+    window: int,
+    min_periods: int = 3,
+    date_col: str = "Date",
+    path: str | None = None,
+    dtype=np.float64,
+    block_size: int | None = None,
+) -> RollingCorrelation:
+    """
+    Correlation matrices over a rolling window of `window` rows, for every
+    date of a return frame (Date + one column per asset).
+
+    As in `corr_matrix`, each pair uses the rows where both assets are
+    valid and is NaN with fewer than `min_periods` of them. Windows are
+    not rejected as a whole, so early windows (fewer than `window` rows)
+    and windows before a listing just have NaN pairs.
+
+    Per pair, the window keeps running sums (count, sums, squares, cross
+    products); each step adds the new row and drops the oldest one, so a
+    step costs O(n^2) whatever the window length. The steps run in blocks
+    of `block_size` dates, and each block starts from sums recomputed
+    from its window, so float drift never builds up over long histories.
+
+    Parameters
+    ----------
+    path : str, optional
+        Write the (dates x n x n) result into a `.npy` memmap at this path
+        instead of holding it in memory.
+    dtype :
+        Dtype of the stored matrices (np.float32 halves the size).
+    block_size : int, optional
+        Dates per block; by default sized so a block's working arrays
+        stay around 100 MB in total, and never more than `window`.
+    """
+    if window < 1:
+        raise ValueError("window must be at least 1.")
+
+    columns = [c for c in df.columns if c != date_col]
+    values = df[columns].to_numpy(dtype=np.float64, na_value=np.nan)
+    n_rows, n = values.shape
+
+    # shifted by the column means: keeps the running sums small
+    z, mask, _ = _shift_by_mean(values)
+
+    if path is not None:
+        out = np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=(n_rows, n, n))
+    else:
+        out = np.empty((n_rows, n, n), dtype=dtype)
+
+    if block_size is None:
+        block_size = max(1, _BLOCK_ENTRIES // max(1, n * n))
+    block_size = max(1, min(block_size, window))
+
+    for b0 in range(0, n_rows, block_size):
+        b1 = min(b0 + block_size, n_rows)
+
+        # sums of the window ending at b0, recomputed from scratch
+        lo = max(0, b0 - window + 1)
+        start = _window_sums(z[lo:b0 + 1], mask[lo:b0 + 1])
+
+        # later dates in the block: add row t, drop row t - window. Each
+        # step's update is a rank-2 product [added, dropped] @ [added, -dropped]
+        add = slice(b0 + 1, b1)
+        drop_rows = np.arange(b0 + 1, b1) - window
+        keep = (drop_rows >= 0)[:, None]
+        drop_z = np.where(keep, z[np.maximum(drop_rows, 0)], 0.0)
+        drop_mask = np.where(keep, mask[np.maximum(drop_rows, 0)], 0.0)
+
+        left_m = np.stack([mask[add], drop_mask], axis=2)
+        left_z = np.stack([z[add], drop_z], axis=2)
+        left_sq = np.stack([z[add] ** 2, drop_z ** 2], axis=2)
+        right_m = np.stack([mask[add], -drop_mask], axis=1)
+        right_z = np.stack([z[add], -drop_z], axis=1)
+
+        shape = (b1 - b0, n, n)
+        running = [
+            _running_sums(start[0], left_m, right_m, np.empty(shape)),
+            _running_sums(start[1], left_z, right_m, np.empty(shape)),
+            _running_sums(start[2], left_sq, right_m, np.empty(shape)),
+            _running_sums(start[3], left_z, right_z, np.empty(shape)),
+        ]
+
+        count, total, sq_total, cross = running
+        mean_z = np.divide(total, count, out=np.zeros_like(count), where=count > 0)
+
+        # in place: these stacks are the largest arrays of the block
+        m2 = np.subtract(sq_total, total * mean_z, out=sq_total)
+        comom = np.subtract(cross, total * np.swapaxes(mean_z, -1, -2), out=cross)
+
+        out[b0:b1] = _corr_from_moments(count, mean_z, m2, comom, min_periods)
+
+    if isinstance(out, np.memmap):
+        out.flush()
+
+    return RollingCorrelation(
+        dates=pd.DatetimeIndex(pd.to_datetime(df[date_col])),
+        columns=columns,
+        values=out,
+    )
@@ -0,0 +1,223 @@
+from abc import ABC, abstractmethod
+
+import numpy as np
+import pandas as pd
+
+
+def _complete_returns(returns: pd.DataFrame, date_col: str = "Date"):
+    """
+    Column names and the (rows x n) array of rows where every asset has a
+    return. Estimators use complete rows only, so the matrices they
+    produce are positive semi-definite (pairwise-complete ones need not be).
+    """
+    r = returns.drop(columns=date_col, errors="ignore")
+    values = r.to_numpy(dtype=np.float64, na_value=np.nan)
+    values = values[~np.isnan(values).any(axis=1)]
+
+    if len(values) < 3:
+        raise ValueError("There are less then 3 rows with valid price data")
+
+    return list(r.columns), values
+
+
+def cov_to_corr(cov: pd.DataFrame) -> pd.DataFrame:
+    """Correlation matrix of a covariance matrix (NaN for zero-variance assets)."""
+    sd = np.sqrt(np.diag(cov.to_numpy()))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        corr = cov.to_numpy() / np.outer(sd, sd)
+
+    corr = np.clip(corr, -1.0, 1.0)
+    np.fill_diagonal(corr, np.where(sd > 0, 1.0, np.nan))
+
+    return pd.DataFrame(corr, index=cov.index, columns=cov.columns)
+
+
+class CovarianceEstimator(ABC):
+    """
+    Base class for covariance estimators over log returns.
+
+    Subclasses implement `_estimate(values)` for a (rows x n) array of
+    complete return rows. `fit(returns)` takes a return frame (Date + one
+    column per asset, as from `log_return`); `covariance()` and
+    `correlation()` then return n x n DataFrames, so the same estimator
+    feeds the correlation heatmap and `portfo_metrics`.
+
+    Covariances are per return period (not annualised).
+    """
+
+    name = "Sample"
+
+    def __init__(self):
+        self._cov = None
+
+    @abstractmethod
+    def _estimate(self, values: np.ndarray) -> np.ndarray:
+        """n x n covariance of the complete return rows `values`."""
+
+    def fit(self, returns: pd.DataFrame, date_col: str = "Date"):
+        columns, values = _complete_returns(returns, date_col)
+        self._cov = pd.DataFrame(self._estimate(values), index=columns, columns=columns)
+        return self
+
+    def covariance(self) -> pd.DataFrame:
+        if self._cov is None:
+            raise ValueError("Call fit() first.")
+        return self._cov.copy()
+
+    def correlation(self) -> pd.DataFrame:
+        return cov_to_corr(self.covariance())
+
+
+class SampleCovariance(CovarianceEstimator):
+    """Plain sample covariance (ddof = 1), as used by `portfo_metrics`."""
+
+    name = "Sample"
+
+    def _estimate(self, values):
+        return np.cov(values, rowvar=False, ddof=1).reshape(values.shape[1], values.shape[1])
+
+
+class LedoitWolfCovariance(CovarianceEstimator):
+    """
+    Ledoit-Wolf shrinkage of the sample covariance towards a structured
+    target, with the intensity estimated from the data:
+
+    - "identity": a scaled identity (Ledoit & Wolf, 2004, "A well-
+      conditioned estimator for large-dimensional covariance matrices");
+    - "constant_correlation": every pair gets the average sample
+      correlation, each asset keeps its own variance (Ledoit & Wolf,
+      2003, "Honey, I shrunk the sample covariance matrix").
+
+    The shrunk matrix is well conditioned even with fewer rows than
+    assets. `shrinkage` holds the intensity used by the last `fit`.
+    """
+
+    name = "Ledoit-Wolf"
+
+    def __init__(self, target: str = "identity"):
+        if target not in ("identity", "constant_correlation"):
+            raise ValueError("target must be 'identity' or 'constant_correlation'.")
+        super().__init__()
+        self.target = target
+        self.shrinkage = None
+
+    def _estimate(self, values):
+        t, n = values.shape
+        y = values - values.mean(axis=0)
+        sample = y.T @ y / t
+
+        if self.target == "identity":
+            target, shrinkage = self._identity(y, sample)
+        else:
+            target, shrinkage = self._constant_correlation(y, sample)
+
+        self.shrinkage = shrinkage
+        return shrinkage * target + (1 - shrinkage) * sample
+
+    @staticmethod
+    def _identity(y, sample):
+        t, n = y.shape
+        mu = np.trace(sample) / n
+        target = mu * np.eye(n)
+
+        # squared distance to the target, and the estimation error of sample
+        delta = ((sample - target) ** 2).sum() / n
+        y2 = y ** 2
+        beta = ((y2.T @ y2).sum() / t - (sample ** 2).sum()) / (n * t)
+
+        shrinkage = 0.0 if delta == 0 else min(beta, delta) / delta
+        return target, shrinkage
+
+    @staticmethod
+    def _constant_correlation(y, sample):
+        t, n = y.shape
+        var = np.diag(sample)
+        sd = np.sqrt(var)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            corr = sample / np.outer(sd, sd)
+        r_bar = (np.nansum(corr) - n) / (n * (n - 1)) if n > 1 else 0.0
+
+        target = r_bar * np.outer(sd, sd)
+        np.fill_diagonal(target, var)
+
+        # pi: sum of asymptotic variances of the sample covariances
+        y2 = y ** 2
+        pi_mat = y2.T @ y2 / t - sample ** 2
+        pi_hat = pi_mat.sum()
+
+        # rho: asymptotic covariances between target and sample
+        theta = (y ** 3).T @ y / t - var[:, None] * sample
+        np.fill_diagonal(theta, 0.0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = np.outer(1 / sd, sd)   # sqrt(var_j / var_i)
+        rho_hat = np.trace(pi_mat) + r_bar * np.nansum(ratio * theta)
+
+        # gamma: misspecification of the target
+        gamma_hat = ((sample - target) ** 2).sum()
+
+        if gamma_hat == 0:
+            return target, 0.0
+        kappa = (pi_hat - rho_hat) / gamma_hat
+        return target, float(np.clip(kappa / t, 0.0, 1.0))
+
+
+class EWMACovariance(CovarianceEstimator):
+    """
+    Exponentially weighted covariance, RiskMetrics style: returns are
+    taken as zero-mean and each older row counts `decay` times less,
+    with `decay = 0.5 ** (1 / halflife)` (halflife in return periods;
+    the default ~ RiskMetrics' 0.94 for daily data).
+
+    After `fit`, `update(new_returns)` folds in appended rows in
+    O(rows * n^2), giving the same matrix as refitting on the whole
+    history.
+    """
+
+    name = "EWMA"
+
+    def __init__(self, halflife: float = 11.2):
+        if halflife <= 0:
+            raise ValueError("halflife must be positive.")
+        super().__init__()
+        self.halflife = halflife
+        self.decay = 0.5 ** (1 / halflife)
+        self._weight = 0.0
+
+    def _fold(self, cov, weight, values):
+        """Fold rows into a weighted-average covariance with total weight `weight`."""
+        for row in values:
+            new_weight = self.decay * weight + 1.0
+            cov = (self.decay * weight * cov + np.outer(row, row)) / new_weight
+            weight = new_weight
+        return cov, weight
+
+    def _estimate(self, values):
+        n = values.shape[1]
+
+        # closed form of the fold over the whole history
+        weights = self.decay ** np.arange(len(values) - 1, -1, -1)
+        self._weight = weights.sum()
+        return (values * weights[:, None]).T @ values / self._weight
+
+    def update(self, returns: pd.DataFrame, date_col: str = "Date"):
+        """Add return rows that came after the fitted history (incomplete rows are skipped)."""
+        if self._cov is None:
+            raise ValueError("Call fit() first.")
+
+        r = returns.drop(columns=date_col, errors="ignore")[list(self._cov.columns)]
+        values = r.to_numpy(dtype=np.float64, na_value=np.nan)
+        values = values[~np.isnan(values).any(axis=1)]
+
+        cov, self._weight = self._fold(self._cov.to_numpy(), self._weight, values)
+        self._cov = pd.DataFrame(cov, index=self._cov.index, columns=self._cov.columns)
+        return self
+
+
+ESTIMATORS = {
+    "Sample": SampleCovariance,
+    "Ledoit-Wolf": LedoitWolfCovariance,
+    "Ledoit-Wolf (constant correlation)": lambda: LedoitWolfCovariance("constant_correlation"),
+    "EWMA": EWMACovariance,
+}
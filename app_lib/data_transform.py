@@ -1,3 +1,5 @@
+from dataclasses import dataclass
+
 import pandas as pd
 import numpy as np
 
@@ -25,55 +27,337 @@ def main():
     print('Log Return')
     print(log_retuirn_df)
 
-def log_return(df: pd.DataFrame, date_col: str = "Date") -> pd.DataFrame:
-    out = df.copy()
-    price_cols = [c for c in out.columns if c != date_col]
+def _previous_valid(values: np.ndarray) -> np.ndarray:
+    """
+    For each cell of a 2-D array, the value in the same column at the last
+    non-NaN row strictly above it (NaN when there is none).
+    """
+    prev = np.full_like(values, np.nan)
+
+    if values.shape[0] < 2:
+        return prev
+
+    # row index of the last valid value at or above each row; rows with no
+    # valid value yet point at row 0, which is then NaN itself
+    rows = np.arange(values.shape[0])[:, None]
+    last_valid = np.where(~np.isnan(values), rows, 0)
+    np.maximum.accumulate(last_valid, axis=0, out=last_valid)
+
+    # shift down one row: last valid strictly above
+    prev[1:] = np.take_along_axis(values, last_valid[:-1], axis=0)
+
+    return prev
+
+
+def _first_valid(values: np.ndarray) -> np.ndarray:
+    """First non-NaN value of each column of a 2-D array (NaN when none)."""
+    if values.shape[0] == 0:
+        return np.full(values.shape[1], np.nan)
+
+    valid = ~np.isnan(values)
+    first = values[valid.argmax(axis=0), np.arange(values.shape[1])]
+    return np.where(valid.any(axis=0), first, np.nan)
+
+
+def _last_valid(values: np.ndarray) -> np.ndarray:
+    """Last non-NaN value of each column of a 2-D array (NaN when none)."""
+    return _first_valid(values[::-1])
 
-    price_vals = out[price_cols].apply(pd.to_numeric, errors="coerce")
 
-    bad_mask = (price_vals <= 0) & price_vals.notna()
-    if bad_mask.any().any():
+def _price_matrix(df: pd.DataFrame, price_cols, dtype=np.float64) -> np.ndarray:
+    """Price columns as a float array; non-numeric entries become NaN."""
+    prices = df[price_cols]
+
+    # Streamlit tables sometimes contain None objects / strings; only
+    # those columns need the (slow) element-wise coercion
+    if not all(pd.api.types.is_numeric_dtype(t) for t in prices.dtypes):
+        prices = prices.apply(pd.to_numeric, errors="coerce")
+
+    return prices.to_numpy(dtype=dtype, na_value=np.nan)
+
+
+def _with_prices(df: pd.DataFrame, price_cols, values: np.ndarray, copy: bool = True) -> pd.DataFrame:
+    """`df` with `price_cols` replaced by `values`, columns kept in order."""
+    if not copy:
+        df[price_cols] = values
+        return df
+
+    out = pd.concat(
+        [df.drop(columns=price_cols), pd.DataFrame(values, index=df.index, columns=price_cols)],
+        axis=1,
+    )
+    if list(out.columns) != list(df.columns):
+        out = out[df.columns]
+    return out
+
+
+def log_return(
+    df: pd.DataFrame,
+    date_col: str = "Date",
+    copy: bool = True,
+    dtype=np.float64,
+) -> pd.DataFrame:
+    """
+    Log return of each price column: ln(P_t) - ln(P_prev), where P_prev is
+    the last available price before t. Dates with a missing price stay
+    NaN, and the first price of each column has no return.
+
+    Computed on the whole price matrix at once (no per-column loop).
+
+    Parameters
+    ----------
+    copy : bool
+        False writes the returns into `df` itself instead of a copy.
+    dtype :
+        Float dtype of the computation and result (e.g. np.float32 to
+        halve memory on large universes).
+    """
+    price_cols = [c for c in df.columns if c != date_col]
+
+    prices = _price_matrix(df, price_cols, dtype)
+
+    if (prices <= 0).any():
         raise ValueError(
             "Non-positive prices encountered. "
             "Log returns require strictly positive prices."
         )
 
-    for c in price_cols:
-        s = out[c]
-        # keep NaNs, but compute returns using last available price
-        lr = np.log(s.dropna()).diff()
-        out[c] = lr.reindex(out.index)
+    log_prices = np.log(prices)
+    # keep NaNs, but compute returns using last available price
+    log_prices -= _previous_valid(log_prices)
+
+    # one new block for all price columns, other columns kept in place
+    return _with_prices(df, price_cols, log_prices, copy)
+
+
+# annualisation factor for each return frequency (pass as `trading_days`
+# to `asset_metrics` / `portfo_metrics`)
+PERIODS_PER_YEAR = {"D": 252, "W": 52, "M": 12, "Q": 4}
+
+# pandas resample rules; weeks end on Friday, months/quarters at month end
+_RESAMPLE_RULES = {"W": "W-FRI", "M": "ME", "Q": "QE"}
+
+
+def resampled_log_return(
+    df: pd.DataFrame,
+    freq: str = "D",
+    date_col: str = "Date",
+    dtype=np.float64,
+):
+    """
+    Log returns at a daily, weekly, monthly or quarterly frequency, built
+    straight from the wide daily close-price frame.
+
+    Prices are first reduced to the last valid price of each period (one
+    `resample().last()` over the whole frame), then passed to `log_return`.
+    Periods with no price for any asset are dropped. Dates are the period
+    end labels (Friday, month end, quarter end).
+
+    Parameters
+    ----------
+    freq : str
+        "D", "W", "M" or "Q".
+
+    Returns
+    -------
+    (pd.DataFrame, int)
+        The log returns and the matching annualisation factor from
+        `PERIODS_PER_YEAR`.
+    """
+    if freq not in PERIODS_PER_YEAR:
+        raise ValueError(f"Unsupported frequency {freq!r}; use one of {list(PERIODS_PER_YEAR)}.")
+
+    if freq == "D":
+        return log_return(df, date_col=date_col, dtype=dtype), PERIODS_PER_YEAR[freq]
+
+    price_cols = [c for c in df.columns if c != date_col]
+    prices = pd.DataFrame(
+        _price_matrix(df, price_cols),
+        index=pd.DatetimeIndex(pd.to_datetime(df[date_col])),
+        columns=price_cols,
+    )
+
+    period_prices = (
+        prices
+        .resample(_RESAMPLE_RULES[freq])
+        .last()
+        .dropna(how="all")
+        .rename_axis(date_col)
+        .reset_index()
+    )
+
+    return log_return(period_prices, date_col=date_col, dtype=dtype), PERIODS_PER_YEAR[freq]
+
+
+@dataclass
+class TransformState:
+    """
+    What `update_transforms` needs to carry on from a computed history:
+    per ticker, the last valid price (for the next log return) and the
+    first valid price (the base of the index). NaN where a ticker has no
+    price yet.
+    """
+    last_price: pd.Series
+    base_price: pd.Series
+
+
+def transform_state(df: pd.DataFrame, date_col: str = "Date") -> TransformState:
+    """Build the `TransformState` of a price frame (one pass, no returns computed)."""
+    price_cols = [c for c in df.columns if c != date_col]
+    prices = df[price_cols].to_numpy(dtype=np.float64, na_value=np.nan)
+
+    return TransformState(
+        last_price=pd.Series(_last_valid(prices), index=price_cols),
+        base_price=pd.Series(_first_valid(prices), index=price_cols),
+    )
+
+
+def update_transforms(
+    state: TransformState,
+    new_rows: pd.DataFrame,
+    date_col: str = "Date",
+    base: float = 100.0,
+):
+    """
+    Log returns and index values for price rows appended after the
+    history `state` was built from, without touching that history.
+
+    Gives the same rows as `log_return` / `normalize_to_100` on the full
+    frame would for those dates. A ticker that had no price yet (or is
+    new in `new_rows`) takes its first new price as its index base.
+
+    Returns
+    -------
+    (returns, indexed, state)
+        `returns` and `indexed` have the same columns as `new_rows`;
+        `state` is the updated `TransformState` to pass on next time.
+    """
+    price_cols = [c for c in new_rows.columns if c != date_col]
+    prices = new_rows[price_cols].to_numpy(dtype=np.float64, na_value=np.nan)
+
+    if (prices <= 0).any():
+        raise ValueError(
+            "Non-positive prices encountered. "
+            "Log returns require strictly positive prices."
+        )
+
+    last = state.last_price.reindex(price_cols).to_numpy(dtype=np.float64)
+    base_price = state.base_price.reindex(price_cols).to_numpy(dtype=np.float64)
+
+    # the last known price is the row above the first new one
+    log_prices = np.log(np.vstack([last, prices]))
+    log_prices -= _previous_valid(log_prices)
+
+    base_price = np.where(np.isnan(base_price), _first_valid(prices), base_price)
+    last = np.where(np.isnan(_last_valid(prices)), last, _last_valid(prices))
+
+    returns = new_rows.copy()
+    returns[price_cols] = log_prices[1:]
+
+    indexed = new_rows.copy()
+    indexed[price_cols] = prices / base_price * base
+
+    new_state = TransformState(
+        last_price=_merge_state(state.last_price, price_cols, last),
+        base_price=_merge_state(state.base_price, price_cols, base_price),
+    )
+
+    return returns, indexed, new_state
+
+
+def _merge_state(old: pd.Series, cols, values: np.ndarray) -> pd.Series:
+    """`old` with `cols` set to `values`, new tickers appended at the end."""
+    merged = old.to_dict()
+    merged.update(zip(cols, values))
+    return pd.Series(merged, dtype=np.float64)
 
-    return out
 
 def normalize_to_100(
     df: pd.DataFrame,
     date_col: str = "Date",
     base: float = 100.0,
-    price_cols: list[str] | None = None
+    price_cols: list[str] | None = None,
+    copy: bool = True,
     ) -> pd.DataFrame:
     """
     Normalise each price column to an index starting at `base` using
     the first non-null price in that column within the dataframe.
-    """
-    out = df.copy()
-
-    # out[date_col] = pd.to_datetime(out[date_col]).dt.date
 
+    `copy=False` writes the index values into `df` itself.
+    """
     # Identify price columns
     if price_cols is None:
-        price_cols = [c for c in out.columns if c != date_col]
+        price_cols = [c for c in df.columns if c != date_col]
 
-    # Ensure numeric (Streamlit tables sometimes contain None objects)
-    out[price_cols] = out[price_cols].apply(pd.to_numeric, errors="coerce")
+    prices = _price_matrix(df, price_cols)
 
-    # First non-null value per column (base per ticker)
-    first_valid = out[price_cols].apply(lambda s: s.dropna().iloc[0] if s.notna().any() else np.nan)
+    # First non-null value per column (base per ticker), then normalise
+    return _with_prices(df, price_cols, prices / _first_valid(prices) * base, copy)
 
-    # Normalise
-    out[price_cols] = out[price_cols].div(first_valid).mul(base)
 
-    return out
+def normalize_variants(
+    df: pd.DataFrame,
+    date_col: str = "Date",
+    base: float = 100.0,
+    base_date=None,
+    variants=None,
+) -> dict:
+    """
+    Several index versions of a price frame from one pass over the prices.
+
+    Parameters
+    ----------
+    variants : iterable of str, optional
+        Names of the versions to build (see below); by default all of
+        them. Each one is a full copy of the frame, so callers that show
+        one version at a time should ask only for that one.
+
+    Returns
+    -------
+    dict
+        {
+          "first_valid": base at each asset's first available price
+                         (same as `normalize_to_100`),
+          "common_start": base at the first date where every asset has
+                          a price (all-NaN when there is no such date),
+          "base_date": base at each asset's first price on or after
+                       `base_date` (only when `base_date` is given),
+        }
+    """
+    if variants is None:
+        variants = ["first_valid", "common_start"] + (["base_date"] if base_date is not None else [])
+    variants = set(variants)
+
+    unknown = variants - {"first_valid", "common_start", "base_date"}
+    if unknown:
+        raise ValueError(f"Unknown index variants: {sorted(unknown)}.")
+    if "base_date" in variants and base_date is None:
+        raise ValueError("The 'base_date' variant needs a base_date.")
+
+    price_cols = [c for c in df.columns if c != date_col]
+    prices = _price_matrix(df, price_cols)
+    n_cols = len(price_cols)
+
+    bases = {}
+
+    if "first_valid" in variants:
+        bases["first_valid"] = _first_valid(prices)
+
+    if "common_start" in variants:
+        all_valid = ~np.isnan(prices).any(axis=1)
+        if all_valid.any():
+            bases["common_start"] = prices[all_valid.argmax()]
+        else:
+            bases["common_start"] = np.full(n_cols, np.nan)
+
+    if "base_date" in variants:
+        on_or_after = (pd.to_datetime(df[date_col]) >= pd.Timestamp(base_date)).to_numpy()
+        bases["base_date"] = _first_valid(prices[on_or_after])
+
+    return {
+        name: _with_prices(df, price_cols, prices / base_prices * base)
+        for name, base_prices in bases.items()
+    }
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
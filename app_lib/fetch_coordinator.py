@@ -0,0 +1,209 @@
+import threading
+import time
+
+from .price_provider import combine_close_series
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter shared by threads.
+
+    Holds up to `capacity` tokens, refilled at `rate_per_second`. Each
+    `acquire` takes one token, sleeping until one is available, and adds
+    the time spent waiting to `throttled_seconds`.
+    """
+
+    def __init__(
+        self,
+        rate_per_second: float,
+        capacity: float,
+        clock=time.monotonic,
+        sleep=time.sleep,
+    ):
+        if rate_per_second <= 0 or capacity < 1:
+            raise ValueError("rate_per_second must be > 0 and capacity >= 1.")
+
+        self.rate_per_second = rate_per_second
+        self.capacity = capacity
+        self.throttled_seconds = 0.0
+
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = float(capacity)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take one token; return how long we had to wait for it."""
+        waited = 0.0
+
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(
+                    self.capacity,
+                    self._tokens + (now - self._updated) * self.rate_per_second,
+                )
+                self._updated = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    self.throttled_seconds += waited
+                    return waited
+
+                wait = (1 - self._tokens) / self.rate_per_second
+
+            self._sleep(wait)
+            waited += wait
+
+
+class _Flight:
+    """One in-flight download of a (ticker, range), awaited by others."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.series = None
+        self.reason = None
+
+
+class FetchCoordinator:
+    """
+    Process-wide coordinator for price fetches from concurrent sessions.
+
+    - Single-flight: while one session is fetching a (ticker, range),
+      other sessions asking for it wait for that download instead of
+      starting their own.
+    - Short-lived results: a (ticker, range) fetched within the last
+      `result_ttl_seconds` is served from memory.
+    - Rate limit: every call to the provider takes a token from a shared
+      `TokenBucket`.
+
+    Use `get_fetch_coordinator()` for the shared instance, and `stats()`
+    for the hit / coalesced / throttled counters.
+    """
+
+    def __init__(
+        self,
+        rate_per_second: float = 2.0,
+        burst: int = 5,
+        result_ttl_seconds: float = 60.0,
+        clock=time.monotonic,
+        sleep=time.sleep,
+    ):
+        self.bucket = TokenBucket(rate_per_second, burst, clock=clock, sleep=sleep)
+        self.result_ttl_seconds = result_ttl_seconds
+
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._results = {}
+        self._counters = {
+            "requested": 0,
+            "hits": 0,
+            "coalesced": 0,
+            "fetched": 0,
+            "provider_calls": 0,
+        }
+
+    def stats(self) -> dict:
+        """
+        Counters since start-up (in tickers, except where noted):
+        requested, hits (served from recent results), coalesced (waited
+        on another session's download), fetched, provider_calls (calls)
+        and throttled_seconds (time spent waiting on the rate limit).
+        """
+        with self._lock:
+            out = dict(self._counters)
+        out["throttled_seconds"] = self.bucket.throttled_seconds
+        return out
+
+    def fetch(self, provider, tickers, start_date, end_date):
+        """Same contract as `PriceProvider.fetch`: returns `(df_comb, report)`."""
+        tickers = list(tickers)
+        rng = (str(start_date), str(end_date))
+
+        close_series = {}
+        failed = {}
+        own = {}
+        waits = {}
+
+        with self._lock:
+            now = self._clock()
+            self._results = {
+                k: v for k, v in self._results.items() if v[0] > now
+            }
+            self._counters["requested"] += len(tickers)
+
+            for t in tickers:
+                key = (provider, t) + rng
+                if key in self._results:
+                    close_series[t] = self._results[key][1]
+                    self._counters["hits"] += 1
+                elif key in self._inflight:
+                    waits[t] = self._inflight[key]
+                    self._counters["coalesced"] += 1
+                else:
+                    own[t] = self._inflight[key] = _Flight()
+
+        if own:
+            self._fetch_own(provider, own, start_date, end_date, rng)
+            for t, flight in own.items():
+                if flight.series is not None:
+                    close_series[t] = flight.series
+                else:
+                    failed[t] = flight.reason
+
+        for t, flight in waits.items():
+            flight.done.wait()
+            if flight.series is not None:
+                close_series[t] = flight.series
+            else:
+                failed[t] = flight.reason
+
+        return combine_close_series(tickers, close_series, failed)
+
+    def _fetch_own(self, provider, own: dict, start_date, end_date, rng):
+        """Download the tickers this call is responsible for and release waiters."""
+        try:
+            self.bucket.acquire()
+            with self._lock:
+                self._counters["provider_calls"] += 1
+                self._counters["fetched"] += len(own)
+
+            df_comb, report = provider.fetch(list(own), start_date, end_date)
+            df_comb = df_comb.set_index("Date")
+
+            for t, flight in own.items():
+                if t in report["valid"]:
+                    flight.series = df_comb[t]
+                else:
+                    flight.reason = report["failed"].get(t, "No price data returned.")
+
+        except Exception as e:
+            for flight in own.values():
+                flight.reason = str(e)
+            raise
+
+        finally:
+            with self._lock:
+                expires = self._clock() + self.result_ttl_seconds
+                for t, flight in own.items():
+                    key = (provider, t) + rng
+                    self._inflight.pop(key, None)
+                    if flight.series is not None and self.result_ttl_seconds > 0:
+                        self._results[key] = (expires, flight.series)
+                    flight.done.set()
+
+
+_default_coordinator = None
+_default_lock = threading.Lock()
+
+
+def get_fetch_coordinator() -> FetchCoordinator:
+    """Return the process-wide `FetchCoordinator`, creating it on first use."""
+    global _default_coordinator
+
+    with _default_lock:
+        if _default_coordinator is None:
+            _default_coordinator = FetchCoordinator()
+        return _default_coordinator
@@ -1,9 +1,9 @@
 import pandas as pd
 import altair as alt
 
-def line_chart(df):
+def line_chart(df, value_col='Closed_price', y_title='Price (Closed)', value_format='.2f'):
     # remove na for plotting
-    df = df.dropna()
+    df = df.dropna(subset=['Date', 'Ticker', value_col])
 
     # Creat a list of the tickers sorted by their latest price
     # The sorted list was grouped by Tickers, with na removed
@@ -12,9 +12,10 @@ def line_chart(df):
     # This is used so the the legend order will follow the end point of the lines
     sorted_list = (
         df
+        .sort_values('Date')
         .groupby('Ticker')
-        .apply(lambda x: x[x['Date'] == x['Date'].max()])
-        .sort_values('Closed_price', ascending=False)
+        .tail(1)
+        .sort_values(value_col, ascending=False)
         ['Ticker']
         .tolist()
         )
@@ -31,7 +32,7 @@ def line_chart(df):
         .mark_line(interpolate='linear')
         .encode(
             alt.X('Date:T').axis(format='%Y-%m-%d').title('Date'),
-            alt.Y('Closed_price:Q').title('Price (Closed)'),
+            alt.Y(f'{value_col}:Q').title(y_title),
             color=alt.Color('Ticker:N',
                         sort=sorted_list).title("Tickers"),
         )
@@ -46,12 +47,12 @@ def line_chart(df):
         .mark_rule()
         .encode(
             x="Date",
-            y="Closed_price",
+            y=value_col,
             opacity=alt.condition(hover, alt.value(0.5), alt.value(0)),
             tooltip=[
                 alt.Tooltip('Date:T', title = 'Date', format = '%Y-%m-%d'),
                 alt.Tooltip('Ticker', title = 'Ticker'),
-                alt.Tooltip('Closed_price', title='Closed Price', format='.2f')
+                alt.Tooltip(value_col, title=y_title, format=value_format)
             ],
             stroke=alt.value('#D4D4D4')
         )
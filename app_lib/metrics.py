@@ -53,6 +53,9 @@ def asset_metrics(
         DataFrame with a date column and asset log-return columns.
     date_col : str
         Name of the date column.
+    trading_days : int
+        Return periods per year used to annualise (252 for daily returns,
+        52 weekly, 12 monthly; see `data_transform.PERIODS_PER_YEAR`).
 
     Returns
     -------
@@ -101,39 +104,18 @@ def asset_metrics(
 
     return metrics
 
-def portfo_metrics(log_return_df: pd.DataFrame, 
-                   allocation_df: pd.DataFrame, 
-                   trading_days: int = 252, 
-                   rf_annual_rate: float = 0.045
-                   ) -> dict: 
+def risk_free_log_return(rf_annual_rate: float, trading_days: int = 252) -> float:
     '''
-    Compute portfolio-level performance metrics from daily log returns 
-    and asset allocation. 
-    Parameters
-    ----------
-    log_return_df : pd.DataFrame
-        DataFrame with daily log returns for assets.
-    allocation_df : pd.DataFrame
-        DataFrame with columns 'Tickers' and 'Allocation Percentage'.
-    trading_days : int
-        Number of trading days in a year (default is 252).
-    rf_annual_rate : float
-        Annual risk-free rate (default is 0.045 for 4.5%).
+    Log return per period of the annual risk-free rate, compounded over
+    `trading_days` periods a year: the Sharpe ratio convention shared by
+    the portfolio metrics and the optimiser.
+    '''
+    return np.log1p((1 + rf_annual_rate) ** (1 / trading_days) - 1)
 
-    Returns
-    -------
-    dict
-        Portfolio-level metrics:
-        - Expected Return (μ)
-        - StdDev (Volatility σ)
-            (ddof = 1) 
-            (* there are arguement between using ddof = 1 or = 0 in finance *)
-        - Sharpe Ratio
-        - Max Drawdown
-        - Cumulative Return
-        - Contribution (log)
-        - Contribution
-        - Contribution Share
+def allocated_returns(log_return_df: pd.DataFrame, allocation_df: pd.DataFrame):
+    '''
+    Log returns of the allocated assets with valid data, on the dates where
+    all of them have a return, and their weights renormalised to sum to 1.
     '''
     # weights
     weights = (
@@ -167,9 +149,51 @@ def portfo_metrics(log_return_df: pd.DataFrame,
             "after dropping NaNs. Check your price / log-return inputs."
         )
 
+    return lr, weights
+
+def portfo_metrics(log_return_df: pd.DataFrame, 
+                   allocation_df: pd.DataFrame, 
+                   trading_days: int = 252, 
+                   rf_annual_rate: float = 0.045,
+                   estimator=None
+                   ) -> dict: 
+    '''
+    Compute portfolio-level performance metrics from daily log returns 
+    and asset allocation. 
+    Parameters
+    ----------
+    log_return_df : pd.DataFrame
+        DataFrame with daily log returns for assets.
+    allocation_df : pd.DataFrame
+        DataFrame with columns 'Tickers' and 'Allocation Percentage'.
+    trading_days : int
+        Number of trading days in a year (default is 252).
+    rf_annual_rate : float
+        Annual risk-free rate (default is 0.045 for 4.5%).
+    estimator : CovarianceEstimator, optional
+        When given (see `covariance.py`, e.g. Ledoit-Wolf or EWMA), the
+        volatility is sqrt(w' Σ w) from its covariance matrix instead of
+        the std of the realised portfolio returns.
+
+    Returns
+    -------
+    dict
+        Portfolio-level metrics:
+        - Expected Return (μ)
+        - StdDev (Volatility σ)
+            (ddof = 1) 
+            (* there are arguement between using ddof = 1 or = 0 in finance *)
+        - Sharpe Ratio
+        - Max Drawdown
+        - Cumulative Return
+        - Contribution (log)
+        - Contribution
+        - Contribution Share
+    '''
+    lr, weights = allocated_returns(log_return_df, allocation_df)
+
     # get daily risk-free ratio
-    rf_daily_rate = (1 + rf_annual_rate) ** (1 / trading_days) - 1
-    rf_daily_log = np.log1p(rf_daily_rate)
+    rf_daily_log = risk_free_log_return(rf_annual_rate, trading_days)
     
     # per-asset contribution
     daily_contrib = lr.mul(weights, axis=1)
@@ -188,7 +212,11 @@ def portfo_metrics(log_return_df: pd.DataFrame,
     # annualised stats
     mu = port_lr.mean() * trading_days
     mu_excess = excess_lr.mean() * trading_days
-    sigma = port_lr.std(ddof=1) * np.sqrt(trading_days)
+    if estimator is None:
+        sigma = port_lr.std(ddof=1) * np.sqrt(trading_days)
+    else:
+        cov = estimator.fit(lr).covariance().loc[weights.index, weights.index]
+        sigma = np.sqrt(weights.to_numpy() @ cov.to_numpy() @ weights.to_numpy() * trading_days)
     sharpe = mu_excess / sigma if sigma > 0 else np.nan
 
     # cumulative stats
@@ -219,5 +247,117 @@ def portfo_metrics(log_return_df: pd.DataFrame,
     }
 
 
+def batch_portfo_metrics(log_return_df: pd.DataFrame,
+                         weights,
+                         trading_days: int = 252,
+                         rf_annual_rate: float = 0.045,
+                         estimator=None,
+                         date_col: str = "Date"
+                         ) -> dict:
+    '''
+    Portfolio metrics of many allocations at once, with the same
+    definitions as `portfo_metrics`.
+
+    All portfolios are evaluated on the same rows: those where every asset
+    in `weights` (with any data) has a log return, as `portfo_metrics`
+    does for an allocation listing all of them. The metrics then come
+    from a few matrix products, so thousands of candidate allocations
+    cost about as much as a handful of `portfo_metrics` calls.
+
+    Parameters
+    ----------
+    log_return_df : pd.DataFrame
+        DataFrame with daily log returns for assets.
+    weights : pd.DataFrame or np.ndarray
+        (n_portfolios x n_assets) allocations, one portfolio per row. A
+        DataFrame names its assets in the columns and its portfolios in
+        the index; an array follows the asset columns of `log_return_df`.
+        Rows are rescaled to sum to 1 (percentages are fine), after
+        dropping assets with no valid data.
+    trading_days : int
+        Number of trading days in a year (default is 252).
+    rf_annual_rate : float
+        Annual risk-free rate (default is 0.045 for 4.5%).
+    estimator : CovarianceEstimator, optional
+        As in `portfo_metrics`; fitted once and shared by all portfolios.
+
+    Returns
+    -------
+    dict
+        The keys of `portfo_metrics`. Scalar metrics are pd.Series indexed
+        by portfolio; "Contribution (log)" and "Contribution Share" are
+        (portfolio x asset) DataFrames.
+    '''
+    if not isinstance(weights, pd.DataFrame):
+        assets = [c for c in log_return_df.columns if c != date_col]
+        weights = pd.DataFrame(np.atleast_2d(weights), columns=assets)
+
+    lr = log_return_df[weights.columns]
+
+    # drop assets with no valid data, then rows with a gap in the rest
+    valid_assets = lr.columns[lr.notna().any()]
+    if len(valid_assets) == 0:
+        raise ValueError("No valid return series found for any of the allocated tickers.")
+
+    lr = lr[valid_assets].dropna(how="any")
+    if lr.empty:
+        raise ValueError(
+            "No overlapping observations across the allocated tickers "
+            "after dropping NaNs. Check your price / log-return inputs."
+        )
+
+    w = weights[valid_assets].to_numpy(dtype=np.float64)
+    totals = w.sum(axis=1, keepdims=True)
+    if (totals == 0).any():
+        raise ValueError("Every portfolio needs a non-zero allocation to an asset with data.")
+    w = w / totals
+
+    r = lr.to_numpy(dtype=np.float64)
+    port_lr = r @ w.T                          # (rows x portfolios)
+
+    # get daily risk-free ratio
+    rf_daily_log = risk_free_log_return(rf_annual_rate, trading_days)
+
+    # annualised stats
+    mu = port_lr.mean(axis=0) * trading_days
+    mu_excess = mu - rf_daily_log * trading_days
+    if estimator is None:
+        sigma = port_lr.std(axis=0, ddof=1) * np.sqrt(trading_days)
+    else:
+        cov = estimator.fit(lr).covariance().loc[valid_assets, valid_assets].to_numpy()
+        sigma = np.sqrt(np.einsum("pi,ij,pj->p", w, cov, w) * trading_days)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = np.where(sigma > 0, mu_excess / sigma, np.nan)
+
+    # drawdown in log space: growth / running max = exp(log growth - its running max)
+    log_growth = np.cumsum(port_lr, axis=0)
+    max_dd = np.exp((log_growth - np.maximum.accumulate(log_growth, axis=0)).min(axis=0)) - 1
+    cum_return_log = log_growth[-1]
+    cum_return = np.exp(cum_return_log) - 1
+
+    # per-asset contribution
+    contrib_log = pd.DataFrame(w * r.sum(axis=0), index=weights.index, columns=valid_assets)
+    cum_contrib_log_sum = contrib_log.sum(axis=1)
+    contrib_share = contrib_log.div(cum_contrib_log_sum, axis=0)
+
+    def series(values):
+        return pd.Series(values, index=weights.index)
+
+    return {
+        "Expected Return (μ)": series(mu),
+        "StdDev (Volatility σ)": series(sigma),
+        "Sharpe Ratio": series(sharpe),
+        "Max Drawdown": series(max_dd),
+        "Cumulative Return": series(cum_return),
+        "Contribution (log)": contrib_log,
+        "Contribution Share": contrib_share,
+
+        # for error check
+        "Cumulative Return (Log)": series(cum_return_log),
+        "Cumulative Contribution (Log) Sum": cum_contrib_log_sum,
+        "Diff": series(cum_return_log) - cum_contrib_log_sum,
+    }
+
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,211 @@
+import numpy as np
+import pandas as pd
+
+from .corr_matrix import _shift_by_mean
+from .metrics import allocated_returns, risk_free_log_return
+
+
+ROLLING_METRICS = [
+    "Annualised Return (μ)",
+    "StdDev (Volatility σ)",
+    "Sharpe Ratio",
+    "Drawdown",
+    "Beta",
+]
+
+
+def _window_sums(x: np.ndarray, window: int) -> np.ndarray:
+    """
+    Sums of `x` (rows x columns) over the trailing `window` rows, for every
+    row, from one cumulative sum: O(rows) whatever the window length.
+    Early rows sum over the rows available so far.
+    """
+    total = np.zeros((len(x) + 1, x.shape[1]))
+    np.cumsum(x, axis=0, out=total[1:])
+    start = np.maximum(np.arange(1, len(x) + 1) - window, 0)
+    return total[1:] - total[start]
+
+
+def _window_max(x: np.ndarray, window: int) -> np.ndarray:
+    """
+    Maximum of `x` over the trailing `window` rows, for every row.
+
+    Van Herk / Gil-Werman: running maxima forward and backward within
+    blocks of `window` rows; a window spans at most two blocks, so its
+    maximum is the larger of one backward and one forward value. Three
+    vectorised passes, O(rows) whatever the window length.
+    """
+    n_rows, n_cols = x.shape
+
+    # -inf padding in front, so row i's window is padded[i:i + window],
+    # and at the back up to a whole number of blocks
+    length = -(-(n_rows + window - 1) // window) * window
+    padded = np.full((length, n_cols), -np.inf)
+    padded[window - 1:window - 1 + n_rows] = x
+    blocks = padded.reshape(-1, window, n_cols)
+
+    forward = np.maximum.accumulate(blocks, axis=1).reshape(length, n_cols)
+    backward = np.maximum.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].reshape(length, n_cols)
+
+    starts = np.arange(n_rows)
+    return np.maximum(backward[starts], forward[starts + window - 1])
+
+
+def _rolling_frame(
+    values: np.ndarray,
+    columns: list,
+    dates,
+    window: int,
+    trading_days: int,
+    rf_annual_rate: float,
+    min_periods: int | None,
+    benchmark: np.ndarray | None,
+    date_col: str,
+) -> pd.DataFrame:
+    """Rolling metrics of the (rows x columns) log returns `values`, as a tidy frame."""
+    if window < 2:
+        raise ValueError("window must be at least 2.")
+    if min_periods is None:
+        min_periods = window
+
+    # shifted by the column means: keeps the sums of squares precise
+    z, mask, shift = _shift_by_mean(values)
+    valid = mask > 0
+
+    count = _window_sums(mask, window)
+    total = _window_sums(z, window)
+    sq = _window_sums(z * z, window)
+
+    enough = count >= max(min_periods, 2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = np.where(enough, total / count + shift, np.nan)
+        var = np.maximum(sq - total * total / count, 0.0) / (count - 1)
+        sd = np.where(enough, np.sqrt(var), np.nan)
+
+        rf_daily_log = risk_free_log_return(rf_annual_rate, trading_days)
+        sharpe = np.where(sd > 0, (mean - rf_daily_log) / sd * np.sqrt(trading_days), np.nan)
+
+    # drawdown from the highest value within the window (missing returns
+    # leave the value unchanged); the value before the window's first
+    # return counts as a peak too
+    level = np.cumsum(np.where(valid, values, 0.0), axis=0)
+    level = np.vstack([np.zeros((1, level.shape[1])), level])
+    peak = _window_max(level, window + 1)[1:]
+    drawdown = np.where(enough, np.exp(level[1:] - peak) - 1, np.nan)
+
+    metrics = {
+        "Annualised Return (μ)": mean * trading_days,
+        "StdDev (Volatility σ)": sd * np.sqrt(trading_days),
+        "Sharpe Ratio": sharpe,
+        "Drawdown": drawdown,
+    }
+
+    if benchmark is not None:
+        # beta over the rows where both the asset and the benchmark have a return
+        b_valid = ~np.isnan(benchmark)
+        both = valid & b_valid[:, None]
+        b = np.where(b_valid, benchmark - np.nanmean(benchmark), 0.0)[:, None]
+        zb = np.where(both, z, 0.0)
+        bb = np.where(both, b, 0.0)
+
+        pair_n = _window_sums(both.astype(np.float64), window)
+        sum_a = _window_sums(zb, window)
+        sum_b = _window_sums(bb, window)
+        cross = _window_sums(zb * bb, window)
+        sq_b = _window_sums(bb * bb, window)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cov = cross - sum_a * sum_b / pair_n
+            var_b = sq_b - sum_b * sum_b / pair_n
+            beta = np.where((pair_n >= max(min_periods, 2)) & (var_b > 0), cov / var_b, np.nan)
+        metrics["Beta"] = beta
+
+    n_rows, n_cols = values.shape
+    return pd.DataFrame({
+        date_col: np.tile(np.asarray(dates), n_cols),
+        "Ticker": np.repeat(np.asarray(columns, dtype=object), n_rows),
+        **{name: m.T.ravel() for name, m in metrics.items()},
+    })
+
+
+def rolling_asset_metrics(
+    log_returns: pd.DataFrame,
+    window: int = 63,
+    date_col: str = "Date",
+    trading_days: int = 252,
+    rf_annual_rate: float = 0.045,
+    benchmark: str | None = None,
+    min_periods: int | None = None,
+) -> pd.DataFrame:
+    """
+    Rolling per-asset metrics over the trailing `window` return periods.
+
+    Every metric comes from window sums of cumulative sums (and a sliding
+    maximum for the drawdown), computed for all assets at once, so the
+    cost is O(rows x assets) whatever the window length, unlike
+    `rolling().apply`.
+
+    Parameters
+    ----------
+    log_returns : pd.DataFrame
+        DataFrame with a date column and asset log-return columns.
+    window : int
+        Window length in return periods (63 ~ a quarter of daily returns).
+    trading_days : int
+        Return periods per year used to annualise (see `asset_metrics`).
+    rf_annual_rate : float
+        Annual risk-free rate for the Sharpe ratio, as in `portfo_metrics`.
+    benchmark : str, optional
+        Column of `log_returns` to compute each asset's rolling beta against.
+    min_periods : int, optional
+        Valid returns a window needs for a value (default `window`).
+
+    Returns
+    -------
+    pd.DataFrame
+        Tidy frame, one row per date and ticker, with the date, "Ticker" and
+        the metrics (see `ROLLING_METRICS`; "Beta" only with a benchmark):
+        annualised mean log return and volatility (ddof = 1), Sharpe ratio,
+        and drawdown from the highest value within the window. Ready for
+        `line_chart(df, value_col=<metric>)`.
+    """
+    columns = [c for c in log_returns.columns if c != date_col]
+    values = log_returns[columns].to_numpy(dtype=np.float64, na_value=np.nan)
+    bench = None if benchmark is None else log_returns[benchmark].to_numpy(dtype=np.float64, na_value=np.nan)
+
+    return _rolling_frame(
+        values, columns, pd.to_datetime(log_returns[date_col]),
+        window, trading_days, rf_annual_rate, min_periods, bench, date_col,
+    )
+
+
+def rolling_portfo_metrics(
+    log_return_df: pd.DataFrame,
+    allocation_df: pd.DataFrame,
+    window: int = 63,
+    date_col: str = "Date",
+    trading_days: int = 252,
+    rf_annual_rate: float = 0.045,
+    benchmark: str | None = None,
+    min_periods: int | None = None,
+    name: str = "Portfolio",
+) -> pd.DataFrame:
+    """
+    Rolling metrics of the portfolio, on the same rows and weights as
+    `portfo_metrics` (dates where all allocated assets have a return).
+
+    Same output as `rolling_asset_metrics`, with `name` as the ticker, so
+    the two frames can be concatenated for one chart.
+    """
+    lr, weights = allocated_returns(log_return_df, allocation_df)
+    port_lr = lr.to_numpy(dtype=np.float64) @ weights.to_numpy()
+
+    dates = log_return_df.loc[lr.index, date_col]
+    bench = None
+    if benchmark is not None:
+        bench = log_return_df.loc[lr.index, benchmark].to_numpy(dtype=np.float64, na_value=np.nan)
+
+    return _rolling_frame(
+        port_lr[:, None], [name], pd.to_datetime(dates),
+        window, trading_days, rf_annual_rate, min_periods, bench, date_col,
+    )
@@ -0,0 +1,313 @@
+import numpy as np
+import pandas as pd
+from scipy.optimize import minimize
+
+from .covariance import SampleCovariance
+from .metrics import allocated_returns, risk_free_log_return
+
+
+def _active_set_qp(P, q, A, lo, hi, w, max_iter: int = 1_000):
+    """
+    Minimise 0.5 w'Pw + q'w subject to A x = A w and lo <= x <= hi, for a
+    start `w` within the bounds (its values of A w are the constraints).
+
+    Primal active-set method (Nocedal & Wright, Algorithm 16.3) over the
+    bound constraints. The bounds that are
+    active at `w` form the first working set, so a start close to the
+    solution (e.g. the previous frontier point) needs only a few steps.
+    """
+    n, m = len(w), A.shape[0]
+    w = w.copy()
+    scale = max(1.0, np.abs(P).max(), np.abs(q).max())
+    tol = 1e-10 * scale
+
+    # -1: held at its lower bound, 1: at its upper bound, 0: free
+    fixed = np.zeros(n, dtype=int)
+    fixed[w >= hi - 1e-12] = 1
+    fixed[w <= lo + 1e-12] = -1
+
+    for _ in range(max_iter):
+        free = np.flatnonzero(fixed == 0)
+        g = P @ w + q
+
+        # step on the free weights that solves the equality-constrained QP
+        kkt = np.zeros((len(free) + m, len(free) + m))
+        kkt[:len(free), :len(free)] = P[np.ix_(free, free)]
+        kkt[:len(free), len(free):] = A[:, free].T
+        kkt[len(free):, :len(free)] = A[:, free]
+        rhs = np.concatenate([-g[free], np.zeros(m)])
+        try:
+            sol = np.linalg.solve(kkt, rhs)
+        except np.linalg.LinAlgError:
+            sol = np.linalg.lstsq(kkt, rhs, rcond=None)[0]
+        step, nu = sol[:len(free)], sol[len(free):]
+
+        if np.abs(step).max(initial=0.0) <= 1e-12:
+            # stationary on the working set: drop the bound whose
+            # multiplier has the wrong sign, or stop
+            reduced = g + A.T @ nu
+            wrong = np.where(fixed == -1, -reduced, np.where(fixed == 1, reduced, 0.0))
+            j = np.argmax(wrong)
+            if wrong[j] <= tol:
+                return w
+            fixed[j] = 0
+            continue
+
+        # longest step that keeps every free weight within its bounds
+        w_free = w[free]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            room = np.where(
+                step > 0, (hi[free] - w_free) / step,
+                np.where(step < 0, (lo[free] - w_free) / step, np.inf),
+            )
+        k = np.argmin(room)
+        alpha = min(1.0, room[k])
+
+        w[free] = w_free + alpha * step
+        if alpha < 1.0:
+            j = free[k]
+            fixed[j] = 1 if step[k] > 0 else -1
+            w[j] = hi[j] if step[k] > 0 else lo[j]
+
+    return w
+
+
+class PortfolioOptimizer:
+    """
+    Efficient frontier, minimum-variance, maximum-Sharpe and risk-parity
+    allocations over the assets of an allocation table.
+
+    Expected returns and the covariance are estimated once, from the same
+    rows and with the same conventions as `portfo_metrics` (annualised
+    mean log return, covariance from `estimator`, sample by default), and
+    shared by every solve. Weights are fully invested and each stays
+    within its bounds, in percent as in the app's data editor (0-100 by
+    default). Allocations come back as a "Tickers" / "Allocation
+    Percentage" table, ready for `portfo_metrics` or the data editor.
+
+    Parameters
+    ----------
+    log_return_df : pd.DataFrame
+        DataFrame with daily log returns for assets.
+    allocation_df : pd.DataFrame
+        Allocation table; only its 'Tickers' are used.
+    trading_days : int
+        Number of trading days in a year (default is 252).
+    rf_annual_rate : float
+        Annual risk-free rate for the Sharpe ratio (default is 0.045).
+    estimator : CovarianceEstimator, optional
+        Covariance estimator (see `covariance.py`).
+    min_pct, max_pct : float or pd.Series
+        Per-asset bounds in percent; a Series is indexed by ticker.
+    """
+
+    def __init__(
+        self,
+        log_return_df: pd.DataFrame,
+        allocation_df: pd.DataFrame,
+        trading_days: int = 252,
+        rf_annual_rate: float = 0.045,
+        estimator=None,
+        min_pct=0.0,
+        max_pct=100.0,
+    ):
+        lr, weights = allocated_returns(
+            log_return_df, allocation_df.assign(**{"Allocation Percentage": 1.0})
+        )
+        self.tickers = list(weights.index)
+        self.mu = lr.mean().to_numpy() * trading_days
+        self.cov = (estimator or SampleCovariance()).fit(lr).covariance().to_numpy() * trading_days
+
+        self.rf = risk_free_log_return(rf_annual_rate, trading_days) * trading_days
+
+        def bound(pct):
+            if isinstance(pct, pd.Series):
+                pct = pct.reindex(self.tickers)
+            return np.broadcast_to(np.asarray(pct, dtype=np.float64) / 100, (len(self.tickers),)).copy()
+
+        self.lo, self.hi = bound(min_pct), bound(max_pct)
+        if (self.lo > self.hi).any() or self.lo.sum() > 1 + 1e-12 or self.hi.sum() < 1 - 1e-12:
+            raise ValueError("The bounds leave no fully invested allocation.")
+
+        # tiny ridge: keeps the solves well posed when the covariance is
+        # singular (fewer rows than assets)
+        n = len(self.tickers)
+        self._P = self.cov + 1e-12 * np.trace(self.cov) / n * np.eye(n)
+        self._min_var = None
+        self._max_ret = None
+
+    # ---- helpers
+
+    def _table(self, w) -> pd.DataFrame:
+        return pd.DataFrame({"Tickers": self.tickers, "Allocation Percentage": w * 100})
+
+    def _stats(self, w):
+        ret = self.mu @ w
+        vol = np.sqrt(max(w @ self.cov @ w, 0.0))
+        sharpe = (ret - self.rf) / vol if vol > 0 else np.nan
+        return ret, vol, sharpe
+
+    def _feasible_start(self):
+        # fill every asset's room above its lower bound in the same proportion
+        room = self.hi - self.lo
+        return self.lo + room * (1 - self.lo.sum()) / room.sum() if room.sum() > 0 else self.lo.copy()
+
+    def _min_variance_weights(self):
+        if self._min_var is None:
+            n = len(self.tickers)
+            self._min_var = _active_set_qp(
+                self._P, np.zeros(n), np.ones((1, n)), self.lo, self.hi, self._feasible_start(),
+            )
+        return self._min_var
+
+    def _max_return_weights(self):
+        # a linear programme: fill the highest-returning assets first
+        if self._max_ret is None:
+            w = self.lo.copy()
+            left = 1 - w.sum()
+            for i in np.argsort(-self.mu, kind="stable"):
+                add = min(self.hi[i] - self.lo[i], left)
+                w[i] += add
+                left -= add
+            self._max_ret = w
+        return self._max_ret
+
+    def _frontier_point(self, target, below):
+        """
+        Minimum-variance weights with expected return `target`, warm-started
+        from `below`, a solved point whose return is at most `target`.
+        """
+        top = self._max_return_weights()
+        r_below, r_top = self.mu @ below, self.mu @ top
+
+        # a mix of two feasible points is feasible, and hits the target
+        alpha = 0.0 if r_top - r_below <= 1e-15 else np.clip((target - r_below) / (r_top - r_below), 0.0, 1.0)
+        start = (1 - alpha) * below + alpha * top
+
+        A = np.vstack([np.ones(len(self.tickers)), self.mu])
+        return _active_set_qp(self._P, np.zeros(len(self.tickers)), A, self.lo, self.hi, start)
+
+    # ---- allocations
+
+    def stats(self, allocation_df: pd.DataFrame) -> pd.Series:
+        """Expected return, volatility and Sharpe ratio of an allocation table, on these estimates."""
+        weights = allocation_df.set_index("Tickers")["Allocation Percentage"].reindex(self.tickers, fill_value=0)
+        w = weights.to_numpy(dtype=np.float64) / weights.sum()
+        return pd.Series(
+            self._stats(w), index=["Expected Return (μ)", "StdDev (Volatility σ)", "Sharpe Ratio"]
+        )
+
+    def min_variance(self) -> pd.DataFrame:
+        """The fully invested allocation with the lowest volatility."""
+        return self._table(self._min_variance_weights())
+
+    def efficient_frontier(self, n_points: int = 50) -> pd.DataFrame:
+        """
+        `n_points` frontier portfolios, evenly spaced in expected return from
+        the minimum-variance portfolio up to the highest attainable return.
+
+        Each point is warm-started from the previous one, so most solves
+        take a handful of active-set steps.
+
+        Returns
+        -------
+        pd.DataFrame
+            One row per point: "Expected Return (μ)", "StdDev (Volatility
+            σ)", "Sharpe Ratio", then the weight of each ticker in percent.
+        """
+        w = self._min_variance_weights()
+        targets = np.linspace(self.mu @ w, self.mu @ self._max_return_weights(), n_points)
+
+        rows = []
+        for i, target in enumerate(targets):
+            if i > 0:
+                w = self._frontier_point(target, w)
+            rows.append((*self._stats(w), *(w * 100)))
+
+        return pd.DataFrame(
+            rows,
+            columns=["Expected Return (μ)", "StdDev (Volatility σ)", "Sharpe Ratio", *self.tickers],
+        )
+
+    def max_sharpe(self, tol: float = 1e-6) -> pd.DataFrame:
+        """
+        The frontier allocation with the highest Sharpe ratio, using the
+        same risk-free convention as `portfo_metrics`.
+
+        The Sharpe ratio is unimodal along the efficient frontier, so a
+        golden-section search over the target return finds it; every
+        evaluation is a warm-started frontier solve.
+        """
+        base = self._min_variance_weights()
+        lo_r, hi_r = self.mu @ base, self.mu @ self._max_return_weights()
+
+        solved = {}
+
+        def sharpe(target):
+            # warm start from the nearest solved point below the target
+            below = max((t for t in solved if t <= target), default=None)
+            w = self._frontier_point(target, base if below is None else solved[below])
+            solved[target] = w
+            return self._stats(w)[2]
+
+        ratio = (np.sqrt(5) - 1) / 2
+        a, b = lo_r, hi_r
+        c, d = b - ratio * (b - a), a + ratio * (b - a)
+        fc, fd = sharpe(c), sharpe(d)
+        while b - a > tol * max(1.0, abs(hi_r - lo_r)):
+            if fc >= fd:
+                b, d, fd = d, c, fc
+                c = b - ratio * (b - a)
+                fc = sharpe(c)
+            else:
+                a, c, fc = c, d, fd
+                d = a + ratio * (b - a)
+                fd = sharpe(d)
+
+        # the ends of the frontier can beat the interior (e.g. one asset)
+        candidates = [base, self._max_return_weights(), *solved.values()]
+        best = max(candidates, key=lambda w: np.nan_to_num(self._stats(w)[2], nan=-np.inf))
+        return self._table(best)
+
+    def risk_parity(self, max_iter: int = 100) -> pd.DataFrame:
+        """
+        The allocation where every asset contributes the same share of the
+        portfolio variance (w_i (Σw)_i equal for all i).
+
+        Solved by Newton's method on the convex problem
+        min 0.5 y'Σy - sum(log y_i) / n, whose solution, rescaled to sum to
+        1, has equal risk contributions (Spinu, 2013); it is long-only by
+        construction. If it breaks the bounds, the bounded allocation whose
+        risk contributions are closest to equal is used instead.
+        """
+        n = len(self.tickers)
+        budget = np.full(n, 1 / n)
+        y = 1 / np.sqrt(np.diag(self._P))
+
+        for _ in range(max_iter):
+            grad = self._P @ y - budget / y
+            hess = self._P + np.diag(budget / y ** 2)
+            step = np.linalg.solve(hess, -grad)
+
+            # stay strictly positive
+            t = 1.0
+            while (y + t * step <= 0).any():
+                t /= 2
+            y = y + t * step
+            if np.abs(grad).max() <= 1e-12 * np.abs(self._P).max():
+                break
+
+        w = y / y.sum()
+        if ((w >= self.lo - 1e-9) & (w <= self.hi + 1e-9)).all():
+            return self._table(w)
+
+        def spread(w):
+            contrib = w * (self._P @ w)
+            return ((contrib / contrib.sum() - budget) ** 2).sum()
+
+        result = minimize(
+            spread, np.clip(w, self.lo, self.hi), method="SLSQP",
+            bounds=list(zip(self.lo, self.hi)),
+            constraints=[{"type": "eq", "fun": lambda w: w.sum() - 1}],
+        )
+        return self._table(result.x)
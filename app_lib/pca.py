@@ -0,0 +1,250 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from .covariance import _complete_returns
+
+
+@dataclass
+class PCAResult:
+    """
+    Top principal components of a correlation matrix.
+
+    `eigenvalues` are in decreasing order and `loadings` holds the matching
+    eigenvectors as columns (PC1, PC2, ...), signed so that each loads
+    positively on the assets overall (PC1 is then the "market factor").
+    `total_variance` is the trace of the correlation matrix, i.e. the
+    number of assets with a non-zero variance.
+    """
+    eigenvalues: np.ndarray
+    loadings: pd.DataFrame
+    total_variance: float
+
+    @property
+    def explained(self) -> pd.Series:
+        """Share of the total variance explained by each component."""
+        return pd.Series(self.eigenvalues / self.total_variance, index=self.loadings.columns)
+
+    def absorption_ratio(self, n_components: int | None = None) -> float:
+        """
+        Share of the total variance absorbed by the first `n_components`
+        (default: all computed components), after Kritzman et al. (2010),
+        "Principal components as a measure of systemic risk", who use a
+        fifth of the assets. High values mean the assets move together.
+        """
+        if n_components is None:
+            n_components = len(self.eigenvalues)
+        if n_components > len(self.eigenvalues):
+            raise ValueError(
+                f"Only {len(self.eigenvalues)} components were computed; "
+                "increase k for a larger absorption ratio."
+            )
+        return float(self.eigenvalues[:n_components].sum() / self.total_variance)
+
+    def top_loadings(self, component: str = "PC1", n: int = 10) -> pd.Series:
+        """The `n` assets with the largest absolute loading on `component`."""
+        loading = self.loadings[component]
+        return loading.loc[loading.abs().sort_values(ascending=False).index[:n]]
+
+
+def _top_eigh(
+    matvec,
+    n: int,
+    k: int,
+    oversample: int = 10,
+    n_iter: int = 4,
+    seed=None,
+    start: np.ndarray | None = None,
+):
+    """
+    Top `k` eigenpairs of a symmetric positive semi-definite (n x n) matrix
+    A, given only `matvec(X) = A @ X`.
+
+    Randomized subspace iteration (Halko, Martinsson & Tropp, 2011): A is
+    applied to a block of k + oversample vectors `n_iter` + 2 times, and the
+    small projected matrix is solved exactly. `start` (e.g. the previous
+    window's eigenvectors) replaces the first random vectors, so a good
+    guess needs fewer iterations.
+    """
+    size = min(n, k + oversample)
+    rng = np.random.default_rng(seed)
+
+    block = rng.standard_normal((n, size))
+    if start is not None:
+        m = min(start.shape[1], size)
+        block[:, :m] = start[:, :m]
+
+    q, _ = np.linalg.qr(matvec(block))
+    for _ in range(n_iter):
+        q, _ = np.linalg.qr(matvec(q))
+
+    # Rayleigh-Ritz on the subspace
+    small = q.T @ matvec(q)
+    values, vectors = np.linalg.eigh((small + small.T) / 2)
+
+    top = np.argsort(values)[::-1][:k]
+    return np.maximum(values[top], 0.0), q @ vectors[:, top]
+
+
+def _result(values, vectors, columns, total_variance) -> PCAResult:
+    # a component's sign is arbitrary: point each one towards the assets
+    signs = np.where(vectors.sum(axis=0) < 0, -1.0, 1.0)
+    names = [f"PC{i + 1}" for i in range(len(values))]
+
+    return PCAResult(
+        eigenvalues=values,
+        loadings=pd.DataFrame(vectors * signs, index=columns, columns=names),
+        total_variance=float(total_variance),
+    )
+
+
+def corr_pca(
+    corr: pd.DataFrame,
+    k: int = 10,
+    oversample: int = 10,
+    n_iter: int = 4,
+    seed=0,
+) -> PCAResult:
+    """
+    Top `k` principal components of a correlation matrix (as from
+    `corr_matrix`), without a full eigen-decomposition.
+
+    Uses a randomized truncated eigensolver, so a 5,000 x 5,000 matrix
+    costs a few products with an (n x (k + oversample)) block rather than
+    an O(n^3) `np.linalg.eigh`. Assets with no variance (NaN diagonal)
+    are left out, and NaN pairs are treated as uncorrelated.
+
+    Parameters
+    ----------
+    k : int
+        Number of components.
+    oversample : int
+        Extra vectors carried along for accuracy.
+    n_iter : int
+        Power iterations; more sharpen the smaller components.
+    seed :
+        Seed of the random start, for reproducible results.
+    """
+    keep = ~np.isnan(np.diag(corr.to_numpy(dtype=np.float64)))
+    values = np.nan_to_num(corr.to_numpy(dtype=np.float64)[np.ix_(keep, keep)], nan=0.0)
+    columns = corr.index[keep]
+    k = min(k, len(columns))
+
+    eigenvalues, vectors = _top_eigh(lambda x: values @ x, len(columns), k, oversample, n_iter, seed)
+    return _result(eigenvalues, vectors, columns, np.trace(values))
+
+
+def _standardize(values: np.ndarray):
+    """Columns scaled to mean 0 and std 1 (ddof = 1); zero-variance columns dropped."""
+    centred = values - values.mean(axis=0)
+    sd = centred.std(axis=0, ddof=1)
+    keep = sd > 0
+    return centred[:, keep] / sd[keep], keep
+
+
+def returns_pca(
+    returns: pd.DataFrame,
+    k: int = 10,
+    date_col: str = "Date",
+    oversample: int = 10,
+    n_iter: int = 4,
+    seed=0,
+) -> PCAResult:
+    """
+    Top `k` principal components of the correlation of a return frame
+    (Date + one column per asset), straight from the returns.
+
+    The correlation matrix is Z'Z / (T - 1) for the standardized returns Z
+    (T rows), so the solver applies it as two thin products and never
+    forms the n x n matrix: O(T * n * k) time and O(T * n) memory. As for
+    the covariance estimators, only rows where every asset has a return
+    are used. See `corr_pca` for the other parameters.
+    """
+    columns, values = _complete_returns(returns, date_col)
+    z, keep = _standardize(values)
+    columns = [c for c, kept in zip(columns, keep) if kept]
+    k = min(k, len(columns))
+
+    scale = 1.0 / (len(z) - 1)
+    eigenvalues, vectors = _top_eigh(lambda x: z.T @ (z @ x) * scale, len(columns), k, oversample, n_iter, seed)
+    return _result(eigenvalues, vectors, columns, len(columns))
+
+
+def rolling_pca(
+    returns: pd.DataFrame,
+    window: int,
+    k: int = 10,
+    n_components: int | None = None,
+    step: int = 1,
+    date_col: str = "Date",
+    n_iter: int = 2,
+    seed=0,
+) -> pd.DataFrame:
+    """
+    Market-factor share and absorption ratio over a rolling window of
+    `window` rows, as a daily regime indicator.
+
+    Each window is decomposed as in `returns_pca`, over the assets with a
+    return on every date of the window (so a late listing joins once it
+    has a full window). Consecutive windows share almost all their rows,
+    so each solve starts from the previous window's eigenvectors and
+    needs only `n_iter` power iterations (cold starts use at least 4).
+
+    Parameters
+    ----------
+    k : int
+        Components computed per window (at least `n_components`).
+    n_components : int, optional
+        Components in the absorption ratio (default `k`).
+    step : int
+        Compute every `step`-th date only (e.g. 5 for weekly on daily data).
+
+    Returns
+    -------
+    pd.DataFrame
+        Indexed by the window's end date, with columns "Market Factor
+        Share" (PC1's share of the variance) and "Absorption Ratio", from
+        the first full window on. Windows with no complete asset are
+        left out.
+    """
+    if window < 3:
+        raise ValueError("window must be at least 3.")
+    if step < 1:
+        raise ValueError("step must be at least 1.")
+
+    columns = [c for c in returns.columns if c != date_col]
+    values = returns[columns].to_numpy(dtype=np.float64, na_value=np.nan)
+    dates = pd.to_datetime(returns[date_col])
+    if n_components is not None:
+        k = max(k, n_components)
+
+    rows = []
+    previous, previous_assets = None, None
+
+    for end in range(window, len(values) + 1, step):
+        # assets with a return on every date of the window
+        block = values[end - window:end]
+        complete = ~np.isnan(block).any(axis=0)
+        z, keep = _standardize(block[:, complete])
+        assets = np.flatnonzero(complete)[keep]
+        n = len(assets)
+        if n == 0:
+            continue
+
+        # warm start only makes sense on the same assets
+        start = previous if np.array_equal(assets, previous_assets) else None
+        scale = 1.0 / (window - 1)
+        eigenvalues, vectors = _top_eigh(
+            lambda x: z.T @ (z @ x) * scale, n, min(k, n),
+            n_iter=n_iter if start is not None else max(n_iter, 4), seed=seed, start=start,
+        )
+        previous, previous_assets = vectors, assets
+
+        result = _result(eigenvalues, vectors, [columns[i] for i in assets], n)
+        absorbed = result.absorption_ratio(None if n_components is None else min(n_components, n))
+        rows.append((dates.iloc[end - 1], result.explained.iloc[0], absorbed))
+
+    return pd.DataFrame(
+        rows, columns=[date_col, "Market Factor Share", "Absorption Ratio"]
+    ).set_index(date_col)
@@ -0,0 +1,365 @@
+import os
+import random
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import yfinance as yf
+
+
+class PriceDownloadError(RuntimeError):
+    """Raised when we cannot obtain enough valid price series to proceed."""
+    pass
+
+
+NO_DATA_REASON = "No close price data returned (possible rate-limit, invalid ticker, or delisted)."
+DOWNLOAD_FAILED_REASON = "Price download failed"
+
+
+def is_transient_failure(reason: str) -> bool:
+    """True for failures of the download itself rather than of the ticker."""
+    return str(reason).startswith(DOWNLOAD_FAILED_REASON)
+
+
+def combine_close_series(tickers, close_series: dict, failed: dict, dtype=None):
+    """
+    Assemble per-ticker close series into the `(df_comb, report)` pair
+    shared by every provider.
+
+    `df_comb` has a Date column + one column per valid ticker (in the
+    requested order). With no valid ticker it is an empty frame with
+    only the Date column. `dtype` (e.g. "float32") is applied to each
+    series before the concat, so the wide frame is never built in float64.
+    """
+    valid = [t for t in tickers if t in close_series]
+
+    if len(valid) == 0:
+        df_comb = pd.DataFrame(columns=["Date"])
+    else:
+        series = [close_series[t] for t in valid]
+        if dtype is not None:
+            series = [s.astype(dtype) for s in series]
+
+        df_comb = pd.concat(series, axis=1, sort=True).reset_index()
+
+        # Ensure the date column is named consistently
+        # yfinance uses 'Date' for regular prices, but sometimes it's 'index'
+        if "Date" not in df_comb.columns:
+            df_comb = df_comb.rename(columns={df_comb.columns[0]: "Date"})
+
+    report = {
+        "requested": list(tickers),
+        "valid": valid,
+        "failed": {t: failed[t] for t in tickers if t in failed},
+    }
+
+    return df_comb, report
+
+
+class PriceProvider(ABC):
+    """
+    Base class for close-price sources used by `ticker_closed_price`.
+
+    Subclasses implement `fetch(tickers, start_date, end_date)` for an
+    already normalised, de-duplicated ticker list and return
+    `(df_comb, report)` as built by `combine_close_series`. Date ranges
+    are half-open: `end_date` is exclusive, as in yfinance.
+
+    `price_field` names the price column served (e.g. "Close" or
+    "Adj Close") and `dtype` the dtype of the price columns (None keeps
+    float64).
+    """
+
+    price_field = "Close"
+    dtype = None
+
+    @abstractmethod
+    def fetch(self, tickers, start_date, end_date):
+        """Close prices of `tickers` over [start_date, end_date), as `(df_comb, report)`."""
+
+
+def backoff_delay(attempt: int, base_seconds: float, max_seconds: float) -> float:
+    """
+    Exponential backoff with jitter: half of `base * 2**(attempt-1)` is
+    fixed, the other half random, so parallel retries do not line up.
+    """
+    delay = min(max_seconds, base_seconds * 2 ** (attempt - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def _extract_close(df: pd.DataFrame, tickers, price_field: str = "Close", dtype=None):
+    """
+    Split a `yf.download(group_by="ticker")` frame into per-ticker series
+    of `price_field`.
+
+    The requested field is projected out first (the full OHLCV panel is
+    about six times larger), and cast to `dtype` before the per-ticker
+    checks.
+    """
+    close_series = {}
+    failed = {}
+
+    # yfinance returns different shapes depending on number of tickers.
+    # For multi-ticker: df[ticker]["Close"] works (columns are MultiIndex).
+    # For single ticker: df["Close"] is a Series/column.
+    is_multi = isinstance(df.columns, pd.MultiIndex)
+
+    try:
+        if is_multi:
+            # MultiIndex columns: (ticker, OHLCV)
+            prices = df.xs(price_field, axis=1, level=1)
+        else:
+            # Single ticker shape
+            prices = pd.DataFrame({t: df[price_field] for t in tickers})
+    except Exception as e:
+        return {}, {t: f"Failed to extract close prices: {e}" for t in tickers}
+
+    if dtype is not None:
+        prices = prices.astype(dtype)
+
+    for t in tickers:
+        if t not in prices.columns:
+            failed[t] = f"Failed to extract close prices: {t!r} not in the download."
+            continue
+
+        s = prices[t].rename(t)
+
+        # Validate the series has any usable data
+        if s.isna().all():
+            failed[t] = NO_DATA_REASON
+            continue
+
+        close_series[t] = s
+
+    return close_series, failed
+
+
+class YFinanceProvider(PriceProvider):
+    """
+    Close prices from Yahoo Finance via `yfinance.download`.
+
+    By default the whole ticker list is downloaded in one call, and the
+    call is retried as a whole when it raises.
+
+    With `chunk_size` set, tickers are split into chunks downloaded in
+    parallel on a pool of `max_workers` threads. Each chunk retries on its
+    own, and after a partial success only the tickers that came back
+    empty are retried, so one bad symbol or one rate-limited chunk does
+    not cost a re-download of the whole basket.
+
+    Retries wait with jittered exponential backoff starting at
+    `retry_sleep_seconds` and capped at `max_backoff_seconds`.
+
+    Only `price_field` is kept from each download, cast to `dtype`.
+    """
+
+    def __init__(
+        self,
+        max_retries: int = 3,
+        retry_sleep_seconds: float = 2.0,
+        chunk_size: int | None = None,
+        max_workers: int = 4,
+        max_backoff_seconds: float = 30.0,
+        price_field: str = "Close",
+        dtype=None,
+    ):
+        if chunk_size is not None and chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1.")
+
+        self.max_retries = max_retries
+        self.retry_sleep_seconds = retry_sleep_seconds
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+        self.max_backoff_seconds = max_backoff_seconds
+        self.price_field = price_field
+        self.dtype = dtype
+
+    def _sleep(self, attempt: int):
+        time.sleep(backoff_delay(attempt, self.retry_sleep_seconds, self.max_backoff_seconds))
+
+    def _download_once(self, tickers, start_date, end_date):
+        return yf.download(
+            tickers=tickers,
+            start=start_date,
+            end=end_date,
+            group_by="ticker",
+            auto_adjust=False,
+            progress=False,
+            threads=True,
+        )
+
+    def _download(self, tickers, start_date, end_date):
+        last_err = None
+        df = None
+
+        # ---- download (retry on transient failures)
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                df = self._download_once(tickers, start_date, end_date)
+                last_err = None
+                break
+            except Exception as e:
+                last_err = e
+                if attempt < self.max_retries:
+                    self._sleep(attempt)
+
+        if df is None or last_err is not None:
+            raise PriceDownloadError(
+                f"{DOWNLOAD_FAILED_REASON} after {self.max_retries} retries. "
+                f"Details: {last_err}"
+            )
+
+        return df
+
+    def _fetch_chunk(self, chunk, start_date, end_date):
+        """Download one chunk, retrying only the tickers still missing."""
+        close_series = {}
+        failed = {}
+        pending = list(chunk)
+
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                # extract straight from the call so the OHLCV panel is freed early
+                got, missing = _extract_close(
+                    self._download_once(pending, start_date, end_date),
+                    pending, self.price_field, self.dtype,
+                )
+            except Exception as e:
+                failed.update({t: f"{DOWNLOAD_FAILED_REASON}: {e}" for t in pending})
+            else:
+                close_series.update(got)
+                failed.update(missing)
+
+            pending = [t for t in pending if t not in close_series]
+            if len(pending) == 0 or attempt == self.max_retries:
+                break
+            self._sleep(attempt)
+
+        failed = {t: reason for t, reason in failed.items() if t not in close_series}
+        return close_series, failed
+
+    def _fetch_chunked(self, tickers, start_date, end_date):
+        chunks = [
+            tickers[i:i + self.chunk_size]
+            for i in range(0, len(tickers), self.chunk_size)
+        ]
+
+        close_series = {}
+        failed = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = [
+                pool.submit(self._fetch_chunk, chunk, start_date, end_date)
+                for chunk in chunks
+            ]
+            for future in futures:
+                chunk_series, chunk_failed = future.result()
+                close_series.update(chunk_series)
+                failed.update(chunk_failed)
+
+        return combine_close_series(tickers, close_series, failed, self.dtype)
+
+    def fetch(self, tickers, start_date, end_date):
+        tickers = list(tickers)
+
+        if self.chunk_size is not None:
+            return self._fetch_chunked(tickers, start_date, end_date)
+
+        close_series, failed = _extract_close(
+            self._download(tickers, start_date, end_date),
+            tickers, self.price_field, self.dtype,
+        )
+
+        return combine_close_series(tickers, close_series, failed, self.dtype)
+
+
+_READERS = {
+    ".csv": pd.read_csv,
+    ".parquet": pd.read_parquet,
+    ".arrow": pd.read_feather,
+    ".feather": pd.read_feather,
+}
+
+
+def _read_price_file(path: str, keep=None) -> pd.DataFrame:
+    """
+    Read a price file indexed by Date. With `keep` (a set of column
+    names) only those columns are kept; CSVs skip the others while parsing.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in _READERS:
+        raise ValueError(f"Unsupported price file type: {path}")
+
+    if keep is not None and ext == ".csv":
+        df = pd.read_csv(path, usecols=lambda c: c == "Date" or c in keep)
+    else:
+        df = _READERS[ext](path)
+        if keep is not None:
+            df = df[[c for c in df.columns if c == "Date" or c in keep]]
+
+    df["Date"] = pd.to_datetime(df["Date"])
+    return df.set_index("Date").sort_index()
+
+
+class LocalFileProvider(PriceProvider):
+    """
+    Close prices read from local files, for offline runs and load tests.
+
+    `path` can be either:
+    - a single wide file (Date + one column per ticker), e.g. an export of
+      the `price_history` sheet; or
+    - a directory of per-ticker files named `<TICKER>.csv`, `.parquet`,
+      `.arrow` or `.feather`, each with a Date column and a `price_field`
+      column (or a column named after the ticker).
+
+    Only the Date and requested price columns are kept from each file.
+    """
+
+    def __init__(self, path: str, price_field: str = "Close", dtype=None):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Price data path not found: {path}")
+        self.path = str(path)
+        self.price_field = price_field
+        self.dtype = dtype
+
+    def _ticker_file(self, ticker: str):
+        for ext in _READERS:
+            candidate = os.path.join(self.path, ticker + ext)
+            if os.path.isfile(candidate):
+                return candidate
+        return None
+
+    def fetch(self, tickers, start_date, end_date):
+        start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+
+        close_series = {}
+        failed = {}
+
+        wide = None
+        if os.path.isfile(self.path):
+            wide = _read_price_file(self.path, keep=set(tickers))
+
+        for t in tickers:
+            if wide is not None:
+                if t not in wide.columns:
+                    failed[t] = "Ticker not found in local price file."
+                    continue
+                s = wide[t]
+            else:
+                file = self._ticker_file(t)
+                if file is None:
+                    failed[t] = "No local price file found."
+                    continue
+                df = _read_price_file(file, keep={self.price_field, t})
+                s = df[self.price_field] if self.price_field in df.columns else df[t]
+
+            s = pd.to_numeric(s.loc[(s.index >= start) & (s.index < end)], errors="coerce")
+
+            if s.isna().all():
+                failed[t] = "No close price data in the local file for this date range."
+                continue
+
+            close_series[t] = s.rename(t)
+
+        return combine_close_series(tickers, close_series, failed, self.dtype)
@@ -0,0 +1,198 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date
+
+import pandas as pd
+
+
+def _to_date(value) -> date:
+    """Coerce str / date / datetime / Timestamp into a plain `date`."""
+    return pd.Timestamp(value).date()
+
+
+class PriceStore:
+    """
+    Local SQLite store of daily prices, one row per (ticker, field, date).
+
+    Alongside the prices it records, per ticker and field, the contiguous
+    date range [start, end) that has already been requested from the data
+    source. `missing_segments` uses that coverage to work out which head
+    and tail segments still need downloading for a new request.
+
+    Notes
+    -----
+    - Ranges follow the yfinance convention: `end` is exclusive.
+    - Coverage never extends past today, because today's bar is not final.
+    - A new connection is opened per call, so one store can be shared
+      across Streamlit sessions (threads).
+    """
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        self._lock = threading.Lock()
+
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        with self._connect() as con:
+            con.execute(
+                """
+                CREATE TABLE IF NOT EXISTS prices (
+                    ticker TEXT NOT NULL,
+                    field TEXT NOT NULL,
+                    date TEXT NOT NULL,
+                    value REAL,
+                    PRIMARY KEY (ticker, field, date)
+                )
+                """
+            )
+            con.execute(
+                """
+                CREATE TABLE IF NOT EXISTS coverage (
+                    ticker TEXT NOT NULL,
+                    field TEXT NOT NULL,
+                    start TEXT NOT NULL,
+                    end TEXT NOT NULL,
+                    PRIMARY KEY (ticker, field)
+                )
+                """
+            )
+
+    @contextmanager
+    def _connect(self):
+        # commit (or roll back) and always close the connection
+        con = sqlite3.connect(self.path, timeout=30)
+        try:
+            with con:
+                yield con
+        finally:
+            con.close()
+
+    def coverage(self, ticker: str, field: str = "Close"):
+        """Return the held (start, end) range for a ticker, or None."""
+        with self._connect() as con:
+            row = con.execute(
+                "SELECT start, end FROM coverage WHERE ticker = ? AND field = ?",
+                (ticker, field),
+            ).fetchone()
+
+        if row is None:
+            return None
+        return _to_date(row[0]), _to_date(row[1])
+
+    def missing_segments(self, ticker: str, start_date, end_date, field: str = "Close"):
+        """
+        Return the (start, end) segments still to download for a request
+        (at most a head and a tail segment). Segments always reach back to
+        the held range, so that coverage stays one contiguous interval.
+        """
+        start, end = _to_date(start_date), _to_date(end_date)
+        held = self.coverage(ticker, field)
+
+        if held is None:
+            return [(start, end)]
+
+        held_start, held_end = held
+        segments = []
+
+        # head: before what we hold
+        if start < held_start:
+            segments.append((start, held_start))
+
+        # tail: after what we hold
+        if end > held_end:
+            segments.append((held_end, end))
+
+        return segments
+
+    def write(self, ticker: str, prices: pd.Series, start_date, end_date, field: str = "Close"):
+        """
+        Save prices for one ticker and extend its coverage by [start, end).
+
+        The new range must touch or overlap the range already held, so that
+        coverage stays a single contiguous interval.
+        """
+        start = _to_date(start_date)
+        end = min(_to_date(end_date), date.today())
+
+        s = prices.dropna()
+        rows = [
+            (ticker, field, pd.Timestamp(d).strftime("%Y-%m-%d"), float(v))
+            for d, v in s.items()
+        ]
+
+        with self._lock, self._connect() as con:
+            con.executemany(
+                "INSERT OR REPLACE INTO prices (ticker, field, date, value) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+
+            if start >= end:
+                return
+
+            row = con.execute(
+                "SELECT start, end FROM coverage WHERE ticker = ? AND field = ?",
+                (ticker, field),
+            ).fetchone()
+
+            if row is not None:
+                held_start, held_end = _to_date(row[0]), _to_date(row[1])
+                if start > held_end or end < held_start:
+                    raise ValueError(
+                        f"Cannot record a gap in coverage for {ticker}: "
+                        f"held {held_start}..{held_end}, new {start}..{end}."
+                    )
+                start, end = min(start, held_start), max(end, held_end)
+
+            con.execute(
+                "INSERT OR REPLACE INTO coverage (ticker, field, start, end) VALUES (?, ?, ?, ?)",
+                (ticker, field, start.isoformat(), end.isoformat()),
+            )
+
+    def read(self, tickers, start_date, end_date, field: str = "Close") -> pd.DataFrame:
+        """
+        Read held prices as a wide DataFrame: Date + one column per ticker
+        (in the order given). Tickers with nothing held come back all-NaN.
+        """
+        start, end = _to_date(start_date), _to_date(end_date)
+        tickers = list(tickers)
+
+        if len(tickers) == 0:
+            return pd.DataFrame(columns=["Date"])
+
+        placeholders = ", ".join("?" for _ in tickers)
+        with self._connect() as con:
+            long_df = pd.read_sql_query(
+                f"""
+                SELECT ticker, date, value FROM prices
+                WHERE field = ? AND date >= ? AND date < ?
+                  AND ticker IN ({placeholders})
+                """,
+                con,
+                params=[field, start.isoformat(), end.isoformat(), *tickers],
+            )
+
+        wide = (
+            long_df
+            .pivot(index="date", columns="ticker", values="value")
+            .reindex(columns=tickers)
+            .sort_index()
+        )
+        wide.index = pd.to_datetime(wide.index)
+        wide.index.name = "Date"
+        wide.columns.name = None
+
+        return wide.reset_index()
+
+    def purge(self, ticker: str | None = None):
+        """Remove one ticker (or everything when `ticker` is None)."""
+        with self._lock, self._connect() as con:
+            if ticker is None:
+                con.execute("DELETE FROM prices")
+                con.execute("DELETE FROM coverage")
+            else:
+                con.execute("DELETE FROM prices WHERE ticker = ?", (ticker,))
+                con.execute("DELETE FROM coverage WHERE ticker = ?", (ticker,))
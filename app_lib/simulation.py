@@ -0,0 +1,194 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from .covariance import SampleCovariance
+from .metrics import allocated_returns
+
+
+SIM_METHODS = ("bootstrap", "block_bootstrap", "normal")
+
+# peak size of a chunk's (paths x horizon) arrays, in entries
+_CHUNK_ENTRIES = 2_000_000
+
+
+@dataclass
+class SimulationResult:
+    """
+    Outcome of `simulate_portfolio`, per simulated path.
+
+    `terminal` is the portfolio value at the horizon and `max_drawdown`
+    the worst fall from a running peak along the path (a negative
+    fraction, with the starting value counting as the first peak). `paths`
+    holds the value of every path at the period numbers `steps` (float32),
+    for the percentile bands.
+    """
+    initial_value: float
+    terminal: np.ndarray
+    max_drawdown: np.ndarray
+    steps: np.ndarray
+    paths: np.ndarray
+
+    def terminal_percentiles(self, percentiles=(5, 25, 50, 75, 95)) -> pd.Series:
+        """Percentiles of the terminal value."""
+        return pd.Series(np.percentile(self.terminal, percentiles), index=list(percentiles))
+
+    def prob_drawdown(self, threshold: float) -> float:
+        """Probability that the path falls more than `threshold` (e.g. 0.2) from a peak."""
+        return float(np.mean(self.max_drawdown < -abs(threshold)))
+
+    def prob_loss(self) -> float:
+        """Probability of ending below the starting value."""
+        return float(np.mean(self.terminal < self.initial_value))
+
+    def bands(self, percentiles=(5, 25, 50, 75, 95)) -> pd.DataFrame:
+        """Percentile bands of the portfolio value, one row per period in `steps`."""
+        return pd.DataFrame(
+            np.percentile(self.paths, percentiles, axis=0).T,
+            index=pd.Index(self.steps, name="Period"),
+            columns=list(percentiles),
+        )
+
+
+def _draw_returns(rng, method, source, n_paths, horizon, block_size):
+    """(horizon x n_paths) simulated portfolio log returns."""
+    if method == "normal":
+        mu, sigma = source
+        draws = rng.standard_normal(size=(horizon, n_paths))
+        draws *= sigma
+        draws += mu
+        return draws
+
+    if method == "bootstrap":
+        return source[rng.integers(0, len(source), size=(horizon, n_paths))]
+
+    # moving blocks of consecutive periods keep volatility clustering
+    n_blocks = -(-horizon // block_size)
+    starts = rng.integers(0, len(source) - block_size + 1, size=(n_blocks, 1, n_paths))
+    rows = (starts + np.arange(block_size)[:, None]).reshape(-1, n_paths)[:horizon]
+    return source[rows]
+
+
+def _simulate_chunk(args):
+    method, source, n_paths, horizon, block_size, seed, steps, initial_value = args
+    rng = np.random.default_rng(seed)
+    draws = _draw_returns(rng, method, source, n_paths, horizon, block_size)
+
+    # one pass over the periods, each a vector op across all paths: much
+    # faster than cumsum / maximum.accumulate over the whole block. The
+    # start (log value 0) counts as the first peak.
+    log_value = np.zeros(n_paths)
+    peak = np.zeros(n_paths)
+    worst = np.zeros(n_paths)
+    paths = np.empty((len(steps), n_paths), dtype=np.float32)
+    paths[0] = 0.0
+    band = 1
+
+    for t in range(horizon):
+        log_value += draws[t]
+        np.maximum(peak, log_value, out=peak)
+        np.minimum(worst, log_value - peak, out=worst)
+        if band < len(steps) and steps[band] == t + 1:
+            paths[band] = log_value
+            band += 1
+
+    paths = initial_value * np.exp(np.ascontiguousarray(paths.T))
+    return initial_value * np.exp(log_value), np.exp(worst) - 1, paths
+
+
+def simulate_portfolio(
+    log_return_df: pd.DataFrame,
+    allocation_df: pd.DataFrame,
+    horizon: int = 252,
+    n_paths: int = 10_000,
+    method: str = "bootstrap",
+    block_size: int = 20,
+    estimator=None,
+    initial_value: float = 1.0,
+    seed=None,
+    chunk_size: int | None = None,
+    max_workers: int | None = None,
+    band_points: int = 64,
+) -> SimulationResult:
+    """
+    Monte Carlo simulation of the portfolio value over the next `horizon`
+    return periods, from the same inputs as `portfo_metrics`.
+
+    The portfolio log return of a period is the weighted sum of the asset
+    log returns (as in `portfo_metrics`), so the paths are drawn for that
+    one series:
+
+    - "bootstrap": periods resampled with replacement from history;
+    - "block_bootstrap": blocks of `block_size` consecutive periods
+      resampled, which keeps short-term dependence such as volatility
+      clustering;
+    - "normal": draws from a normal with the historical mean and the
+      variance w' Σ w of the covariance from `estimator` (sample
+      covariance by default), i.e. multivariate normal asset returns.
+
+    Paths are generated in chunks of `chunk_size` paths, fully vectorised,
+    so memory stays bounded whatever `n_paths` is. Each chunk has its own
+    seed spawned from `seed`, so results are reproducible and do not
+    depend on `max_workers` (they do depend on `chunk_size`).
+
+    Parameters
+    ----------
+    horizon : int
+        Periods to simulate, at the frequency of `log_return_df`.
+    estimator : CovarianceEstimator, optional
+        Covariance for the "normal" method (see `covariance.py`).
+    initial_value : float
+        Starting portfolio value.
+    chunk_size : int, optional
+        Paths per chunk; by default about 2M path-periods per chunk.
+    max_workers : int, optional
+        Simulate chunks on a process pool of this size.
+    band_points : int
+        Number of periods (evenly spaced, including the start and the
+        horizon) at which path values are kept for the percentile bands.
+
+    Returns
+    -------
+    SimulationResult
+    """
+    if method not in SIM_METHODS:
+        raise ValueError(f"Unknown simulation method '{method}'. Use one of {SIM_METHODS}.")
+    if horizon < 1 or n_paths < 1:
+        raise ValueError("horizon and n_paths must be at least 1.")
+
+    lr, weights = allocated_returns(log_return_df, allocation_df)
+    port_lr = lr.to_numpy(dtype=np.float64) @ weights.to_numpy()
+
+    if method == "normal":
+        if estimator is None:
+            estimator = SampleCovariance()
+        cov = estimator.fit(lr).covariance().loc[weights.index, weights.index].to_numpy()
+        source = (port_lr.mean(), np.sqrt(weights.to_numpy() @ cov @ weights.to_numpy()))
+    else:
+        source = port_lr
+        if method == "block_bootstrap" and not 1 <= block_size <= len(port_lr):
+            raise ValueError("block_size must be between 1 and the number of return periods.")
+
+    if chunk_size is None:
+        chunk_size = max(1, _CHUNK_ENTRIES // horizon)
+    steps = np.unique(np.linspace(0, horizon, max(2, band_points)).round().astype(int))
+
+    sizes = [min(chunk_size, n_paths - i) for i in range(0, n_paths, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [
+        (method, source, size, horizon, block_size, chunk_seed, steps, initial_value)
+        for size, chunk_seed in zip(sizes, seeds)
+    ]
+
+    if max_workers is None:
+        chunks = [_simulate_chunk(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            chunks = list(pool.map(_simulate_chunk, tasks))
+
+    terminal, max_drawdown, paths = (np.concatenate(parts) for parts in zip(*chunks))
+    return SimulationResult(
+        initial_value=initial_value, terminal=terminal, max_drawdown=max_drawdown, steps=steps, paths=paths,
+    )
@@ -1,11 +1,196 @@
+import asyncio
+import threading
 import time
+
 import pandas as pd
-import yfinance as yf
 
+from .price_provider import (
+    PriceDownloadError,
+    YFinanceProvider,
+    NO_DATA_REASON,
+    DOWNLOAD_FAILED_REASON,
+    backoff_delay,
+    combine_close_series,
+    is_transient_failure,
+)
+
+
+class NegativeTickerCache:
+    """
+    TTL cache of tickers that came back without data, keyed by
+    (ticker, failure reason).
+
+    A cached failure short-circuits later requests for the same ticker
+    whose date range falls inside the failed one, so typos and delisted
+    symbols do not cost a network round trip on every rerun. Failures of
+    the download itself (see `is_transient_failure`) are never cached.
+    """
+
+    def __init__(self, ttl_seconds: float = 900.0, clock=time.time):
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def add(self, ticker: str, reason: str, start_date, end_date):
+        """Remember that `ticker` failed for [start_date, end_date)."""
+        if is_transient_failure(reason):
+            return
+
+        with self._lock:
+            self._entries[(ticker, reason)] = (
+                pd.Timestamp(start_date).date(),
+                pd.Timestamp(end_date).date(),
+                self._clock() + self.ttl_seconds,
+            )
+
+    def lookup(self, ticker: str, start_date, end_date):
+        """Return the cached failure reason covering this request, or None."""
+        start, end = pd.Timestamp(start_date).date(), pd.Timestamp(end_date).date()
+        now = self._clock()
+
+        with self._lock:
+            for (t, reason), (f_start, f_end, expires) in list(self._entries.items()):
+                if expires <= now:
+                    del self._entries[(t, reason)]
+                elif t == ticker and f_start <= start and end <= f_end:
+                    return reason
+        return None
+
+    def entries(self) -> pd.DataFrame:
+        """Unexpired entries, one row per (ticker, reason)."""
+        now = self._clock()
+
+        with self._lock:
+            rows = [
+                {
+                    "Ticker": t,
+                    "Reason": reason,
+                    "Start Date": f_start,
+                    "End Date": f_end,
+                    "Expires In (s)": expires - now,
+                }
+                for (t, reason), (f_start, f_end, expires) in self._entries.items()
+                if expires > now
+            ]
+
+        return pd.DataFrame(
+            rows,
+            columns=["Ticker", "Reason", "Start Date", "End Date", "Expires In (s)"],
+        )
+
+    def purge(self, ticker: str | None = None, reason: str | None = None) -> int:
+        """
+        Drop entries matching `ticker` and/or `reason` (everything when both
+        are None). Returns the number of entries removed.
+        """
+        with self._lock:
+            keys = [
+                (t, r) for (t, r) in self._entries
+                if (ticker is None or t == ticker) and (reason is None or r == reason)
+            ]
+            for key in keys:
+                del self._entries[key]
+
+        return len(keys)
+
+
+# shared by every session in the process (see main.py)
+negative_cache = NegativeTickerCache()
+
+
+def normalize_tickers(tickers) -> list:
+    """Strip, upper-case and de-duplicate tickers (keeping order)."""
+    if tickers is None:
+        tickers = []
+    tickers_norm = [str(t).strip().upper() for t in tickers if str(t).strip()]
+
+    if len(tickers_norm) == 0:
+        raise ValueError("Please input at least one ticker.")
+
+    # De-duplicate while keeping order
+    seen = set()
+    return [t for t in tickers_norm if not (t in seen or seen.add(t))]
 
-class PriceDownloadError(RuntimeError):
-    """Raised when we cannot obtain enough valid price series to proceed."""
-    pass
+
+def _fetch(provider, coordinator, tickers, start_date, end_date):
+    """Fetch from the provider, through the shared coordinator if given."""
+    if coordinator is None:
+        return provider.fetch(tickers, start_date, end_date)
+    return coordinator.fetch(provider, tickers, start_date, end_date)
+
+
+def fetch_with_store(provider, coordinator, store, tickers, start_date, end_date):
+    """
+    Fill the gaps the store is missing for `tickers` from `provider`, then
+    read the full range back from the store as `(df_comb, report)`.
+
+    Tickers sharing the same missing segment are fetched together, so a
+    basket that was loaded yesterday costs one small tail download today.
+    Segments that come back empty (before a listing date, over a weekend,
+    or for a delisted symbol) are recorded as held too; only failed
+    downloads (see `is_transient_failure`) are asked for again.
+    """
+    field = provider.price_field
+
+    # group tickers by the segment they are missing
+    segments = {}
+    for t in tickers:
+        for seg in store.missing_segments(t, start_date, end_date, field):
+            segments.setdefault(seg, []).append(t)
+
+    fetch_failed = {}
+    for (seg_start, seg_end), seg_tickers in segments.items():
+        try:
+            seg_df, seg_report = _fetch(
+                provider, coordinator, seg_tickers, seg_start, seg_end
+            )
+        except PriceDownloadError as e:
+            # keep going with whatever the store already holds
+            fetch_failed.update({t: str(e) for t in seg_tickers})
+            continue
+
+        # record coverage for every answer but a failed download, empty
+        # ones included (a head before the listing date, a tail of
+        # weekends or holidays), so those segments are not asked for again
+        seg_df = seg_df.set_index("Date")
+        for t in seg_tickers:
+            if t in seg_report["valid"]:
+                store.write(t, seg_df[t], seg_start, seg_end, field)
+            elif not is_transient_failure(seg_report["failed"].get(t, NO_DATA_REASON)):
+                store.write(t, pd.Series(dtype="float64"), seg_start, seg_end, field)
+        fetch_failed.update(seg_report["failed"])
+
+    wide = store.read(tickers, start_date, end_date, field).set_index("Date")
+
+    close_series = {}
+    failed = {}
+    for t in tickers:
+        s = wide[t]
+        if s.isna().all():
+            failed[t] = fetch_failed.get(t, NO_DATA_REASON)
+            continue
+        close_series[t] = s
+
+    return combine_close_series(tickers, close_series, failed, provider.dtype)
+
+
+def _check_valid(report: dict, min_valid: int):
+    """Raise PriceDownloadError when too few tickers returned data."""
+    valid = report["valid"]
+
+    if len(valid) == 0:
+        raise PriceDownloadError(
+            "No valid price series were returned. "
+            "Try fewer tickers, shorten the date range, or wait and retry (rate limiting)."
+        )
+
+    # ---- enforce minimum valid tickers for correlation/portfolio calcs
+    if len(valid) < min_valid:
+        raise PriceDownloadError(
+            f"Only {len(valid)} ticker(s) returned valid data ({', '.join(valid)}). "
+            f"Need at least {min_valid} to continue."
+        )
 
 
 def ticker_closed_price(
@@ -15,10 +200,33 @@ def ticker_closed_price(
     min_valid: int = 2,
     max_retries: int = 3,
     retry_sleep_seconds: float = 2.0,
+    store=None,
+    provider=None,
+    coordinator=None,
+    negative_cache=None,
 ):
     """
     Download close prices for a list of tickers (wide format).
 
+    Parameters
+    ----------
+    max_retries, retry_sleep_seconds :
+        Retry settings for the default Yahoo Finance provider.
+    provider : PriceProvider, optional
+        Where prices come from (see `app_lib.price_provider`). Defaults to
+        `YFinanceProvider`; use `LocalFileProvider` to run offline.
+    store : PriceStore, optional
+        Local price store (see `app_lib.price_store`). When given, only the
+        head/tail segments the store does not hold yet are fetched from the
+        provider; the rest of the range is read from disk.
+    coordinator : FetchCoordinator, optional
+        Shared rate limit and request coalescing across concurrent sessions
+        (see `app_lib.fetch_coordinator.get_fetch_coordinator`).
+    negative_cache : NegativeTickerCache, optional
+        Tickers that recently came back without data are reported as
+        failed again without a download (e.g. the module-level
+        `negative_cache`).
+
     Returns
     -------
     df_comb : pd.DataFrame
@@ -34,7 +242,10 @@ def ticker_closed_price(
     Notes
     -----
     - Skips individual tickers that fail or return all-null Close.
-    - Retries the whole download call on transient errors (e.g. rate limit).
+    - Retries are up to the provider. The default `YFinanceProvider`
+      retries the whole download call on transient errors (e.g. rate
+      limit); with `chunk_size` set it retries each chunk on its own and
+      re-requests only the tickers still missing (see `YFinanceProvider`).
     """
 
     # ---- validate dates
@@ -42,102 +253,161 @@ def ticker_closed_price(
         raise ValueError("Start date must be before end date.")
 
     # ---- normalize tickers
-    if tickers is None:
-        tickers = []
-    tickers_norm = [str(t).strip().upper() for t in tickers if str(t).strip()]
+    tickers_norm = normalize_tickers(tickers)
 
-    if len(tickers_norm) == 0:
-        raise ValueError("Please input at least one ticker.")
+    if provider is None:
+        provider = YFinanceProvider(
+            max_retries=max_retries,
+            retry_sleep_seconds=retry_sleep_seconds,
+        )
 
-    # De-duplicate while keeping order
-    seen = set()
-    tickers_norm = [t for t in tickers_norm if not (t in seen or seen.add(t))]
+    # ---- known-bad tickers skip the download
+    cached_failed = {}
+    if negative_cache is not None:
+        for t in tickers_norm:
+            reason = negative_cache.lookup(t, start_date, end_date)
+            if reason is not None:
+                cached_failed[t] = f"{reason} (cached)"
 
-    last_err = None
-    df = None
+    tickers_fetch = [t for t in tickers_norm if t not in cached_failed]
 
-    # ---- download (retry on transient failures)
-    for attempt in range(1, max_retries + 1):
-        try:
-            df = yf.download(
-                tickers=tickers_norm,
-                start=start_date,
-                end=end_date,
-                group_by="ticker",
-                auto_adjust=False,
-                progress=False,
-                threads=True,
+    # ---- download (or top up the local store)
+    if len(tickers_fetch) == 0:
+        df_comb, report = combine_close_series(tickers_norm, {}, cached_failed)
+    else:
+        if store is None:
+            df_comb, report = _fetch(
+                provider, coordinator, tickers_fetch, start_date, end_date
+            )
+        else:
+            df_comb, report = fetch_with_store(
+                provider, coordinator, store, tickers_fetch, start_date, end_date
             )
-            last_err = None
-            break
-        except Exception as e:
-            last_err = e
-            if attempt < max_retries:
-                time.sleep(retry_sleep_seconds * attempt)  # simple backoff
-            else:
-                # We'll handle below
-                pass
-
-    if df is None or last_err is not None:
-        raise PriceDownloadError(
-            f"Price download failed after {max_retries} retries. "
-            f"Details: {last_err}"
-        )
 
-    # ---- build wide close-price table
-    close_series = {}
-    failed = {}
+        if negative_cache is not None:
+            for t, reason in report["failed"].items():
+                negative_cache.add(t, reason, start_date, end_date)
 
-    # yfinance returns different shapes depending on number of tickers.
-    # For multi-ticker: df[ticker]["Close"] works (columns are MultiIndex).
-    # For single ticker: df["Close"] is a Series/column.
-    is_multi = isinstance(df.columns, pd.MultiIndex)
+        failed = {**report["failed"], **cached_failed}
+        report = {
+            "requested": tickers_norm,
+            "valid": report["valid"],
+            "failed": {t: failed[t] for t in tickers_norm if t in failed},
+        }
 
-    for t in tickers_norm:
-        try:
-            if is_multi:
-                # MultiIndex columns: (ticker, OHLCV)
-                s = df[t]["Close"].rename(t)
-            else:
-                # Single ticker shape
-                s = df["Close"].rename(t)
-
-            # Validate the series has any usable data
-            if s.isna().all():
-                failed[t] = "No close price data returned (possible rate-limit, invalid ticker, or delisted)."
-                continue
+    _check_valid(report, min_valid)
 
-            close_series[t] = s
+    return df_comb, report
 
-        except Exception as e:
-            failed[t] = f"Failed to extract close prices: {e}"
 
-    if len(close_series) == 0:
-        raise PriceDownloadError(
-            "No valid price series were returned. "
-            "Try fewer tickers, shorten the date range, or wait and retry (rate limiting)."
+def _release_slot(download, semaphore):
+    """Free a concurrency slot once a download has ended, discarding a late error."""
+    semaphore.release()
+    if not download.cancelled():
+        download.exception()
+
+
+async def _async_fetch_ticker(
+    provider, ticker, start_date, end_date, semaphore,
+    max_retries, retry_sleep_seconds, max_backoff_seconds, timeout_seconds,
+):
+    """Fetch one ticker in a worker thread, retrying without blocking the loop."""
+    reason = NO_DATA_REASON
+
+    for attempt in range(1, max_retries + 1):
+        await semaphore.acquire()
+        download = asyncio.ensure_future(
+            asyncio.to_thread(provider.fetch, [ticker], start_date, end_date)
         )
+        # a thread cannot be stopped: after a timeout or a cancel the
+        # download keeps its slot until it actually ends
+        download.add_done_callback(lambda d: _release_slot(d, semaphore))
+
+        try:
+            df, report = await asyncio.wait_for(asyncio.shield(download), timeout=timeout_seconds)
+        except asyncio.TimeoutError:
+            reason = f"{DOWNLOAD_FAILED_REASON}: timed out after {timeout_seconds}s."
+        except PriceDownloadError as e:
+            reason = str(e)
+        else:
+            if ticker in report["valid"]:
+                return df.set_index("Date")[ticker], None
+            reason = report["failed"].get(ticker, NO_DATA_REASON)
+            if not is_transient_failure(reason):
+                return None, reason
 
-    df_comb = pd.concat(close_series.values(), axis=1).reset_index()
+        if attempt < max_retries:
+            await asyncio.sleep(
+                backoff_delay(attempt, retry_sleep_seconds, max_backoff_seconds)
+            )
 
-    # Ensure the date column is named consistently
-    # yfinance uses 'Date' for regular prices, but sometimes it's 'index'
-    if "Date" not in df_comb.columns:
-        df_comb = df_comb.rename(columns={df_comb.columns[0]: "Date"})
+    return None, reason
 
-    valid = list(close_series.keys())
 
-    # ---- enforce minimum valid tickers for correlation/portfolio calcs
-    if len(valid) < min_valid:
-        raise PriceDownloadError(
-            f"Only {len(valid)} ticker(s) returned valid data ({', '.join(valid)}). "
-            f"Need at least {min_valid} to continue."
+async def async_ticker_closed_price(
+    tickers,
+    start_date,
+    end_date,
+    min_valid: int = 2,
+    max_retries: int = 3,
+    retry_sleep_seconds: float = 2.0,
+    max_backoff_seconds: float = 30.0,
+    max_concurrency: int = 8,
+    timeout_seconds: float | None = 30.0,
+    provider=None,
+):
+    """
+    Async counterpart of `ticker_closed_price`, for asyncio services.
+
+    Each ticker is fetched on its own in a worker thread, at most
+    `max_concurrency` at a time, with a `timeout_seconds` limit per
+    attempt. Retries back off with `asyncio.sleep`, so the event loop is
+    never blocked.
+
+    Returns the same `(df_comb, report)` pair and raises the same errors
+    as `ticker_closed_price`. A ticker that times out on every attempt is
+    reported as failed.
+
+    Notes
+    -----
+    - Cancelling the awaiting task cancels all pending tickers; a download
+      already running in a worker thread finishes in the background and
+      its result is discarded.
+    - A download that timed out or was cancelled keeps its place in
+      `max_concurrency` until its thread ends, so no more than
+      `max_concurrency` downloads ever run at once.
+    - The default provider is a `YFinanceProvider` without its own
+      retries, since retries are handled here.
+    """
+    if start_date >= end_date:
+        raise ValueError("Start date must be before end date.")
+
+    tickers_norm = normalize_tickers(tickers)
+
+    if provider is None:
+        provider = YFinanceProvider(max_retries=1)
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+    results = await asyncio.gather(*[
+        _async_fetch_ticker(
+            provider, t, start_date, end_date, semaphore,
+            max_retries, retry_sleep_seconds, max_backoff_seconds, timeout_seconds,
         )
+        for t in tickers_norm
+    ])
+
+    close_series = {}
+    failed = {}
+    for t, (s, reason) in zip(tickers_norm, results):
+        if s is None:
+            failed[t] = reason
+        else:
+            close_series[t] = s
+
+    df_comb, report = combine_close_series(
+        tickers_norm, close_series, failed, provider.dtype
+    )
 
-    report = {
-        "requested": tickers_norm,
-        "valid": valid,
-        "failed": failed,
-    }
+    _check_valid(report, min_valid)
 
     return df_comb, report
@@ -1,18 +1,31 @@
 # packages
+import os
 from datetime import date, datetime
 import pandas as pd
 import numpy as np
 import streamlit as st
+import altair as alt
+import matplotlib.pyplot as plt
+from scipy.cluster.hierarchy import dendrogram
 
 # scripts
-from app_lib.stock_api import ticker_closed_price, PriceDownloadError
+from app_lib.stock_api import ticker_closed_price, PriceDownloadError, negative_cache
+from app_lib.price_provider import LocalFileProvider, YFinanceProvider
+from app_lib.price_store import PriceStore
+from app_lib.fetch_coordinator import get_fetch_coordinator
 from app_lib.corr_matrix import corr_matrix
 from app_lib.heatmap import heatmap
 from app_lib.line_chart import line_chart
 from app_lib.xlsx_summary_report import build_portfolio_export
-from app_lib.data_transform import log_return, normalize_to_100
+from app_lib.data_transform import resampled_log_return, normalize_variants
 from app_lib.metrics import asset_metrics, portfo_metrics
+from app_lib.metrics_rolling import rolling_asset_metrics, rolling_portfo_metrics
+from app_lib.simulation import simulate_portfolio, SIM_METHODS
+from app_lib.optimizer import PortfolioOptimizer
 from app_lib.streamlit_helper import highlight_total_row
+from app_lib.covariance import ESTIMATORS
+from app_lib.cluster import cluster_corr
+from app_lib.pca import corr_pca
 
 # streamlit page config
 st.set_page_config(
@@ -25,10 +38,36 @@ default_portfolio = pd.DataFrame({
     "Allocation Percentage": [15, 15, 10, 20, 20, 10, 10],
 })
 
+# PRICE_DATA_DIR switches to local price files (offline / load tests)
+PRICE_DATA_DIR = os.environ.get("PRICE_DATA_DIR")
+
+# one provider and local price store per process, shared by every session
+@st.cache_resource
+def get_price_provider():
+    if PRICE_DATA_DIR:
+        return LocalFileProvider(PRICE_DATA_DIR)
+    return YFinanceProvider()
+
+@st.cache_resource
+def get_price_store():
+    # local files are already on disk, no need to copy them into the store
+    if PRICE_DATA_DIR:
+        return None
+    return PriceStore(os.environ.get("PRICE_STORE_PATH", ".price_cache/prices.sqlite"))
+
 st.session_state.setdefault("applied_df", default_portfolio)
 st.session_state.setdefault("applied_start", date.today().replace(year=date.today().year - 1))
 st.session_state.setdefault("applied_end", date.today())
 st.session_state.setdefault("price_display_mode", "Price")
+st.session_state.setdefault("applied_freq", "D")
+st.session_state.setdefault("applied_estimator", "Sample")
+st.session_state.setdefault("applied_corr_method", "pearson")
+
+corr_method_options = {"Pearson": "pearson", "Spearman (rank)": "spearman", "Kendall (rank)": "kendall"}
+corr_method_labels = {v: k for k, v in corr_method_options.items()}
+
+return_freq_options = {"Daily": "D", "Weekly": "W", "Monthly": "M", "Quarterly": "Q"}
+return_freq_labels = {v: k for k, v in return_freq_options.items()}
 
 
 # Title
@@ -44,7 +83,7 @@ with input_fields:
     st.header("Select the date range and the assets:")
 
     with st.form("inputs_form", clear_on_submit=False):
-        start, end, _filler = st.columns([1, 1, 2])
+        start, end, freq, estimator, method = st.columns([1, 1, 1, 1, 1])
 
 
         with start: 
@@ -63,6 +102,33 @@ with input_fields:
                 format="YYYY-MM-DD",
             )
         
+        with freq:
+            freq_label = st.selectbox(
+                "Return Frequency",
+                list(return_freq_options),
+                index=list(return_freq_options.values()).index(st.session_state["applied_freq"]),
+                help="Weekly / monthly / quarterly returns use the last price of each period.",
+            )
+
+        with estimator:
+            estimator_label = st.selectbox(
+                "Covariance Estimator",
+                list(ESTIMATORS),
+                index=list(ESTIMATORS).index(st.session_state["applied_estimator"]),
+                help="Used for the portfolio volatility and the correlation matrix. "
+                     "Shrinkage (Ledoit-Wolf) gives steadier matrices on short histories; "
+                     "EWMA weights recent returns more.",
+            )
+
+        with method:
+            corr_method_label = st.selectbox(
+                "Correlation Method",
+                list(corr_method_options),
+                index=list(corr_method_options.values()).index(st.session_state["applied_corr_method"]),
+                help="Rank correlations (Spearman, Kendall) are less sensitive to "
+                     "fat tails and outliers than Pearson.",
+            )
+
         st.text("Portfolio Allocation (%)")
         df_pending = st.data_editor(
             st.session_state["applied_df"].reset_index(drop=True), 
@@ -87,6 +153,9 @@ with input_fields:
         # apply inputs once
         st.session_state["applied_start"] = start_date
         st.session_state["applied_end"] = end_date
+        st.session_state["applied_freq"] = return_freq_options[freq_label]
+        st.session_state["applied_estimator"] = estimator_label
+        st.session_state["applied_corr_method"] = corr_method_options[corr_method_label]
 
         applied = df_pending.dropna(how="all").reset_index(drop=True).copy()
         applied["Tickers"] = applied["Tickers"].astype(str).str.strip()
@@ -100,11 +169,14 @@ with input_fields:
 
     start_date = st.session_state["applied_start"]
     end_date = st.session_state["applied_end"]
+    return_freq = st.session_state["applied_freq"]
+    estimator_name = st.session_state["applied_estimator"]
+    corr_method = st.session_state["applied_corr_method"]
 
-    # put start_date and end_date into para dataframe for export
+    # put start_date, end_date and return frequency into para dataframe for export
     para_df = pd.DataFrame(
-        {'Parameter': ['start_date', 'end_date'], 
-         'Value': [start_date, end_date]}
+        {'Parameter': ['start_date', 'end_date', 'return_frequency', 'covariance_estimator', 'correlation_method'], 
+         'Value': [start_date, end_date, return_freq_labels[return_freq], estimator_name, corr_method_labels[corr_method]]}
     )
     
 
@@ -112,7 +184,7 @@ with input_fields:
 
     errors = []
 
-    if total_allocated > 100:
+    if total_allocated > 100 + 1e-9:  # two-decimal percentages need not add up exactly in floating point
         errors.append(f"The total allocation percentage is {total_allocated:.2f}%. Please adjust the values so that they do not exceed 100%.")
 
     if edited_df.empty:
@@ -134,7 +206,15 @@ with input_fields:
 
 with portfo_summary:
     try:
-        closed_price_wide, report = ticker_closed_price(tickers, start_date, end_date)
+        closed_price_wide, report = ticker_closed_price(
+            tickers,
+            start_date,
+            end_date,
+            provider=get_price_provider(),
+            store=get_price_store(),
+            coordinator=get_fetch_coordinator(),
+            negative_cache=negative_cache,
+        )
     except ValueError as e:
         st.error(str(e))
         st.stop()
@@ -147,6 +227,12 @@ with portfo_summary:
         msg = "\n".join([f"- {t}: {reason}" for t, reason in report["failed"].items()])
         st.warning("Some tickers failed to load:\n" + msg)
 
+        # failed tickers are remembered for a while; let the user force a retry
+        if st.button("Retry failed tickers"):
+            for t in report["failed"]:
+                negative_cache.purge(ticker=t)
+            st.rerun()
+
     # IMPORTANT: use only the tickers that actually loaded
     tickers_valid = report["valid"]
     edited_df_valid = edited_df[edited_df["Tickers"].isin(tickers_valid)].copy()
@@ -159,8 +245,15 @@ with portfo_summary:
     total_allocated_valid = edited_df_valid["Allocation Percentage"].sum()
 
     
-    log_return_df = log_return(closed_price_wide)
-    portfo_m = portfo_metrics(log_return_df, edited_df_valid)
+    # periods_per_year annualises the metrics at the chosen return frequency
+    log_return_df, periods_per_year = resampled_log_return(closed_price_wide, return_freq)
+    # the sample estimator keeps the realised portfolio volatility
+    cov_estimator = None if estimator_name == "Sample" else ESTIMATORS[estimator_name]()
+    portfo_m = portfo_metrics(
+        log_return_df, edited_df_valid,
+        trading_days=periods_per_year,
+        estimator=cov_estimator,
+    )
 
     # portfoliio metrics
     st.header('Portfolio Summary')
@@ -169,7 +262,10 @@ with portfo_summary:
     col1.metric('Number of Assets', len(tickers_valid))
     col2.metric('Total Allocation', f"{total_allocated_valid:.2f}%")
 
-    st.subheader('Annualised', help='Based on 252 trading days per year. ')
+    st.subheader(
+        'Annualised',
+        help=f'Based on {periods_per_year} {return_freq_labels[return_freq].lower()} returns per year. '
+    )
     
     col1, col2, col3 = st.columns(3)
     col1.metric(
@@ -198,6 +294,104 @@ with portfo_summary:
         'Cumulative Return (Log)', 
         f"{portfo_m['Cumulative Return (Log)']:.2%}")
 
+    # forward-looking: simulated paths of the portfolio value
+    if st.toggle("Monte Carlo simulation"):
+        sim_method_labels = {
+            "bootstrap": "Bootstrap",
+            "block_bootstrap": "Block bootstrap",
+            "normal": "Normal (covariance estimator)",
+        }
+        col1, col2, col3, col4 = st.columns(4)
+        sim_method = col1.selectbox(
+            "Method", SIM_METHODS, format_func=sim_method_labels.get
+        )
+        sim_horizon = col2.number_input(
+            f"Horizon ({return_freq_labels[return_freq].lower()} periods)",
+            min_value=1, value=periods_per_year,
+        )
+        sim_paths = col3.select_slider("Paths", [1_000, 10_000, 100_000], value=10_000)
+        sim_dd = col4.number_input("Drawdown threshold (%)", min_value=1, max_value=99, value=20)
+
+        # blocks of about a month of returns, shorter than the history
+        sim_block_size = max(1, min(round(periods_per_year / 12), len(log_return_df) - 1))
+
+        try:
+            simulation = simulate_portfolio(
+                log_return_df, edited_df_valid,
+                horizon=int(sim_horizon), n_paths=sim_paths, method=sim_method,
+                block_size=sim_block_size, estimator=cov_estimator, seed=0,
+            )
+        except ValueError as e:
+            st.error(str(e))
+        else:
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Median Terminal Value", f"{simulation.terminal_percentiles([50]).iloc[0]:.2f}")
+            col2.metric("Probability of Loss", f"{simulation.prob_loss():.1%}")
+            col3.metric(f"P(Drawdown > {sim_dd}%)", f"{simulation.prob_drawdown(sim_dd / 100):.1%}")
+
+            sim_bands = simulation.bands()
+            sim_bands.columns = [f"P{p}" for p in sim_bands.columns]
+            st.line_chart(sim_bands, x_label="Period", y_label="Value (start = 1)")
+
+    # suggested allocations on the same estimates as the metrics above
+    if st.toggle("Optimise allocation"):
+        opt_max_pct = st.number_input(
+            "Max allocation per asset (%)", min_value=1.0, max_value=100.0, value=100.0, step=1.0,
+        )
+        try:
+            optimizer = PortfolioOptimizer(
+                log_return_df, edited_df_valid,
+                trading_days=periods_per_year,
+                estimator=cov_estimator,
+                max_pct=opt_max_pct,
+            )
+        except ValueError as e:
+            st.error(str(e))
+        else:
+            frontier = optimizer.efficient_frontier()
+            suggestions = {
+                "Minimum variance": optimizer.min_variance(),
+                "Maximum Sharpe": optimizer.max_sharpe(),
+                "Risk parity": optimizer.risk_parity(),
+            }
+
+            points = (
+                pd.DataFrame({
+                    name: optimizer.stats(alloc)
+                    for name, alloc in {**suggestions, "Current": edited_df_valid}.items()
+                })
+                .T.rename_axis("Portfolio").reset_index()
+            )
+            frontier_line = alt.Chart(frontier).mark_line().encode(
+                alt.X("StdDev (Volatility σ):Q").axis(format="%"),
+                alt.Y("Expected Return (μ):Q").axis(format="%"),
+            )
+            frontier_points = alt.Chart(points).mark_point(size=80, filled=True).encode(
+                x="StdDev (Volatility σ):Q",
+                y="Expected Return (μ):Q",
+                color=alt.Color("Portfolio:N"),
+                tooltip=["Portfolio", alt.Tooltip("Sharpe Ratio", format=".2f")],
+            )
+            st.altair_chart(frontier_line + frontier_points, width='stretch')
+
+            st.dataframe(
+                pd.DataFrame(
+                    {name: alloc.set_index("Tickers")["Allocation Percentage"] for name, alloc in suggestions.items()}
+                ).style.format("{:.2f}%"),
+            )
+
+            chosen = st.selectbox("Allocation", list(suggestions))
+            if st.button("Use this allocation"):
+                # put the rounding residual on the largest weight, so the
+                # allocation adds up to exactly 100
+                allocation = suggestions[chosen].round(2)
+                largest = allocation["Allocation Percentage"].idxmax()
+                allocation.loc[largest, "Allocation Percentage"] = round(
+                    100 - allocation["Allocation Percentage"].drop(largest).sum(), 2
+                )
+                st.session_state["applied_df"] = allocation
+                st.rerun()
+
         # "Contribution (log)": cumulative_contrib_log,
         # "Contribution": simple_contrib,
         # "Contribution Share": contrib_share, 
@@ -234,7 +428,7 @@ asset_metrics_display, filler, asset_contrib = st.columns([9, 1, 9])
 
 with asset_metrics_display:  
     st.header('Assets Metrics')
-    metrics_df = asset_metrics(log_return_df)
+    metrics_df = asset_metrics(log_return_df, trading_days=periods_per_year)
     st.dataframe(
         metrics_df.style.format({
             'Annualised Return (μ)': '{:.2%}',
@@ -289,23 +483,113 @@ with asset_contrib:
     )
 
 
-# Corelation matrix
-daily_return = log_return(closed_price_wide)
-matrix = corr_matrix(daily_return)
+# Rolling metrics: assets and portfolio over a trailing window
+st.header("Rolling Metrics")
+
+rolling_windows = {"1 month": 1, "3 months": 3, "6 months": 6, "1 year": 12}
+rolling_formats = {
+    "Annualised Return (μ)": ".2%",
+    "StdDev (Volatility σ)": ".2%",
+    "Sharpe Ratio": ".2f",
+    "Drawdown": ".2%",
+    "Beta": ".2f",
+}
+col1, col2, col3 = st.columns(3)
+rolling_window_label = col1.selectbox("Window", list(rolling_windows), index=1)
+rolling_metric = col2.selectbox("Metric", list(rolling_formats))
+rolling_benchmark = col3.selectbox(
+    "Beta benchmark", tickers_valid,
+    index=tickers_valid.index("VOO") if "VOO" in tickers_valid else 0,
+    disabled=rolling_metric != "Beta",
+)
 
-# Colored table for matrix
+# window in return periods at the chosen frequency (at least 2)
+rolling_window = max(2, round(periods_per_year * rolling_windows[rolling_window_label] / 12))
+rolling_df = pd.concat([
+    rolling_portfo_metrics(
+        log_return_df, edited_df_valid, window=rolling_window,
+        trading_days=periods_per_year, benchmark=rolling_benchmark,
+    ),
+    rolling_asset_metrics(
+        log_return_df[["Date", *tickers_valid]], window=rolling_window,
+        trading_days=periods_per_year, benchmark=rolling_benchmark,
+    ),
+], ignore_index=True)
+
+st.caption(f"Window: {rolling_window} {return_freq_labels[return_freq].lower()} returns.")
+st.altair_chart(
+    line_chart(
+        rolling_df, value_col=rolling_metric,
+        y_title=rolling_metric, value_format=rolling_formats[rolling_metric],
+    ),
+    width='stretch',
+)
 
-heatmap = heatmap(matrix)
+
+# Corelation matrix
+# same log returns (and frequency) as the metrics above, no need to recompute
+daily_return = log_return_df
+matrix, overlap = corr_matrix(daily_return, return_counts=True, method=corr_method)
+if cov_estimator is not None and corr_method == "pearson":
+    # same estimator as the portfolio volatility (dates where all assets have a price)
+    matrix = cov_estimator.fit(daily_return).correlation()
 
 st.header(
     "Correlation Matrix", 
     help="The correlation between stocks are caluclated using dates where price of all stocks are available. Dates with missing price are not used in the calculation. ")
+st.caption(
+    f"Method: {corr_method_labels[corr_method]}"
+    + (f", {estimator_name} estimator" if cov_estimator is not None and corr_method == "pearson" else "")
+)
 date_not_null = closed_price_wide.dropna()
-min = date_not_null['Date'].min().strftime("%Y-%m-%d")
-max = date_not_null['Date'].max().strftime("%Y-%m-%d")
+min_date = date_not_null['Date'].min().strftime("%Y-%m-%d")
+max_date = date_not_null['Date'].max().strftime("%Y-%m-%d")
+
+# cluster order puts correlated assets next to each other; the reordered
+# matrix is also what goes into the Excel export
+cluster_ordered = st.toggle("Order by cluster", value=True)
+corr_labels = list(matrix.index)  # linkage leaves refer to this order
+if cluster_ordered:
+    matrix, corr_linkage = cluster_corr(matrix)
+
+# Colored table for matrix
+heatmap = heatmap(matrix)
 
 st.table(heatmap)
 
+if cluster_ordered and len(corr_linkage) > 0:
+    with st.expander("Cluster dendrogram"):
+        fig, ax = plt.subplots(figsize=(8, 0.25 * len(matrix) + 1))
+        dendrogram(corr_linkage, labels=corr_labels, orientation="left", ax=ax)
+        ax.set_xlabel("Correlation distance")
+        st.pyplot(fig)
+        plt.close(fig)
+
+# principal components: how much of the co-movement one market factor explains
+if len(matrix) >= 2:
+    with st.expander("Principal components"):
+        absorbed = len(matrix) // 5 or 1  # Kritzman et al.: a fifth of the assets
+        components = corr_pca(matrix, k=max(absorbed, 3))
+        col_pc1, col_ar = st.columns(2)
+        col_pc1.metric("Market factor (PC1) share", f"{components.explained.iloc[0]:.1%}")
+        col_ar.metric(f"Absorption ratio ({absorbed} PC)", f"{components.absorption_ratio(absorbed):.1%}")
+        st.dataframe(components.loadings.style.format("{:.3f}"))
+
+# flag pairs with few common dates (e.g. exchanges with different holidays
+# or a late listing): their correlation rests on less data than the rest
+thin_pair_obs = len(daily_return) // 2
+thin_pairs = [
+    f"{a} / {b}: {overlap.loc[a, b]} common dates"
+    for i, a in enumerate(overlap.index)
+    for b in overlap.columns[i + 1:]
+    if overlap.loc[a, b] < thin_pair_obs
+]
+if thin_pairs:
+    st.warning(
+        f"These pairs have fewer than {thin_pair_obs} common dates, so their "
+        "correlation is less reliable:\n" + "\n".join(f"- {p}" for p in thin_pairs)
+    )
+
 # Closed Price display (chart and table)
 ## select for price/percentage change
 st.header("Closed Price by Assets and Date")
@@ -317,17 +601,47 @@ price_display_selection = st.segmented_control(
     key='price_display_mode'
 )
 
-normalised_price_df = normalize_to_100(
-    df=closed_price_wide, 
-    date_col='Date', 
-    base=100.0
-)
+index_base_options = {
+    "First available date": "first_valid",
+    "First common date": "common_start",
+    "Chosen date": "base_date",
+}
+index_base_caption = {
+    "first_valid": "Index option base = 100 at first available price date for each asset.",
+    "common_start": "Index option base = 100 at the first date where all assets have a price.",
+    "base_date": "Index option base = 100 at each asset's first price on or after the chosen date.",
+}
+
+index_base = "first_valid"
+index_base_date = None
+
+if st.session_state["price_display_mode"] == "Indexed":
+    index_base_label = st.selectbox("Index base", list(index_base_options))
+    index_base = index_base_options[index_base_label]
+
+    if index_base == "base_date":
+        index_base_date = st.date_input(
+            "Base date",
+            value=closed_price_wide["Date"].min().date(),
+            min_value=closed_price_wide["Date"].min().date(),
+            max_value=closed_price_wide["Date"].max().date(),
+        )
 
-display_data = (
-    normalised_price_df
-    if st.session_state["price_display_mode"] == "Indexed"
-    else closed_price_wide
+# one pass over the prices, only for the variants shown or exported
+index_variants = normalize_variants(
+    df=closed_price_wide,
+    date_col='Date',
+    base=100.0,
+    base_date=index_base_date,
+    variants={"first_valid", index_base},
 )
+normalised_price_df = index_variants["first_valid"]
+
+if st.session_state["price_display_mode"] == "Indexed":
+    display_data = index_variants[index_base].copy()
+    st.caption(index_base_caption[index_base])
+else:
+    display_data = closed_price_wide.copy()
 
 # Closed Price Line Chart
 display_long = (
@@ -339,9 +653,6 @@ display_long = (
     .sort_values(by="Date", ignore_index = True)
 )
 
-
-st.caption(f'Index option base = 100 at first available price date for each asset.')
-
 st.subheader("Closed Price Chart")
 
 st.altair_chart(line_chart(display_long), width='stretch')
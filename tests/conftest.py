@@ -0,0 +1,78 @@
+import app_lib.price_provider as price_provider
+import pandas as pd
+import numpy as np
+import pytest
+
+
+# Fixed prices served by the fake yf.download below, so the price-fetch
+# tests run offline.
+PRICES = pd.DataFrame(
+    {
+        "AAPL": [10.0, 11.0, 12.0, 13.0, 14.0, 15.0],
+        "MSFT": [20.0, 21.0, np.nan, 23.0, 24.0, 25.0],
+    },
+    index=pd.DatetimeIndex(
+        ["2024-01-02", "2024-01-03", "2024-01-04", "2024-01-05", "2024-01-08", "2024-01-09"],
+        name="Date",
+    ),
+)
+
+
+@pytest.fixture
+def fake_download(monkeypatch):
+    calls = []
+
+    def download(tickers, start, end, **kwargs):
+        calls.append((list(tickers), str(pd.Timestamp(start).date()), str(pd.Timestamp(end).date())))
+        rows = PRICES.loc[(PRICES.index >= pd.Timestamp(start)) & (PRICES.index < pd.Timestamp(end))]
+        frames = {}
+        for t in tickers:
+            close = rows[t] if t in rows else pd.Series(np.nan, index=rows.index)
+            frames[t] = pd.DataFrame({"Open": close, "Close": close, "Volume": 0.0})
+        return pd.concat(frames, axis=1)
+
+    monkeypatch.setattr(price_provider.yf, "download", download)
+    return calls
+
+
+@pytest.fixture
+def make_returns():
+    """
+    Factory for the return frames of the analytics tests: "Date" plus
+    columns T0, T1, ... (or `columns`) of random returns, each the sum of
+
+    - `mean` (a scalar or one value per column);
+    - common factors: `factors` of them with N(0, factor_scale)
+      loadings, or the (factors x columns) loadings themselves;
+    - the asset's own N(0, scale) noise.
+
+    `missing` is the share of values set to NaN at random, and `late`
+    maps columns listed late to their number of leading NaN rows.
+    """
+    def make(
+        n_rows=200, n_cols=6, seed=0, mean=0.0, scale=0.02, factors=0, factor_scale=0.01,
+        missing=0.0, late=None, columns=None, start="2024-01-01",
+    ):
+        columns = list(columns or [f"T{i}" for i in range(n_cols)])
+        rng = np.random.default_rng(seed)
+
+        values = np.zeros((n_rows, len(columns))) + mean
+        if np.ndim(factors):
+            loadings = np.asarray(factors, dtype=np.float64)
+            values += rng.normal(size=(n_rows, len(loadings))) @ loadings
+        elif factors:
+            common = rng.normal(size=(n_rows, factors))
+            values += common @ (rng.normal(size=(factors, len(columns))) * factor_scale)
+        if scale:
+            values += rng.normal(0.0, scale, size=values.shape)
+
+        if missing:
+            values[rng.random(values.shape) < missing] = np.nan
+        for column, rows in (late or {}).items():
+            values[:rows, columns.index(column)] = np.nan
+
+        df = pd.DataFrame(values, columns=columns)
+        df.insert(0, "Date", pd.date_range(start, periods=n_rows))
+        return df
+
+    return make
@@ -0,0 +1,81 @@
+from streamlit.testing.v1 import AppTest
+from datetime import date
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pytest
+import streamlit as st
+
+
+@pytest.fixture(autouse=True)
+def clear_app_caches():
+    # the app keeps one price provider per process; each test has its own price file
+    st.cache_resource.clear()
+    st.cache_data.clear()
+
+
+def _price_file(tmp_path, tickers):
+    # a year of random-walk prices up to today, in one wide file
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range(end=pd.Timestamp(date.today()), periods=260)
+    prices = pd.DataFrame(
+        100 * np.exp(np.cumsum(rng.normal(0, 0.01, size=(len(dates), len(tickers))), axis=0)),
+        columns=tickers,
+    )
+    prices.insert(0, "Date", dates)
+    path = tmp_path / "prices.csv"
+    prices.to_csv(path, index=False)
+    return path
+
+
+def test_app_runs_with_many_tickers(tmp_path, monkeypatch):
+    # 20+ tickers: the absorption ratio then needs more than 3 components
+    tickers = [f"T{i:02d}" for i in range(24)]
+    monkeypatch.setenv("PRICE_DATA_DIR", str(_price_file(tmp_path, tickers)))
+
+    at = AppTest.from_file(str(Path(__file__).parent.parent / "main.py"), default_timeout=120)
+    at.session_state["applied_df"] = pd.DataFrame(
+        {"Tickers": tickers, "Allocation Percentage": 100 / len(tickers)}
+    )
+    at.run()
+
+    assert not at.exception
+    assert "Correlation Matrix" in [h.value for h in at.header]
+
+
+@pytest.mark.parametrize("chosen", ["Minimum variance", "Maximum Sharpe", "Risk parity"])
+def test_applied_optimiser_allocation_adds_up_to_100(tmp_path, monkeypatch, chosen):
+    tickers = [f"T{i:02d}" for i in range(24)]
+    monkeypatch.setenv("PRICE_DATA_DIR", str(_price_file(tmp_path, tickers)))
+
+    at = AppTest.from_file(str(Path(__file__).parent.parent / "main.py"), default_timeout=120)
+    at.session_state["applied_df"] = pd.DataFrame(
+        {"Tickers": tickers, "Allocation Percentage": 100 / len(tickers)}
+    )
+    at.run()
+    next(t for t in at.toggle if t.label == "Optimise allocation").set_value(True).run()
+    next(s for s in at.selectbox if s.label == "Allocation").set_value(chosen).run()
+    next(b for b in at.button if b.label == "Use this allocation").click().run()
+
+    assert not at.exception
+    assert not at.error
+    assert at.session_state["applied_df"]["Allocation Percentage"].sum() == pytest.approx(100, abs=1e-9)
+
+
+@pytest.mark.parametrize("freq", ["D", "W", "M", "Q"])
+def test_block_bootstrap_runs_at_every_frequency(tmp_path, monkeypatch, freq):
+    tickers = ["A", "B", "C"]
+    monkeypatch.setenv("PRICE_DATA_DIR", str(_price_file(tmp_path, tickers)))
+
+    at = AppTest.from_file(str(Path(__file__).parent.parent / "main.py"), default_timeout=120)
+    at.session_state["applied_df"] = pd.DataFrame(
+        {"Tickers": tickers, "Allocation Percentage": [50.0, 30.0, 20.0]}
+    )
+    at.session_state["applied_freq"] = freq
+    at.run()
+    next(t for t in at.toggle if t.label == "Monte Carlo simulation").set_value(True).run()
+    next(s for s in at.selectbox if s.label == "Method").set_value("block_bootstrap").run()
+
+    assert not at.exception
+    assert not at.error
+    assert "Probability of Loss" in [m.label for m in at.metric]
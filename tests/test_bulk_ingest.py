@@ -0,0 +1,125 @@
+from app_lib.bulk_ingest import ingest_universe
+from app_lib.price_provider import NO_DATA_REASON, PriceProvider, combine_close_series
+from app_lib.price_store import PriceStore
+import json
+import pandas as pd
+import pytest
+
+
+DATES = pd.to_datetime(["2024-01-02", "2024-01-03", "2024-01-04"])
+
+
+class FakeProvider(PriceProvider):
+    """
+    Fixed prices; tickers in `down` raise a download failure, "BAD*"
+    tickers never have data and `empty` maps tickers to the number of
+    fetches that come back without data before they do.
+    """
+
+    def __init__(self, down=(), empty=None):
+        self.calls = []
+        self.down = set(down)
+        self.empty = dict(empty or {})
+
+    def fetch(self, tickers, start_date, end_date):
+        self.calls.append(list(tickers))
+        close_series = {}
+        failed = {}
+        for t in tickers:
+            if t in self.down:
+                failed[t] = "Price download failed: rate limited"
+            elif t.startswith("BAD") or self.empty.get(t, 0) > 0:
+                self.empty[t] = self.empty.get(t, 0) - 1
+                failed[t] = NO_DATA_REASON
+            else:
+                close_series[t] = pd.Series([1.0, 2.0, 3.0], index=DATES, name=t)
+        return combine_close_series(tickers, close_series, failed)
+
+
+UNIVERSE = ["A", "B", "BAD1", "C", "D", "E", "F"]
+
+
+def test_ingest_universe_report_and_store(tmp_path):
+    store = PriceStore(tmp_path / "prices.sqlite")
+    provider = FakeProvider()
+
+    report = ingest_universe(
+        UNIVERSE, "2024-01-01", "2024-01-05", store,
+        checkpoint_path=str(tmp_path / "checkpoint.json"), shard_size=3, provider=provider,
+        no_data_attempts=1,
+    )
+
+    assert report["requested"] == UNIVERSE
+    assert report["valid"] == ["A", "B", "C", "D", "E", "F"]
+    assert list(report["failed"]) == ["BAD1"]
+    assert report["complete"]
+    assert provider.calls == [["A", "B", "BAD1"], ["C", "D", "E"], ["F"]]
+
+    held = store.read(["A", "F"], "2024-01-01", "2024-01-05")
+    assert held["F"].tolist() == [1.0, 2.0, 3.0]
+
+
+def test_ingest_universe_resumes_from_checkpoint(tmp_path):
+    store = PriceStore(tmp_path / "prices.sqlite")
+    checkpoint = str(tmp_path / "checkpoint.json")
+
+    # first run: the second shard is rate limited
+    first = ingest_universe(
+        UNIVERSE, "2024-01-01", "2024-01-05", store,
+        checkpoint_path=checkpoint, shard_size=3, provider=FakeProvider(down={"D"}),
+        no_data_attempts=1,
+    )
+
+    assert not first["complete"]
+    assert first["failed"]["D"].startswith("Price download failed")
+
+    with open(checkpoint) as f:
+        assert sorted(json.load(f)["shards"]) == ["0", "2"]
+
+    # second run: only the unfinished shard is fetched, and only its missing ticker
+    provider = FakeProvider()
+    second = ingest_universe(
+        UNIVERSE, "2024-01-01", "2024-01-05", store,
+        checkpoint_path=checkpoint, shard_size=3, provider=provider,
+        no_data_attempts=1,
+    )
+
+    assert provider.calls == [["D"]]
+    assert second["complete"]
+    assert second["valid"] == ["A", "B", "C", "D", "E", "F"]
+    assert list(second["failed"]) == ["BAD1"]
+
+
+def test_ingest_universe_retries_tickers_without_data(tmp_path):
+    store = PriceStore(tmp_path / "prices.sqlite")
+    checkpoint = str(tmp_path / "checkpoint.json")
+
+    # D comes back all-NaN once (rate limited), BAD1 never has data
+    provider = FakeProvider(empty={"D": 1})
+    report = ingest_universe(
+        UNIVERSE, "2024-01-01", "2024-01-05", store,
+        checkpoint_path=checkpoint, shard_size=3, provider=provider,
+        no_data_attempts=3, retry_sleep_seconds=0.0,
+    )
+
+    # retried within the run, only the empty tickers
+    assert provider.calls == [["A", "B", "BAD1"], ["BAD1"], ["BAD1"], ["C", "D", "E"], ["D"], ["F"]]
+    assert report["complete"]
+    assert report["valid"] == ["A", "B", "C", "D", "E", "F"]
+    assert report["failed"] == {"BAD1": NO_DATA_REASON}
+    assert store.read(["D"], "2024-01-01", "2024-01-05")["D"].tolist() == [1.0, 2.0, 3.0]
+
+    with open(checkpoint) as f:
+        assert sorted(json.load(f)["shards"]) == ["0", "1", "2"]
+
+def test_ingest_universe_rejects_other_checkpoint(tmp_path):
+    store = PriceStore(tmp_path / "prices.sqlite")
+    checkpoint = str(tmp_path / "checkpoint.json")
+
+    ingest_universe(UNIVERSE, "2024-01-01", "2024-01-05", store,
+                    checkpoint_path=checkpoint, shard_size=3, provider=FakeProvider(),
+                    no_data_attempts=1)
+
+    with pytest.raises(ValueError, match="different run"):
+        ingest_universe(UNIVERSE, "2024-01-01", "2024-01-05", store,
+                        checkpoint_path=checkpoint, shard_size=2, provider=FakeProvider())
@@ -0,0 +1,69 @@
+from app_lib.cluster import cluster_corr, corr_distance
+import numpy as np
+import pandas as pd
+from scipy.cluster.hierarchy import leaves_list, linkage, optimal_leaf_ordering
+from app_lib import cluster
+
+
+def _block_corr():
+    # two groups, shuffled: {A, C, E} and {B, D}
+    rng = np.random.default_rng(0)
+    f1, f2 = rng.normal(size=(2, 300))
+    noise = rng.normal(scale=0.3, size=(5, 300))
+    series = {
+        "A": f1 + noise[0], "B": f2 + noise[1], "C": f1 + noise[2],
+        "D": f2 + noise[3], "E": f1 + noise[4],
+    }
+    return pd.DataFrame(series).corr()
+
+
+def test_cluster_corr_groups_correlated_assets():
+    corr = _block_corr()
+
+    ordered, tree = cluster_corr(corr)
+
+    order = list(ordered.index)
+    assert list(ordered.columns) == order
+    assert sorted(order) == sorted(corr.index)
+    # each group is contiguous
+    groups = ["ACE", "BD"]
+    positions = [sorted(order.index(t) for t in g) for g in groups]
+    for p in positions:
+        assert p == list(range(p[0], p[0] + len(p)))
+
+    assert tree.shape == (4, 4)
+    assert [corr.index[i] for i in leaves_list(tree)] == order
+    assert ordered.loc["A", "C"] == corr.loc["A", "C"]
+
+
+def test_optimal_ordering_skipped_for_large_matrices(monkeypatch):
+    corr = _block_corr()
+    dist = corr_distance(corr)
+    monkeypatch.setattr(cluster, "_OPTIMAL_ORDERING_MAX_ASSETS", 4)
+
+    _, tree = cluster_corr(corr)
+    _, forced = cluster_corr(corr, optimal_ordering=True)
+
+    np.testing.assert_array_equal(tree, linkage(dist, method="average"))
+    np.testing.assert_array_equal(forced, optimal_leaf_ordering(linkage(dist, method="average"), dist))
+
+
+def test_corr_distance_condensed_and_nan():
+    corr = pd.DataFrame(
+        [[1.0, 1.0, np.nan], [1.0, 1.0, -1.0], [np.nan, -1.0, 1.0]],
+        index=list("XYZ"), columns=list("XYZ"),
+    )
+
+    dist = corr_distance(corr)
+
+    # condensed order: XY, XZ, YZ
+    np.testing.assert_allclose(dist, [0.0, np.sqrt(0.5), 1.0])
+
+
+def test_cluster_corr_single_asset():
+    corr = pd.DataFrame([[1.0]], index=["A"], columns=["A"])
+
+    ordered, tree = cluster_corr(corr)
+
+    assert list(ordered.index) == ["A"]
+    assert len(tree) == 0
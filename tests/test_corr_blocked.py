@@ -0,0 +1,94 @@
+from app_lib.corr_blocked import blocked_corr, correlated_pairs
+import numpy as np
+import pandas as pd
+import pytest
+
+
+# T1 moves with T0, and T7 has too few rows in common with anything
+RETURNS = dict(n_rows=120, n_cols=23, factors=[[0.02, 0.02] + [0] * 21], missing=0.1, late={"T7": 118})
+
+
+@pytest.mark.parametrize("block_size", [1, 5, 64])
+def test_blocked_corr_matches_pandas(block_size, make_returns):
+    df = make_returns(**RETURNS)
+
+    corr, columns = blocked_corr(df, block_size=block_size)
+
+    expected = df.drop(columns="Date").corr(min_periods=3)
+    assert columns == list(expected.columns)
+    np.testing.assert_allclose(corr, expected.to_numpy(), rtol=1e-10, atol=1e-12)
+
+
+def test_blocked_corr_memmap_and_process_pool(tmp_path, make_returns):
+    df = make_returns(seed=1, **RETURNS)
+    path = tmp_path / "corr.npy"
+
+    corr, _ = blocked_corr(df, block_size=6, path=str(path), max_workers=2, dtype=np.float32)
+
+    expected = df.drop(columns="Date").corr(min_periods=3).to_numpy()
+    reloaded = np.load(path, mmap_mode="r")
+    assert reloaded.dtype == np.float32
+    np.testing.assert_allclose(reloaded, expected, rtol=1e-5, atol=1e-6)
+
+
+def test_blocked_corr_bad_block_size():
+    with pytest.raises(ValueError):
+        blocked_corr(pd.DataFrame({"Date": pd.date_range("2024-01-01", periods=3), "A": [1.0, 2.0, 3.0]}), block_size=0)
+
+
+def _all_pairs(df):
+    corr = df.drop(columns="Date").corr(min_periods=3)
+    valid = df.drop(columns="Date").notna().astype(int)
+    counts = valid.T @ valid
+    cols = list(corr.columns)
+    rows = [
+        (a, b, corr.loc[a, b], counts.loc[a, b])
+        for i, a in enumerate(cols) for b in cols[i + 1:]
+        if not np.isnan(corr.loc[a, b])
+    ]
+    return pd.DataFrame(rows, columns=["ticker_a", "ticker_b", "corr", "overlap_n"])
+
+
+@pytest.mark.parametrize("block_size", [4, 64])
+def test_correlated_pairs_top_k(block_size, make_returns):
+    df = make_returns(seed=2, **RETURNS)
+
+    result = correlated_pairs(df, k=10, block_size=block_size)
+
+    expected = _all_pairs(df).sort_values("corr", ascending=False).head(10)
+    assert list(zip(result["ticker_a"], result["ticker_b"])) == list(zip(expected["ticker_a"], expected["ticker_b"]))
+    np.testing.assert_allclose(result["corr"], expected["corr"], rtol=1e-10)
+    assert result["overlap_n"].tolist() == expected["overlap_n"].tolist()
+    assert ("T0", "T1") == (result["ticker_a"][0], result["ticker_b"][0])
+
+
+def test_correlated_pairs_threshold_absolute(make_returns):
+    df = make_returns(seed=3, **RETURNS)
+    df["T2"] = -df["T0"] + 0.001 * df["T3"].fillna(0)
+
+    result = correlated_pairs(df, threshold=0.5, absolute=True, block_size=5)
+
+    pairs = _all_pairs(df)
+    expected = pairs[pairs["corr"].abs() >= 0.5]
+    assert set(zip(result["ticker_a"], result["ticker_b"])) == set(zip(expected["ticker_a"], expected["ticker_b"]))
+    assert (result["corr"] < 0).any()
+    assert result["corr"].abs().is_monotonic_decreasing
+
+
+def test_correlated_pairs_small_frame():
+    df = pd.DataFrame({
+        "Date": ["2024-01-01", "2024-01-02", "2024-01-03", "2024-01-04"],
+        "A": [1.0, 2.0, 3.0, 4.0],
+        "B": [2.0, 4.0, 6.0, 8.0],
+        "C": [4.0, 3.0, 2.0, 1.0],
+    })
+
+    top = correlated_pairs(df, k=1)
+    assert (top["ticker_a"][0], top["ticker_b"][0], top["corr"][0]) == ("A", "B", pytest.approx(1.0))
+    assert top["overlap_n"][0] == 4
+
+    assert len(correlated_pairs(df, threshold=0.9, absolute=True)) == 3
+    assert len(correlated_pairs(df, threshold=0.9)) == 1
+
+    with pytest.raises(ValueError):
+        correlated_pairs(df)
@@ -1,4 +1,8 @@
-from app_lib.corr_matrix import corr_matrix
+from app_lib.corr_matrix import corr_matrix, pairwise_corr, CorrelationAccumulator, _count_inversions
+from app_lib import corr_matrix as corr_module
+from app_lib.corr_blocked import blocked_corr
+from app_lib.corr_rolling import rolling_corr
+import numpy as np
 import pandas as pd
 import pytest
 from pandas.testing import assert_frame_equal
@@ -75,4 +79,215 @@ def test_matrix_all_na():
             "B": [pd.NA, pd.NA, pd.NA, pd.NA],
             }
         df = pd.DataFrame(data)
-        result = corr_matrix(df)
\ No newline at end of file
+        result = corr_matrix(df)
+
+
+# T1 moves with T0, and T5 is listed late
+RETURNS = dict(mean=0.001, factors=[[0.02, 0.02, 0, 0, 0, 0]], missing=0.1, late={"T5": 50})
+
+
+def test_accumulator_matches_corr_matrix_in_batches(make_returns):
+    df = make_returns(**RETURNS)
+    cols = [c for c in df.columns if c != "Date"]
+
+    acc = CorrelationAccumulator(cols)
+    for start in range(0, len(df), 37):
+        acc.update(df.iloc[start:start + 37])
+
+    expected = df.drop(columns="Date").corr(min_periods=3)
+    assert_frame_equal(acc.corr(), expected, rtol=1e-10, atol=1e-12)
+    assert acc.counts().loc["T0", "T5"] == df[["T0", "T5"]].dropna().shape[0]
+
+
+def test_accumulator_merge_of_shards(make_returns):
+    df = make_returns(seed=1, **RETURNS)
+    cols = [c for c in df.columns if c != "Date"]
+
+    left = CorrelationAccumulator(cols).update(df.iloc[:120])
+    right = CorrelationAccumulator(cols).update(df.iloc[120:].to_numpy()[:, 1:].astype(float))
+
+    expected = df.drop(columns="Date").corr(min_periods=3)
+    assert_frame_equal(left.merge(right).corr(), expected, rtol=1e-10, atol=1e-12)
+
+    with pytest.raises(ValueError):
+        left.merge(CorrelationAccumulator(cols[:2]))
+
+
+def test_accumulator_needs_three_complete_rows():
+    acc = CorrelationAccumulator(["A", "B"])
+    acc.update(pd.DataFrame({"A": [1.0, 2.0, np.nan], "B": [3.0, 1.0, 2.0]}))
+
+    with pytest.raises(ValueError):
+        acc.corr()
+
+
+def test_pairwise_corr_matches_pandas_with_counts(make_returns):
+    df = make_returns(seed=2, **RETURNS)
+    df["T3"] = 0.01  # no variance -> NaN, as in pandas
+    df.loc[:196, "T4"] = np.nan  # only 3 rows -> thin but valid
+
+    corr, counts = pairwise_corr(df)
+
+    expected = df.drop(columns="Date").corr(min_periods=3)
+    assert_frame_equal(corr, expected, rtol=1e-10, atol=1e-12)
+
+    valid = df.drop(columns="Date").notna().astype(int)
+    assert_frame_equal(counts, valid.T @ valid)
+
+
+def test_pairwise_corr_min_periods():
+    df = pd.DataFrame({
+        "Date": pd.date_range("2024-01-01", periods=5),
+        "A": [1.0, 2.0, 3.0, 4.0, 5.0],
+        "B": [1.0, np.nan, np.nan, 2.0, 4.0],
+    })
+
+    corr, counts = pairwise_corr(df, min_periods=4)
+
+    assert counts.loc["A", "B"] == 3
+    assert np.isnan(corr.loc["A", "B"])
+    assert corr.loc["A", "A"] == 1.0
+    assert np.isnan(corr.loc["B", "B"])
+
+
+def test_pairwise_corr_constant_over_the_overlap_is_nan():
+    # B only moves where A is missing: rounding must not make up a correlation
+    df = pd.DataFrame({
+        "Date": pd.date_range("2024-01-01", periods=5),
+        "A": [0.01, -0.02, 0.03, np.nan, np.nan],
+        "B": [0.1, 0.1, 0.1, 0.5, -0.2],
+    })
+
+    corr, _ = pairwise_corr(df)
+    blocked, _ = blocked_corr(df, block_size=1)
+    rolling = rolling_corr(df, window=5)
+
+    assert np.isnan(corr.loc["A", "B"])
+    assert np.isnan(blocked[0, 1])
+    assert np.isnan(rolling.pair("A", "B").iloc[-1])
+    assert np.isnan(df.drop(columns="Date").corr().loc["A", "B"])
+
+
+def test_matrix_return_counts():
+    df = pd.DataFrame({
+        "Date": ["2024-01-01", "2024-01-02", "2024-01-03", "2024-01-04"],
+        "A": [1, 2, 3, 4],
+        "B": [4, None, 2, 1],
+        "C": [8, 6, 4, 2]
+    })
+
+    matrix, counts = corr_matrix(df, return_counts=True)
+
+    assert_frame_equal(matrix, corr_matrix(df))
+    assert counts.loc["A", "B"] == 3
+    assert counts.loc["A", "C"] == 4
+
+
+def _kendall_tau_b(a, b):
+    # brute-force O(T^2) reference on the pair's common rows
+    both = ~np.isnan(a) & ~np.isnan(b)
+    a, b = a[both], b[both]
+    upper = np.triu_indices(len(a), 1)
+    sx = np.sign(a[:, None] - a[None, :])[upper]
+    sy = np.sign(b[:, None] - b[None, :])[upper]
+    return (sx * sy).sum() / np.sqrt((sx ** 2).sum() * (sy ** 2).sum())
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_pairwise_corr_spearman_matches_pandas(seed, make_returns):
+    df = make_returns(n_rows=80, seed=seed, **RETURNS)
+    df["T2"] = df["T2"].round(2)  # ties
+
+    corr, counts = pairwise_corr(df, method="spearman")
+
+    expected = df.drop(columns="Date").corr(method="spearman", min_periods=3)
+    assert_frame_equal(corr, expected, rtol=1e-10, atol=1e-12)
+    assert counts.loc["T0", "T5"] == df[["T0", "T5"]].dropna().shape[0]
+
+
+def test_pairwise_corr_spearman_same_dates(make_returns):
+    df = make_returns(n_rows=50, **RETURNS).dropna()
+
+    corr, _ = pairwise_corr(df, method="spearman")
+
+    expected = df.drop(columns="Date").corr(method="spearman")
+    assert_frame_equal(corr, expected, rtol=1e-10, atol=1e-12)
+
+
+def test_pairwise_corr_kendall_matches_reference(make_returns):
+    df = make_returns(n_rows=70, seed=3, **RETURNS)
+    df["T1"] = df["T1"].round(2)
+    df["T2"] = df["T2"].round(2)
+    values = df.drop(columns="Date").to_numpy()
+
+    corr, _ = pairwise_corr(df, method="kendall")
+
+    n = values.shape[1]
+    expected = np.array([
+        [_kendall_tau_b(values[:, i], values[:, j]) for j in range(n)] for i in range(n)
+    ])
+    np.testing.assert_allclose(corr.to_numpy(), expected, rtol=1e-12, atol=1e-12)
+
+
+@pytest.mark.parametrize("n_rows", [0, 1, 2, 9, 37, 100])
+def test_count_inversions_matches_brute_force(n_rows):
+    # ties, and lengths that leave a shorter last block at some merge level
+    values = np.random.default_rng(n_rows).integers(0, n_rows // 3 + 2, size=(4, n_rows))
+
+    result = _count_inversions(values, n_rows // 3 + 2)
+
+    expected = [
+        sum(row[a] > row[b] for a in range(n_rows) for b in range(a + 1, n_rows)) for row in values
+    ]
+    np.testing.assert_array_equal(result, expected)
+
+
+def test_pairwise_corr_kendall_long_history_uses_pandas(monkeypatch, make_returns):
+    df = make_returns(n_rows=70, seed=3, **RETURNS)
+    df["T1"] = df["T1"].round(2)
+    df["Flat"] = 0.01
+    vectorised, _ = pairwise_corr(df, method="kendall")
+
+    monkeypatch.setattr(corr_module, "_KENDALL_MAX_ROWS", 50)
+    corr, _ = pairwise_corr(df, method="kendall")
+
+    assert_frame_equal(corr, vectorised, rtol=1e-10, atol=1e-12)
+    assert np.isnan(corr.loc["Flat", "Flat"])
+
+
+def test_pairwise_corr_kendall_constant_diagonal_differs_from_pandas():
+    df = pd.DataFrame({
+        "Date": pd.date_range("2024-01-01", periods=4),
+        "A": [1.0, 3.0, 2.0, 4.0],
+        "C": [5.0, 5.0, 5.0, 5.0],
+    })
+
+    corr, _ = pairwise_corr(df, method="kendall")
+
+    # no variance: NaN as for the other methods, where pandas gives 1
+    assert np.isnan(corr.loc["C", "C"])
+    assert df.drop(columns="Date").corr(method="kendall").loc["C", "C"] == 1.0
+    assert corr.loc["A", "A"] == 1.0
+
+
+def test_pairwise_corr_rank_min_periods_and_bad_method():
+    df = pd.DataFrame({
+        "Date": pd.date_range("2024-01-01", periods=5),
+        "A": [1.0, 2.0, 3.0, 4.0, 5.0],
+        "B": [1.0, np.nan, np.nan, 2.0, 4.0],
+        "C": [5.0, 5.0, 5.0, 5.0, 5.0],
+    })
+
+    for method in ["spearman", "kendall"]:
+        corr, _ = pairwise_corr(df, min_periods=4, method=method)
+        assert np.isnan(corr.loc["A", "B"])
+        assert np.isnan(corr.loc["A", "C"])  # no variance
+        assert corr.loc["A", "A"] == 1.0
+        assert np.isnan(corr.loc["C", "C"])
+
+    assert corr_matrix(df.fillna(3.0), method="kendall").loc["A", "B"] == pytest.approx(
+        _kendall_tau_b(df["A"].to_numpy(), df["B"].fillna(3.0).to_numpy())
+    )
+
+    with pytest.raises(ValueError, match="Unknown correlation method"):
+        pairwise_corr(df, method="distance")
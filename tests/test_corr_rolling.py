@@ -0,0 +1,42 @@
+from app_lib.corr_rolling import rolling_corr
+import numpy as np
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+
+# T1 moves with T0, and T4 is listed late
+RETURNS = dict(n_rows=80, n_cols=5, factors=[[0.02, 0.02, 0, 0, 0]], missing=0.15, late={"T4": 30})
+
+
+@pytest.mark.parametrize("block_size", [None, 1, 7])
+def test_rolling_corr_matches_windowed_pandas(block_size, make_returns):
+    df = make_returns(**RETURNS)
+    window = 20
+
+    result = rolling_corr(df, window, block_size=block_size)
+
+    assert result.values.shape == (80, 5, 5)
+    for t in [0, 2, 5, 19, 20, 35, 79]:
+        expected = df.iloc[max(0, t - window + 1):t + 1].drop(columns="Date").corr(min_periods=3)
+        assert_frame_equal(result.at(df["Date"].iloc[t]), expected, rtol=1e-9, atol=1e-12)
+
+
+def test_rolling_corr_pair_and_memmap(tmp_path, make_returns):
+    df = make_returns(seed=3, **RETURNS)
+    path = tmp_path / "rolling.npy"
+
+    result = rolling_corr(df, 10, path=str(path), dtype=np.float32)
+    series = result.pair("T0", "T1")
+
+    assert series.index.equals(pd.DatetimeIndex(df["Date"]))
+    assert series.dtype == np.float32
+    assert np.isnan(series.iloc[1])  # fewer than 3 overlapping rows
+
+    reloaded = np.load(path, mmap_mode="r")
+    np.testing.assert_array_equal(reloaded[:, 0, 1], series.to_numpy())
+
+
+def test_rolling_corr_bad_window():
+    with pytest.raises(ValueError):
+        rolling_corr(pd.DataFrame({"Date": pd.date_range("2024-01-01", periods=3), "A": [1.0, 2.0, 3.0]}), 0)
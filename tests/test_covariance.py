@@ -0,0 +1,105 @@
+from app_lib.covariance import (
+    CovarianceEstimator, SampleCovariance, LedoitWolfCovariance, EWMACovariance, cov_to_corr, ESTIMATORS,
+)
+import numpy as np
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+
+# every asset a random mix of the same 25 shocks
+RETURNS = dict(n_rows=40, n_cols=25, scale=0.0, factors=25)
+
+
+def test_sample_covariance_uses_complete_rows(make_returns):
+    df = make_returns(n_rows=40, n_cols=4)
+    df.loc[3, "T2"] = np.nan
+
+    result = SampleCovariance().fit(df)
+
+    expected = df.drop(columns="Date").dropna().cov()
+    assert_frame_equal(result.covariance(), expected)
+    assert_frame_equal(result.correlation(), df.drop(columns="Date").dropna().corr())
+
+
+def test_ledoit_wolf_identity_by_hand():
+    df = pd.DataFrame({
+        "Date": pd.date_range("2024-01-01", periods=4),
+        "A": [2.0, -2.0, 0.0, 0.0],
+        "B": [1.0, -1.0, 1.0, -1.0],
+    })
+
+    est = LedoitWolfCovariance().fit(df)
+
+    # sample [[2, 1], [1, 1]] (ddof 0), target 1.5 I: delta = 1.25 and
+    # beta = (sum((y^2)' y^2) / t - sum(sample^2)) / (n t) = (13 - 7) / 8
+    assert est.shrinkage == pytest.approx(0.75 / 1.25)
+    np.testing.assert_allclose(est.covariance().to_numpy(), [[1.7, 0.4], [0.4, 1.3]])
+
+
+def test_ledoit_wolf_identity_is_well_conditioned(make_returns):
+    df = make_returns(**RETURNS)
+
+    est = LedoitWolfCovariance().fit(df)
+
+    assert 0 < est.shrinkage <= 1
+    assert np.linalg.eigvalsh(est.covariance().to_numpy()).min() > 0
+
+
+def test_ledoit_wolf_constant_correlation_target(make_returns):
+    df = make_returns(n_rows=20, n_cols=25, scale=0.0, factors=25)  # fewer rows than assets: sample is singular
+
+    est = LedoitWolfCovariance("constant_correlation").fit(df)
+    cov = est.covariance().to_numpy()
+    sample = df.drop(columns="Date").cov(ddof=0).to_numpy()
+
+    assert 0 < est.shrinkage <= 1
+    np.testing.assert_allclose(np.diag(cov), np.diag(sample))  # target keeps variances
+    assert np.linalg.eigvalsh(cov).min() > 0
+    assert np.linalg.eigvalsh(sample).min() < 1e-12
+
+    with pytest.raises(ValueError):
+        LedoitWolfCovariance("diagonal")
+
+
+def test_ewma_update_matches_refit(make_returns):
+    df = make_returns(n_rows=40, n_cols=5)
+
+    full = EWMACovariance(halflife=5).fit(df)
+    updated = EWMACovariance(halflife=5).fit(df.iloc[:30]).update(df.iloc[30:])
+
+    assert_frame_equal(full.covariance(), updated.covariance(), rtol=1e-12)
+
+    # the last row weighs twice as much as the row one half-life earlier
+    one = df.iloc[-6:].copy()
+    one.iloc[:, 1:] = 0.0
+    one.iloc[0, 1] = 1.0
+    one.iloc[-1, 1] = 1.0
+    cov = EWMACovariance(halflife=5).fit(one).covariance()
+    weights = 0.5 ** (np.arange(5, -1, -1) / 5)
+    assert cov.iloc[0, 0] == pytest.approx((weights[0] + weights[-1]) / weights.sum())
+
+
+def test_estimators_need_three_complete_rows():
+    df = pd.DataFrame({"Date": ["2024-01-01", "2024-01-02"], "A": [0.01, 0.02], "B": [0.03, -0.01]})
+    for make in ESTIMATORS.values():
+        with pytest.raises(ValueError):
+            make().fit(df)
+
+    with pytest.raises(ValueError):
+        EWMACovariance().covariance()
+
+
+def test_base_estimator_is_abstract():
+    with pytest.raises(TypeError):
+        CovarianceEstimator()
+
+
+def test_cov_to_corr_zero_variance():
+    cov = pd.DataFrame([[4.0, 2.0, 0.0], [2.0, 4.0, 0.0], [0.0, 0.0, 0.0]])
+
+    corr = cov_to_corr(cov)
+
+    assert corr.iloc[0, 1] == pytest.approx(0.5)
+    assert np.isnan(corr.iloc[2, 2])
+    assert np.isnan(corr.iloc[0, 2])
@@ -1,4 +1,6 @@
-from app_lib.data_transform import log_return, normalize_to_100
+from app_lib.data_transform import (
+    log_return, normalize_to_100, normalize_variants, resampled_log_return, transform_state, update_transforms,
+)
 import pandas as pd
 import numpy as np
 import pytest
@@ -130,4 +132,148 @@ def test_normalize_to_100_null():
     for col in cols: 
         expected[col] = expected[col].astype(float)
 
-    assert_frame_equal(result, expected)
\ No newline at end of file
+    assert_frame_equal(result, expected)
+
+
+def test_log_return_matches_per_column_reference():
+    # reference: per-column returns against the last available price
+    rng = np.random.default_rng(0)
+    prices = np.exp(rng.normal(0, 0.02, (60, 5)).cumsum(axis=0)) * 100
+    prices[rng.random((60, 5)) < 0.2] = np.nan
+    prices[:10, 0] = np.nan
+    prices[:, 4] = np.nan
+
+    df = pd.DataFrame(prices, columns=list("ABCDE"))
+    df.insert(0, "Date", pd.date_range("2024-01-01", periods=60))
+
+    expected = df.copy()
+    for c in "ABCDE":
+        expected[c] = np.log(df[c].dropna()).diff().reindex(df.index)
+
+    result = log_return(df, "Date")
+
+    assert_frame_equal(result, expected, check_exact=True)
+
+
+def test_log_return_no_copy_and_float32():
+    data = {
+        "Date": ["2024-01-01", "2024-01-02", "2024-01-03"],
+        "A": [1.0, np.nan, 4.0],
+        "B": [2.0, 4.0, 8.0]
+    }
+    df = pd.DataFrame(data)
+
+    result_32 = log_return(df, "Date", dtype=np.float32)
+
+    assert (result_32[["A", "B"]].dtypes == np.float32).all()
+    np.testing.assert_allclose(result_32["A"], [np.nan, np.nan, np.log(4)], rtol=1e-6)
+
+    result = log_return(df, "Date", copy=False)
+
+    assert result is df
+    np.testing.assert_allclose(df["B"], [np.nan, np.log(2), np.log(2)])
+
+
+def test_update_transforms_matches_full_recompute():
+    df = pd.DataFrame({
+        "Date": pd.date_range("2024-01-01", periods=6),
+        "A": [1.0, 2.0, np.nan, 3.0, 4.0, np.nan],
+        "B": [np.nan, np.nan, np.nan, 5.0, np.nan, 6.0],
+        "C": [2.0, 2.5, 3.0, np.nan, np.nan, 3.5],
+    })
+    history, appended = df.iloc[:3], df.iloc[3:]
+
+    state = transform_state(history)
+    returns, indexed, state = update_transforms(state, appended)
+
+    assert_frame_equal(returns, log_return(df).iloc[3:])
+    assert_frame_equal(indexed, normalize_to_100(df).iloc[3:])
+    assert state.last_price.to_dict() == {"A": 4.0, "B": 6.0, "C": 3.5}
+    assert state.base_price.to_dict() == {"A": 1.0, "B": 5.0, "C": 2.0}
+
+
+def test_update_transforms_new_ticker_and_bad_price():
+    state = transform_state(pd.DataFrame({"Date": ["2024-01-01"], "A": [2.0]}))
+    new = pd.DataFrame({"Date": ["2024-01-02"], "A": [4.0], "Z": [10.0]})
+
+    returns, indexed, state = update_transforms(state, new)
+
+    assert returns["A"].iloc[0] == pytest.approx(np.log(2.0))
+    assert np.isnan(returns["Z"].iloc[0])
+    assert indexed["Z"].iloc[0] == 100.0
+    assert list(state.base_price.index) == ["A", "Z"]
+
+    with pytest.raises(ValueError):
+        update_transforms(state, pd.DataFrame({"Date": ["2024-01-03"], "A": [0.0]}))
+
+
+def test_normalize_variants():
+    df = pd.DataFrame({
+        "Date": pd.to_datetime(["2024-01-01", "2024-01-02", "2024-01-03", "2024-01-04"]),
+        "A": [1.0, 2.0, np.nan, 4.0],
+        "B": [np.nan, 10.0, 20.0, 40.0],
+    })
+
+    variants = normalize_variants(df, base_date="2024-01-03")
+
+    assert_frame_equal(variants["first_valid"], normalize_to_100(df))
+    assert variants["common_start"]["A"].tolist()[1:] == [100.0, pytest.approx(np.nan, nan_ok=True), 200.0]
+    assert variants["common_start"]["B"].tolist()[1:] == [100.0, 200.0, 400.0]
+    # A has no price on the base date, so its base is the next one
+    assert variants["base_date"]["A"].tolist()[-1] == 100.0
+    assert variants["base_date"]["B"].tolist() == [pytest.approx(np.nan, nan_ok=True), 50.0, 100.0, 200.0]
+
+    only = normalize_variants(df, variants={"common_start"})
+    assert list(only) == ["common_start"]
+    assert_frame_equal(only["common_start"], variants["common_start"])
+
+    with pytest.raises(ValueError):
+        normalize_variants(df, variants={"base_date"})
+
+
+def test_normalize_to_100_coerces_non_numeric():
+    df = pd.DataFrame({"Date": ["2024-01-01", "2024-01-02"], "A": [None, "2"], "B": [4, 8]})
+
+    result = normalize_to_100(df)
+
+    assert np.isnan(result["A"].iloc[0])
+    assert result["A"].iloc[1] == 100.0
+    assert result["B"].tolist() == [100.0, 200.0]
+
+
+def test_log_return_coerces_non_numeric():
+    df = pd.DataFrame({"Date": pd.date_range("2024-01-01", periods=4), "A": [None, "2", "n/a", "4"]})
+
+    result = log_return(df)
+
+    assert result["A"].isna().tolist() == [True, True, True, False]
+    assert result["A"].iloc[3] == pytest.approx(np.log(2))
+
+
+def test_resampled_log_return_weekly():
+    dates = pd.bdate_range("2024-01-01", periods=15)  # Mon 1 Jan .. Fri 19 Jan
+    df = pd.DataFrame({
+        "Date": dates,
+        "A": np.arange(1.0, 16.0),
+        "B": np.arange(1.0, 16.0) * 2,
+    })
+    df.loc[14, "B"] = np.nan  # last Friday missing -> Thursday's price is used
+
+    result, periods = resampled_log_return(df, "W")
+
+    assert periods == 52
+    assert result["Date"].tolist() == list(pd.to_datetime(["2024-01-05", "2024-01-12", "2024-01-19"]))
+    assert np.isnan(result["A"].iloc[0])
+    assert result["A"].iloc[1] == pytest.approx(np.log(10 / 5))
+    assert result["B"].iloc[2] == pytest.approx(np.log(28 / 20))
+
+
+def test_resampled_log_return_daily_and_bad_freq():
+    df = pd.DataFrame({"Date": pd.to_datetime(["2024-01-01", "2024-01-02"]), "A": [1.0, 2.0]})
+
+    result, periods = resampled_log_return(df, "D")
+    assert periods == 252
+    assert_frame_equal(result, log_return(df))
+
+    with pytest.raises(ValueError, match="Unsupported frequency"):
+        resampled_log_return(df, "Y")
@@ -0,0 +1,155 @@
+from app_lib.fetch_coordinator import TokenBucket, FetchCoordinator, get_fetch_coordinator
+from app_lib.price_provider import PriceProvider, PriceDownloadError, combine_close_series
+from app_lib.stock_api import ticker_closed_price
+import threading
+import pandas as pd
+import pytest
+
+
+DATES = pd.to_datetime(["2024-01-02", "2024-01-03", "2024-01-04"])
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class CountingProvider(PriceProvider):
+    """Serves fixed prices; optionally blocks until released."""
+
+    def __init__(self, release=None, fail=False):
+        self.calls = []
+        self.release = release
+        self.started = threading.Event()
+        self.fail = fail
+
+    def fetch(self, tickers, start_date, end_date):
+        self.calls.append(list(tickers))
+        self.started.set()
+        if self.release is not None:
+            self.release.wait(5)
+        if self.fail:
+            raise PriceDownloadError("rate limited")
+        close_series = {
+            t: pd.Series([1.0, 2.0, 3.0], index=DATES, name=t)
+            for t in tickers if t != "NOPE"
+        }
+        return combine_close_series(tickers, close_series, {"NOPE": "bad ticker"})
+
+
+def test_token_bucket_throttles_after_burst():
+    clock = FakeClock()
+    bucket = TokenBucket(rate_per_second=2.0, capacity=2, clock=clock, sleep=clock.sleep)
+
+    waits = [bucket.acquire() for _ in range(4)]
+
+    assert waits[:2] == [0.0, 0.0]
+    assert waits[2] == pytest.approx(0.5)
+    assert waits[3] == pytest.approx(0.5)
+    assert bucket.throttled_seconds == pytest.approx(1.0)
+
+
+def test_token_bucket_refills():
+    clock = FakeClock()
+    bucket = TokenBucket(rate_per_second=1.0, capacity=1, clock=clock, sleep=clock.sleep)
+
+    bucket.acquire()
+    clock.now += 10
+    assert bucket.acquire() == 0.0
+
+
+def test_recent_results_are_hits():
+    provider = CountingProvider()
+    coordinator = FetchCoordinator()
+
+    coordinator.fetch(provider, ["A", "B"], "2024-01-01", "2024-01-05")
+    df, report = coordinator.fetch(provider, ["B", "C", "NOPE"], "2024-01-01", "2024-01-05")
+
+    assert provider.calls == [["A", "B"], ["C", "NOPE"]]
+    assert list(df.columns) == ["Date", "B", "C"]
+    assert report["failed"] == {"NOPE": "bad ticker"}
+
+    stats = coordinator.stats()
+    assert stats["hits"] == 1
+    assert stats["fetched"] == 4
+    assert stats["provider_calls"] == 2
+
+
+def test_results_expire():
+    clock = FakeClock()
+    provider = CountingProvider()
+    coordinator = FetchCoordinator(result_ttl_seconds=60, clock=clock, sleep=clock.sleep)
+
+    coordinator.fetch(provider, ["A"], "2024-01-01", "2024-01-05")
+    clock.now += 61
+    coordinator.fetch(provider, ["A"], "2024-01-01", "2024-01-05")
+
+    assert provider.calls == [["A"], ["A"]]
+
+
+def test_concurrent_requests_are_coalesced():
+    release = threading.Event()
+    provider = CountingProvider(release=release)
+    coordinator = FetchCoordinator()
+
+    results = {}
+
+    def first():
+        results["first"] = coordinator.fetch(provider, ["A", "B"], "2024-01-01", "2024-01-05")
+
+    t = threading.Thread(target=first)
+    t.start()
+    provider.started.wait(5)
+
+    def second():
+        results["second"] = coordinator.fetch(provider, ["A", "B"], "2024-01-01", "2024-01-05")
+
+    t2 = threading.Thread(target=second)
+    t2.start()
+
+    # the second request is waiting on the first download
+    t2.join(0.2)
+    assert t2.is_alive()
+
+    release.set()
+    t.join(5)
+    t2.join(5)
+
+    assert provider.calls == [["A", "B"]]
+    pd.testing.assert_frame_equal(results["first"][0], results["second"][0])
+    assert coordinator.stats()["coalesced"] == 2
+
+
+def test_failed_download_is_not_cached():
+    provider = CountingProvider(fail=True)
+    coordinator = FetchCoordinator()
+
+    with pytest.raises(PriceDownloadError):
+        coordinator.fetch(provider, ["A"], "2024-01-01", "2024-01-05")
+
+    provider.fail = False
+    df, report = coordinator.fetch(provider, ["A"], "2024-01-01", "2024-01-05")
+
+    assert report["valid"] == ["A"]
+    assert len(provider.calls) == 2
+
+
+def test_ticker_closed_price_with_coordinator():
+    provider = CountingProvider()
+    coordinator = FetchCoordinator()
+
+    first = ticker_closed_price(["A", "B"], "2024-01-01", "2024-01-05", provider=provider, coordinator=coordinator)
+    second = ticker_closed_price(["a", "b"], "2024-01-01", "2024-01-05", provider=provider, coordinator=coordinator)
+
+    pd.testing.assert_frame_equal(first[0], second[0])
+    assert len(provider.calls) == 1
+
+
+def test_get_fetch_coordinator_is_shared():
+    assert get_fetch_coordinator() is get_fetch_coordinator()
@@ -0,0 +1,25 @@
+from app_lib.line_chart import line_chart
+import altair as alt
+import numpy as np
+import pandas as pd
+
+def _long_prices():
+    return pd.DataFrame({
+        "Date": pd.to_datetime(["2024-01-01", "2024-01-02"] * 2),
+        "Ticker": ["A", "A", "B", "B"],
+        "Closed_price": [1.0, 2.0, 3.0, np.nan],
+        "Volatility": [0.1, 0.5, 0.3, 0.4],
+    })
+
+def test_line_chart():
+    chart = line_chart(_long_prices())
+    assert isinstance(chart, alt.LayerChart)
+    # legend follows each ticker's latest available value: B (3.0) above A (2.0)
+    assert chart.to_dict()["layer"][0]["encoding"]["color"]["sort"] == ["B", "A"]
+
+def test_line_chart_value_col():
+    chart = line_chart(_long_prices(), value_col="Volatility", y_title="Volatility", value_format=".1%")
+    encoding = chart.to_dict()["layer"][0]["encoding"]
+    assert encoding["y"]["field"] == "Volatility"
+    assert encoding["y"]["title"] == "Volatility"
+    assert encoding["color"]["sort"] == ["A", "B"]
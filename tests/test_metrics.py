@@ -1,6 +1,6 @@
 import pandas as pd
 import pytest
-from app_lib.metrics import asset_metrics, portfo_metrics
+from app_lib.metrics import asset_metrics, portfo_metrics, batch_portfo_metrics, risk_free_log_return
 from app_lib.data_transform import log_return
 import pytest
 import numpy as np
@@ -807,4 +807,82 @@ def test_profo_metrics_contribution_share_total():
         actual = contrib_share_sum, 
         desired = 1.0, 
         equal_nan = True
-    )
\ No newline at end of file
+    )
+
+'''
+Covariance estimator for the volatility
+    - The sample estimator gives the realised portfolio volatility
+    - A shrinkage estimator changes only the volatility-based values
+'''
+def test_portfo_metrics_estimator():
+    from app_lib.covariance import SampleCovariance, LedoitWolfCovariance
+
+    rng = np.random.default_rng(0)
+    prices = pd.DataFrame(
+        np.exp(np.cumsum(rng.normal(0, 0.01, size=(60, 3)), axis=0)),
+        columns=["A", "B", "C"],
+    )
+    prices.insert(0, "Date", pd.date_range("2024-01-01", periods=60))
+    log_return_df = log_return(prices, 'Date')
+
+    allocation_df = pd.DataFrame({
+        "Tickers": ["A", "B", "C"],
+        "Allocation Percentage": [50, 30, 20],
+    })
+
+    plain = portfo_metrics(log_return_df, allocation_df)
+    sample = portfo_metrics(log_return_df, allocation_df, estimator=SampleCovariance())
+    shrunk = portfo_metrics(log_return_df, allocation_df, estimator=LedoitWolfCovariance())
+
+    assert sample["StdDev (Volatility σ)"] == pytest.approx(plain["StdDev (Volatility σ)"])
+    assert shrunk["StdDev (Volatility σ)"] != pytest.approx(plain["StdDev (Volatility σ)"])
+    assert shrunk["Expected Return (μ)"] == plain["Expected Return (μ)"]
+
+
+'''
+Batched portfolio metrics
+    - Each row of the weight matrix matches portfo_metrics on that allocation
+    - Assets without data are dropped and the weights renormalised
+'''
+def test_batch_portfo_metrics_matches_portfo_metrics():
+    rng = np.random.default_rng(1)
+    prices = pd.DataFrame(
+        np.exp(np.cumsum(rng.normal(0, 0.01, size=(80, 4)), axis=0)),
+        columns=["A", "B", "C", "D"],
+    )
+    prices["D"] = np.nan
+    prices.insert(0, "Date", pd.date_range("2024-01-01", periods=80))
+    log_return_df = log_return(prices, 'Date')
+
+    weights = pd.DataFrame(
+        [[50, 30, 20, 0], [10, 10, 70, 10], [0, 100, 0, 0]],
+        columns=["A", "B", "C", "D"],
+        index=["p1", "p2", "p3"],
+    )
+
+    batch = batch_portfo_metrics(log_return_df, weights)
+
+    for name, row in weights.iterrows():
+        allocation_df = pd.DataFrame({
+            "Tickers": row.index, "Allocation Percentage": row.to_numpy()
+        })
+        single = portfo_metrics(log_return_df, allocation_df)
+
+        for key, value in single.items():
+            if isinstance(value, pd.Series):
+                assert_allclose(batch[key].loc[name].to_numpy(), value.to_numpy(), atol=1e-12)
+            else:
+                assert batch[key].loc[name] == pytest.approx(value, abs=1e-12)
+
+    # an array follows the asset columns of the return frame
+    from_array = batch_portfo_metrics(log_return_df, weights.to_numpy())
+    assert_allclose(from_array["Sharpe Ratio"].to_numpy(), batch["Sharpe Ratio"].to_numpy())
+
+    with pytest.raises(ValueError):
+        batch_portfo_metrics(log_return_df, weights.assign(A=0, B=0, C=0))
+
+
+def test_risk_free_log_return_compounds_to_the_annual_rate():
+    # a year of periods adds up to the annual rate, at any frequency
+    for periods in (252, 52, 12):
+        assert risk_free_log_return(0.045, periods) * periods == pytest.approx(np.log(1.045))
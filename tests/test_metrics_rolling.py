@@ -0,0 +1,70 @@
+from app_lib.metrics_rolling import rolling_asset_metrics, rolling_portfo_metrics, _window_max
+from app_lib.metrics import portfo_metrics
+import numpy as np
+import pandas as pd
+import pytest
+
+
+# C is listed late
+RETURNS = dict(n_rows=120, mean=0.0005, scale=0.01, columns=["A", "B", "C"], late={"C": 30})
+
+
+def test_window_max_matches_pandas():
+    x = np.random.default_rng(1).normal(size=(37, 3))
+    for window in (1, 2, 5, 37, 50):
+        expected = pd.DataFrame(x).rolling(window, min_periods=1).max().to_numpy()
+        np.testing.assert_array_equal(_window_max(x, window), expected)
+
+
+def test_rolling_asset_metrics_match_pandas_rolling(make_returns):
+    df = make_returns(**RETURNS)
+    df.loc[50, "B"] = np.nan  # one missing day
+    r = df.set_index("Date")
+
+    result = rolling_asset_metrics(df, window=20, benchmark="A", rf_annual_rate=0.03)
+
+    assert list(result.columns) == [
+        "Date", "Ticker", "Annualised Return (μ)", "StdDev (Volatility σ)",
+        "Sharpe Ratio", "Drawdown", "Beta",
+    ]
+    assert len(result) == 3 * len(df)
+    wide = {m: result.pivot(index="Date", columns="Ticker", values=m) for m in result.columns[2:]}
+
+    mean, sd = r.rolling(20).mean(), r.rolling(20).std()
+    rf_daily_log = np.log1p(1.03 ** (1 / 252) - 1)
+    pd.testing.assert_frame_equal(wide["Annualised Return (μ)"], mean * 252, check_names=False)
+    pd.testing.assert_frame_equal(wide["StdDev (Volatility σ)"], sd * np.sqrt(252), check_names=False)
+    pd.testing.assert_frame_equal(
+        wide["Sharpe Ratio"], (mean - rf_daily_log) / sd * np.sqrt(252), check_names=False
+    )
+
+    for t in ("B", "C"):
+        beta = r[t].rolling(20).cov(r["A"]) / r["A"].rolling(20).var()
+        np.testing.assert_allclose(wide["Beta"][t], beta, equal_nan=True)
+    np.testing.assert_allclose(wide["Beta"]["A"].dropna(), 1.0)
+
+    # drawdown from the peak value within the window (start of window included)
+    level = np.concatenate([[0.0], np.cumsum(r["B"].fillna(0).to_numpy())])
+    peak = pd.Series(level).rolling(21, min_periods=1).max().to_numpy()
+    expected = np.where(r["B"].rolling(20).count() >= 20, np.exp(level - peak)[1:] - 1, np.nan)
+    np.testing.assert_allclose(wide["Drawdown"]["B"], expected, equal_nan=True)
+
+
+def test_rolling_portfo_metrics_full_window_matches_portfo_metrics(make_returns):
+    df = make_returns(**RETURNS)
+    df.loc[50, "B"] = np.nan  # one missing day
+    allocation = pd.DataFrame({"Tickers": ["A", "B", "C"], "Allocation Percentage": [50, 30, 20]})
+    n_complete = len(df.dropna())
+
+    result = rolling_portfo_metrics(df, allocation, window=n_complete)
+    metrics = portfo_metrics(df, allocation)
+
+    last = result.iloc[-1]
+    assert (result["Ticker"] == "Portfolio").all()
+    assert last["Annualised Return (μ)"] == pytest.approx(metrics["Expected Return (μ)"])
+    assert last["StdDev (Volatility σ)"] == pytest.approx(metrics["StdDev (Volatility σ)"])
+    assert last["Sharpe Ratio"] == pytest.approx(metrics["Sharpe Ratio"])
+    assert result["Annualised Return (μ)"].notna().sum() == 1
+
+    with pytest.raises(ValueError):
+        rolling_portfo_metrics(df, allocation, window=1)
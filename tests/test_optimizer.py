@@ -0,0 +1,93 @@
+from app_lib.optimizer import PortfolioOptimizer
+from app_lib.metrics import portfo_metrics
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.optimize import minimize
+
+
+# two common factors, and a different mean return for each asset
+RETURNS = dict(n_rows=300, n_cols=12, mean=np.linspace(0.0, 0.001, 12), scale=0.01, factors=2, factor_scale=0.005)
+ALLOCATION = pd.DataFrame({"Tickers": [f"T{i}" for i in range(12)], "Allocation Percentage": 100 / 12})
+
+
+def _reference(objective, n, max_w, extra=()):
+    # general-purpose solver on the same problem
+    return minimize(
+        objective, np.full(n, 1 / n), method="SLSQP",
+        bounds=[(0, max_w)] * n,
+        constraints=[{"type": "eq", "fun": lambda w: w.sum() - 1}, *extra],
+        options={"maxiter": 1_000, "ftol": 1e-15},
+    ).x
+
+
+def test_min_variance_and_frontier_match_reference(make_returns):
+    returns = make_returns(**RETURNS)
+    opt = PortfolioOptimizer(returns, ALLOCATION, max_pct=20)
+    cov = opt.cov
+
+    w = opt.min_variance()["Allocation Percentage"].to_numpy() / 100
+    ref = _reference(lambda w: w @ cov @ w, 12, 0.2)
+
+    assert w.sum() == pytest.approx(1.0)
+    assert w.min() >= 0 and w.max() <= 0.2 + 1e-12
+    assert w @ cov @ w == pytest.approx(ref @ cov @ ref, rel=1e-8)
+
+    frontier = opt.efficient_frontier(n_points=10)
+    assert len(frontier) == 10
+    assert list(frontier.columns[3:]) == opt.tickers
+    assert np.all(np.diff(frontier["Expected Return (μ)"]) > 0)
+    assert np.all(np.diff(frontier["StdDev (Volatility σ)"]) >= -1e-12)
+
+    point = frontier.iloc[5]
+    target = point["Expected Return (μ)"]
+    ref = _reference(
+        lambda w: w @ cov @ w, 12, 0.2,
+        [{"type": "eq", "fun": lambda w: opt.mu @ w - target}],
+    )
+    assert point["StdDev (Volatility σ)"] == pytest.approx(np.sqrt(ref @ cov @ ref), rel=1e-6)
+
+
+def test_max_sharpe_matches_portfo_metrics_convention(make_returns):
+    returns = make_returns(**RETURNS)
+    opt = PortfolioOptimizer(returns, ALLOCATION, rf_annual_rate=0.03)
+
+    best = opt.max_sharpe()
+    metrics = portfo_metrics(returns, best, rf_annual_rate=0.03)
+
+    def sharpe(w):
+        return (opt.mu @ w - opt.rf) / np.sqrt(w @ opt.cov @ w)
+
+    ref = _reference(lambda w: -sharpe(w), 12, 1.0)
+    assert metrics["Sharpe Ratio"] == pytest.approx(sharpe(ref), rel=1e-6)
+    assert metrics["Sharpe Ratio"] >= opt.efficient_frontier(20)["Sharpe Ratio"].max() - 1e-9
+
+
+def test_risk_parity_equalises_risk_contributions(make_returns):
+    returns = make_returns(**RETURNS)
+    opt = PortfolioOptimizer(returns, ALLOCATION)
+
+    w = opt.risk_parity()["Allocation Percentage"].to_numpy() / 100
+    contrib = w * (opt.cov @ w)
+
+    assert w.sum() == pytest.approx(1.0)
+    np.testing.assert_allclose(contrib / contrib.sum(), 1 / 12, rtol=1e-6)
+
+    # bounds that the unconstrained solution breaks are still respected
+    capped = PortfolioOptimizer(returns, ALLOCATION, min_pct=8, max_pct=9).risk_parity()
+    assert capped["Allocation Percentage"].between(8 - 1e-6, 9 + 1e-6).all()
+
+    with pytest.raises(ValueError):
+        PortfolioOptimizer(returns, ALLOCATION, max_pct=5)  # 12 assets x 5% < 100%
+
+
+def test_stats_of_an_allocation_table(make_returns):
+    returns = make_returns(**RETURNS)
+    opt = PortfolioOptimizer(returns, ALLOCATION)
+
+    stats = opt.stats(ALLOCATION)
+    metrics = portfo_metrics(returns, ALLOCATION)
+
+    assert stats["Expected Return (μ)"] == pytest.approx(metrics["Expected Return (μ)"])
+    assert stats["StdDev (Volatility σ)"] == pytest.approx(metrics["StdDev (Volatility σ)"])
+    assert stats["Sharpe Ratio"] == pytest.approx(metrics["Sharpe Ratio"])
@@ -0,0 +1,59 @@
+from app_lib.pca import corr_pca, returns_pca, rolling_pca
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def _market_and_sector(n_cols):
+    # one strong market factor, one weaker sector factor on half the assets
+    return 0.01 * np.vstack([np.linspace(0.5, 1.5, n_cols), np.arange(n_cols) < n_cols // 2])
+
+
+def test_corr_pca_matches_full_eigendecomposition(make_returns):
+    df = make_returns(n_rows=300, n_cols=60, scale=0.01, factors=_market_and_sector(60))
+    corr = df.drop(columns="Date").corr()
+    values, vectors = np.linalg.eigh(corr.to_numpy())
+
+    result = corr_pca(corr, k=2)
+
+    np.testing.assert_allclose(result.eigenvalues, values[::-1][:2], rtol=1e-8)
+    np.testing.assert_allclose(
+        np.abs(result.loadings.to_numpy()), np.abs(vectors[:, ::-1][:, :2]), atol=1e-4
+    )
+    assert (result.loadings["PC1"] > 0).all()  # market factor points towards the assets
+    assert result.explained["PC1"] == pytest.approx(values[-1] / 60)
+    assert result.absorption_ratio() == pytest.approx(values[-2:].sum() / 60)
+    with pytest.raises(ValueError):
+        result.absorption_ratio(3)
+
+
+def test_returns_pca_matches_corr_pca(make_returns):
+    df = make_returns(n_rows=300, n_cols=60, scale=0.01, factors=_market_and_sector(60))
+    df.loc[5, "T3"] = np.nan  # incomplete row is dropped
+    df["Flat"] = 0.01          # no variance: left out
+
+    from_returns = returns_pca(df, k=3)
+    from_corr = corr_pca(df.drop(columns="Date").dropna().corr(), k=3)
+
+    assert list(from_returns.loadings.index) == [f"T{i}" for i in range(60)]
+    np.testing.assert_allclose(from_returns.eigenvalues, from_corr.eigenvalues, rtol=1e-8)
+    pd.testing.assert_frame_equal(from_returns.loadings, from_corr.loadings, atol=1e-6)
+    assert from_returns.top_loadings(n=5).index.isin(from_returns.loadings.index).all()
+
+
+def test_rolling_pca_matches_each_window(make_returns):
+    df = make_returns(n_rows=120, n_cols=20, scale=0.01, factors=_market_and_sector(20))
+    df.loc[:39, "T7"] = np.nan  # joins once it has a full window
+
+    result = rolling_pca(df, window=50, k=4)
+
+    assert len(result) == 71
+    for end in (50, 90, 120):
+        window = df.iloc[end - 50:end].drop(columns="Date").dropna(axis=1)
+        values = np.linalg.eigvalsh(window.corr().to_numpy())[::-1]
+        row = result.loc[df["Date"].iloc[end - 1]]
+        assert row["Market Factor Share"] == pytest.approx(values[0] / window.shape[1], rel=1e-6)
+        assert row["Absorption Ratio"] == pytest.approx(values[:4].sum() / window.shape[1], rel=1e-4)
+
+    with pytest.raises(ValueError):
+        rolling_pca(df, window=2)
@@ -0,0 +1,220 @@
+from app_lib.price_provider import (
+    LocalFileProvider,
+    PriceProvider,
+    YFinanceProvider,
+    PriceDownloadError,
+    combine_close_series,
+)
+from app_lib.stock_api import ticker_closed_price
+import pandas as pd
+import numpy as np
+import pytest
+
+
+DATES = pd.to_datetime(["2024-01-02", "2024-01-03", "2024-01-04", "2024-01-05"])
+
+
+def test_combine_close_series_order_and_report():
+    close_series = {
+        "B": pd.Series([1.0, 2.0], index=DATES[:2], name="B"),
+        "A": pd.Series([3.0, 4.0], index=DATES[1:3], name="A"),
+    }
+
+    df, report = combine_close_series(["A", "B", "C"], close_series, {"C": "bad"})
+
+    assert list(df.columns) == ["Date", "A", "B"]
+    assert df["Date"].tolist() == list(DATES[:3])
+    assert report == {"requested": ["A", "B", "C"], "valid": ["A", "B"], "failed": {"C": "bad"}}
+
+
+def test_combine_close_series_nothing_valid():
+    df, report = combine_close_series(["A"], {}, {"A": "bad"})
+
+    assert list(df.columns) == ["Date"]
+    assert report["valid"] == []
+
+
+def test_yfinance_provider(fake_download):
+    df, report = YFinanceProvider().fetch(["AAPL", "NOPE"], "2024-01-01", "2024-01-04")
+
+    assert list(df.columns) == ["Date", "AAPL"]
+    assert df["AAPL"].tolist() == [10.0, 11.0]
+    assert list(report["failed"]) == ["NOPE"]
+
+
+def test_yfinance_provider_gives_up(monkeypatch):
+    import app_lib.price_provider as price_provider
+
+    def download(*args, **kwargs):
+        raise RuntimeError("rate limited")
+
+    monkeypatch.setattr(price_provider.yf, "download", download)
+
+    with pytest.raises(PriceDownloadError, match="rate limited"):
+        YFinanceProvider(max_retries=2, retry_sleep_seconds=0).fetch(["AAPL"], "2024-01-01", "2024-01-04")
+
+
+def test_local_provider_wide_file(tmp_path):
+    path = tmp_path / "prices.csv"
+    pd.DataFrame({"Date": DATES, "AAPL": [1.0, 2.0, 3.0, 4.0], "MSFT": [5.0, 6.0, 7.0, 8.0]}).to_csv(path, index=False)
+
+    df, report = LocalFileProvider(path).fetch(["MSFT", "AAPL", "TSLA"], "2024-01-03", "2024-01-05")
+
+    expected = pd.DataFrame({"Date": DATES[1:3], "MSFT": [6.0, 7.0], "AAPL": [2.0, 3.0]})
+
+    pd.testing.assert_frame_equal(df, expected, check_index_type=False)
+    assert list(report["failed"]) == ["TSLA"]
+
+
+def test_local_provider_directory(tmp_path):
+    pd.DataFrame({"Date": DATES, "Close": [1.0, 2.0, 3.0, 4.0]}).to_csv(tmp_path / "AAPL.csv", index=False)
+    pd.DataFrame({"Date": DATES[1:], "Close": [6.0, np.nan, 8.0]}).to_parquet(tmp_path / "BARC.L.parquet")
+    pd.DataFrame({"Date": DATES, "Close": [np.nan] * 4}).to_csv(tmp_path / "EMPTY.csv", index=False)
+
+    df, report = LocalFileProvider(tmp_path).fetch(["AAPL", "BARC.L", "EMPTY", "NONE"], "2024-01-01", "2024-01-10")
+
+    expected = pd.DataFrame({
+        "Date": DATES,
+        "AAPL": [1.0, 2.0, 3.0, 4.0],
+        "BARC.L": [np.nan, 6.0, np.nan, 8.0],
+    })
+
+    pd.testing.assert_frame_equal(df, expected, check_index_type=False)
+    assert list(report["failed"]) == ["EMPTY", "NONE"]
+
+
+def test_local_provider_missing_path(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        LocalFileProvider(tmp_path / "nothing_here")
+
+
+def test_base_provider_is_abstract():
+    with pytest.raises(TypeError):
+        PriceProvider()
+
+
+def test_ticker_closed_price_with_local_provider(tmp_path):
+    path = tmp_path / "prices.csv"
+    pd.DataFrame({"Date": DATES, "AAPL": [1.0, 2.0, 3.0, 4.0], "MSFT": [5.0, 6.0, 7.0, 8.0]}).to_csv(path, index=False)
+
+    df, report = ticker_closed_price(["aapl", "msft"], "2024-01-01", "2024-01-10", provider=LocalFileProvider(path))
+
+    assert list(df.columns) == ["Date", "AAPL", "MSFT"]
+    assert report["valid"] == ["AAPL", "MSFT"]
+
+
+def test_chunked_fetch_matches_single_batch(fake_download):
+    single, single_report = YFinanceProvider().fetch(["AAPL", "MSFT", "NOPE"], "2024-01-01", "2024-01-10")
+
+    provider = YFinanceProvider(chunk_size=1, max_workers=3, retry_sleep_seconds=0)
+    chunked, chunked_report = provider.fetch(["AAPL", "MSFT", "NOPE"], "2024-01-01", "2024-01-10")
+
+    pd.testing.assert_frame_equal(chunked, single)
+    assert chunked_report == single_report
+
+
+def test_chunked_fetch_retries_only_failed_chunk(fake_download, monkeypatch):
+    import app_lib.price_provider as price_provider
+
+    served = price_provider.yf.download
+    attempts = {"MSFT": 0}
+
+    def flaky_download(tickers, start, end, **kwargs):
+        if "MSFT" in tickers:
+            attempts["MSFT"] += 1
+            if attempts["MSFT"] == 1:
+                raise RuntimeError("rate limited")
+        return served(tickers, start, end, **kwargs)
+
+    monkeypatch.setattr(price_provider.yf, "download", flaky_download)
+
+    provider = YFinanceProvider(chunk_size=1, retry_sleep_seconds=0)
+    df, report = provider.fetch(["AAPL", "MSFT"], "2024-01-01", "2024-01-10")
+
+    assert report["valid"] == ["AAPL", "MSFT"]
+    assert report["failed"] == {}
+    # AAPL once, MSFT once successfully (the failed call never reached the fake)
+    assert sorted(t for call in fake_download for t in call[0]) == ["AAPL", "MSFT"]
+
+
+def test_chunked_fetch_retries_only_missing_tickers(fake_download):
+    provider = YFinanceProvider(chunk_size=10, max_retries=3, retry_sleep_seconds=0)
+    df, report = provider.fetch(["AAPL", "NOPE"], "2024-01-01", "2024-01-10")
+
+    assert [call[0] for call in fake_download] == [["AAPL", "NOPE"], ["NOPE"], ["NOPE"]]
+    assert list(report["failed"]) == ["NOPE"]
+    assert report["valid"] == ["AAPL"]
+
+
+def test_chunked_fetch_reports_failed_chunk(monkeypatch):
+    import app_lib.price_provider as price_provider
+
+    def download(*args, **kwargs):
+        raise RuntimeError("rate limited")
+
+    monkeypatch.setattr(price_provider.yf, "download", download)
+
+    provider = YFinanceProvider(chunk_size=1, max_retries=2, retry_sleep_seconds=0)
+    df, report = provider.fetch(["AAPL", "MSFT"], "2024-01-01", "2024-01-10")
+
+    assert report["valid"] == []
+    assert set(report["failed"]) == {"AAPL", "MSFT"}
+    assert "rate limited" in report["failed"]["AAPL"]
+
+
+def test_backoff_delay_is_bounded():
+    from app_lib.price_provider import backoff_delay
+
+    for attempt in range(1, 8):
+        delay = backoff_delay(attempt, base_seconds=1.0, max_seconds=10.0)
+        cap = min(10.0, 2 ** (attempt - 1))
+        assert cap / 2 <= delay <= cap
+
+
+def test_yfinance_provider_price_field_and_dtype(fake_download):
+    provider = YFinanceProvider(price_field="Open", dtype="float32")
+    df, report = provider.fetch(["AAPL", "MSFT"], "2024-01-01", "2024-01-04")
+
+    assert list(df.columns) == ["Date", "AAPL", "MSFT"]
+    assert (df[["AAPL", "MSFT"]].dtypes == np.float32).all()
+    assert df["AAPL"].tolist() == [10.0, 11.0]
+
+
+def test_yfinance_provider_missing_field(fake_download):
+    df, report = YFinanceProvider(price_field="Adj Close").fetch(["AAPL"], "2024-01-01", "2024-01-04")
+
+    assert report["valid"] == []
+    assert report["failed"]["AAPL"].startswith("Failed to extract close prices")
+
+
+def test_local_provider_projection_and_dtype(tmp_path):
+    pd.DataFrame({
+        "Date": DATES,
+        "Open": [0.5, 1.5, 2.5, 3.5],
+        "Close": [1.0, 2.0, 3.0, 4.0],
+        "Volume": [10, 20, 30, 40],
+    }).to_csv(tmp_path / "AAPL.csv", index=False)
+
+    provider = LocalFileProvider(tmp_path, price_field="Open", dtype="float32")
+    df, report = provider.fetch(["AAPL"], "2024-01-01", "2024-01-10")
+
+    assert list(df.columns) == ["Date", "AAPL"]
+    assert df["AAPL"].dtype == np.float32
+    assert df["AAPL"].tolist() == [0.5, 1.5, 2.5, 3.5]
+
+
+def test_store_keeps_fields_apart(fake_download, tmp_path):
+    from app_lib.price_store import PriceStore
+
+    store = PriceStore(tmp_path / "prices.sqlite")
+
+    ticker_closed_price(["AAPL", "MSFT"], "2024-01-01", "2024-01-10", store=store)
+    df, _ = ticker_closed_price(
+        ["AAPL", "MSFT"], "2024-01-01", "2024-01-10",
+        store=store, provider=YFinanceProvider(price_field="Open", dtype="float32"),
+    )
+
+    # the Open field was not held yet, so it was downloaded again
+    assert len(fake_download) == 2
+    assert store.coverage("AAPL", "Open") is not None
+    assert df["AAPL"].dtype == np.float32
@@ -0,0 +1,84 @@
+from app_lib.price_store import PriceStore
+from datetime import date
+import pandas as pd
+import numpy as np
+import pytest
+
+
+def test_missing_segments_empty_store(tmp_path):
+    store = PriceStore(tmp_path / "prices.sqlite")
+
+    result = store.missing_segments("AAPL", "2024-01-01", "2024-02-01")
+
+    assert result == [(date(2024, 1, 1), date(2024, 2, 1))]
+
+
+def test_write_and_read_round_trip(tmp_path):
+    store = PriceStore(tmp_path / "prices.sqlite")
+
+    dates = pd.to_datetime(["2024-01-02", "2024-01-03", "2024-01-04"])
+    store.write("AAPL", pd.Series([1.0, 2.0, 3.0], index=dates), "2024-01-01", "2024-01-05")
+    store.write("MSFT", pd.Series([5.0, np.nan, 7.0], index=dates), "2024-01-01", "2024-01-05")
+
+    result = store.read(["MSFT", "AAPL", "TSLA"], "2024-01-01", "2024-01-05")
+
+    expected = pd.DataFrame({
+        "Date": dates,
+        "MSFT": [5.0, np.nan, 7.0],
+        "AAPL": [1.0, 2.0, 3.0],
+        "TSLA": [np.nan, np.nan, np.nan],
+    })
+
+    pd.testing.assert_frame_equal(result, expected, check_index_type=False)
+
+
+def test_missing_segments_head_and_tail(tmp_path):
+    store = PriceStore(tmp_path / "prices.sqlite")
+
+    store.write("AAPL", pd.Series(dtype=float), "2024-02-01", "2024-03-01")
+
+    result = store.missing_segments("AAPL", "2024-01-01", "2024-04-01")
+
+    assert result == [
+        (date(2024, 1, 1), date(2024, 2, 1)),
+        (date(2024, 3, 1), date(2024, 4, 1)),
+    ]
+    assert store.missing_segments("AAPL", "2024-02-10", "2024-02-20") == []
+
+
+def test_segments_stay_contiguous(tmp_path):
+    store = PriceStore(tmp_path / "prices.sqlite")
+
+    store.write("AAPL", pd.Series(dtype=float), "2024-02-01", "2024-03-01")
+
+    # a request entirely before what we hold still reaches back to it
+    segments = store.missing_segments("AAPL", "2023-06-01", "2023-07-01")
+    assert segments == [(date(2023, 6, 1), date(2024, 2, 1))]
+
+    store.write("AAPL", pd.Series(dtype=float), *segments[0])
+    assert store.coverage("AAPL") == (date(2023, 6, 1), date(2024, 3, 1))
+
+    with pytest.raises(ValueError):
+        store.write("AAPL", pd.Series(dtype=float), "2025-01-01", "2025-02-01")
+
+
+def test_coverage_stops_at_today(tmp_path):
+    store = PriceStore(tmp_path / "prices.sqlite")
+
+    store.write("AAPL", pd.Series(dtype=float), "2024-01-01", "2999-01-01")
+
+    assert store.coverage("AAPL") == (date(2024, 1, 1), date.today())
+
+
+def test_purge(tmp_path):
+    store = PriceStore(tmp_path / "prices.sqlite")
+
+    dates = pd.to_datetime(["2024-01-02"])
+    store.write("AAPL", pd.Series([1.0], index=dates), "2024-01-01", "2024-01-05")
+    store.write("MSFT", pd.Series([2.0], index=dates), "2024-01-01", "2024-01-05")
+
+    store.purge("AAPL")
+
+    assert store.coverage("AAPL") is None
+    assert store.coverage("MSFT") is not None
+    assert store.read(["AAPL"], "2024-01-01", "2024-01-05")["AAPL"].isna().all()
@@ -0,0 +1,71 @@
+from app_lib.simulation import simulate_portfolio, _draw_returns, _simulate_chunk
+import numpy as np
+import pandas as pd
+import pytest
+
+
+RETURNS = dict(mean=0.0005, scale=0.01, columns=["A", "B", "C"])
+ALLOCATION = pd.DataFrame({"Tickers": ["A", "B", "C"], "Allocation Percentage": [50, 30, 20]})
+
+
+def test_simulate_chunk_matches_path_by_path():
+    source = np.random.default_rng(1).normal(0, 0.02, size=100)
+    steps = np.array([0, 5, 10])
+    seed = np.random.SeedSequence(7)
+
+    terminal, max_dd, paths = _simulate_chunk(("bootstrap", source, 50, 10, 1, seed, steps, 100.0))
+
+    draws = _draw_returns(np.random.default_rng(seed), "bootstrap", source, 50, 10, 1)
+    for i in range(50):
+        value = 100.0 * np.exp(np.concatenate([[0.0], np.cumsum(draws[:, i])]))
+        assert terminal[i] == pytest.approx(value[-1])
+        assert max_dd[i] == pytest.approx((value / np.maximum.accumulate(value) - 1).min())
+        np.testing.assert_allclose(paths[i], value[steps], rtol=1e-6)
+
+
+def test_block_bootstrap_keeps_consecutive_periods():
+    source = np.arange(100.0)
+
+    draws = _draw_returns(np.random.default_rng(0), "block_bootstrap", source, 20, 12, 5)
+
+    assert draws.shape == (12, 20)
+    # within a block the drawn periods follow each other
+    for block in (draws[0:5], draws[5:10], draws[10:12]):
+        assert (np.diff(block, axis=0) == 1).all()
+
+
+def test_simulate_portfolio_is_reproducible_across_workers(make_returns):
+    returns = make_returns(n_rows=250, **RETURNS)
+
+    serial = simulate_portfolio(returns, ALLOCATION, horizon=30, n_paths=1_000, seed=3, chunk_size=300)
+    pooled = simulate_portfolio(
+        returns, ALLOCATION, horizon=30, n_paths=1_000, seed=3, chunk_size=300, max_workers=2
+    )
+
+    assert len(serial.terminal) == 1_000
+    np.testing.assert_array_equal(serial.terminal, pooled.terminal)
+    np.testing.assert_array_equal(serial.max_drawdown, pooled.max_drawdown)
+
+    bands = serial.bands((5, 50, 95))
+    assert list(bands.columns) == [5, 50, 95]
+    assert bands.index[0] == 0 and bands.index[-1] == 30
+    assert (bands.iloc[0] == 1.0).all()
+    assert (bands[5] <= bands[95]).all()
+    assert 0 <= serial.prob_drawdown(0.05) <= serial.prob_drawdown(0.01) <= 1
+
+
+def test_normal_method_uses_portfolio_moments(make_returns):
+    returns = make_returns(n_rows=500, **RETURNS)
+    weights = np.array([0.5, 0.3, 0.2])
+    port = returns[["A", "B", "C"]].to_numpy() @ weights
+
+    result = simulate_portfolio(returns, ALLOCATION, horizon=1, n_paths=200_000, method="normal", seed=0)
+    log_terminal = np.log(result.terminal)
+
+    assert log_terminal.mean() == pytest.approx(port.mean(), abs=1e-4)
+    assert log_terminal.std() == pytest.approx(port.std(ddof=1), rel=1e-2)
+
+    with pytest.raises(ValueError):
+        simulate_portfolio(returns, ALLOCATION, method="garch")
+    with pytest.raises(ValueError):
+        simulate_portfolio(returns, ALLOCATION, method="block_bootstrap", block_size=1_000)
@@ -1,4 +1,7 @@
 from app_lib.stock_api import ticker_closed_price, PriceDownloadError
+from app_lib.price_store import PriceStore
+import app_lib.price_provider as price_provider
+import pandas as pd
 import pytest
 
 def test_invalid_date():
@@ -9,3 +12,236 @@ def test_not_enough_valid_tickers():
     # Only 1 ticker -> should fail because min_valid=2
     with pytest.raises(PriceDownloadError):
         ticker_closed_price(["AAPL"], "2024-01-01", "2024-02-01")
+
+
+# ---- offline tests: `fake_download` (conftest.py) replaces yf.download
+
+def test_ticker_closed_price_wide_and_report(fake_download):
+    df, report = ticker_closed_price(["aapl", "MSFT", "NOPE"], "2024-01-01", "2024-01-10")
+
+    assert list(df.columns) == ["Date", "AAPL", "MSFT"]
+    assert len(df) == 6
+    assert report["requested"] == ["AAPL", "MSFT", "NOPE"]
+    assert report["valid"] == ["AAPL", "MSFT"]
+    assert list(report["failed"]) == ["NOPE"]
+
+
+def test_store_only_fetches_missing_tail(fake_download, tmp_path):
+    store = PriceStore(tmp_path / "prices.sqlite")
+
+    first, _ = ticker_closed_price(["AAPL", "MSFT"], "2024-01-01", "2024-01-05", store=store)
+    second, report = ticker_closed_price(["AAPL", "MSFT"], "2024-01-01", "2024-01-10", store=store)
+
+    assert fake_download == [
+        (["AAPL", "MSFT"], "2024-01-01", "2024-01-05"),
+        (["AAPL", "MSFT"], "2024-01-05", "2024-01-10"),
+    ]
+
+    expected, _ = ticker_closed_price(["AAPL", "MSFT"], "2024-01-01", "2024-01-10")
+    pd.testing.assert_frame_equal(second, expected, check_dtype=False, check_index_type=False)
+    assert report["valid"] == ["AAPL", "MSFT"]
+
+
+def test_store_served_range_skips_download(fake_download, tmp_path):
+    store = PriceStore(tmp_path / "prices.sqlite")
+
+    ticker_closed_price(["AAPL", "MSFT"], "2024-01-01", "2024-01-10", store=store)
+    df, _ = ticker_closed_price(["AAPL", "MSFT"], "2024-01-03", "2024-01-06", store=store)
+
+    assert len(fake_download) == 1
+    assert df["Date"].dt.strftime("%Y-%m-%d").tolist() == ["2024-01-03", "2024-01-04", "2024-01-05"]
+
+
+def test_store_covers_tickers_without_data(fake_download, tmp_path):
+    store = PriceStore(tmp_path / "prices.sqlite")
+
+    ticker_closed_price(["AAPL", "MSFT", "NOPE"], "2024-01-01", "2024-01-10", store=store)
+    _, report = ticker_closed_price(["AAPL", "MSFT", "NOPE"], "2024-01-01", "2024-01-10", store=store)
+
+    assert store.coverage("NOPE") is not None
+    assert len(fake_download) == 1
+    assert list(report["failed"]) == ["NOPE"]
+
+
+def test_store_records_empty_head_and_tail(fake_download, tmp_path):
+    store = PriceStore(tmp_path / "prices.sqlite")
+
+    # the head ends before the first price, the tail is a weekend
+    ticker_closed_price(["AAPL", "MSFT"], "2024-01-02", "2024-01-06", store=store)
+    ticker_closed_price(["AAPL", "MSFT"], "2023-12-25", "2024-01-08", store=store)
+    ticker_closed_price(["AAPL", "MSFT"], "2023-12-25", "2024-01-08", store=store)
+
+    assert fake_download == [
+        (["AAPL", "MSFT"], "2024-01-02", "2024-01-06"),
+        (["AAPL", "MSFT"], "2023-12-25", "2024-01-02"),
+        (["AAPL", "MSFT"], "2024-01-06", "2024-01-08"),
+    ]
+
+
+def test_store_does_not_cover_failed_downloads(fake_download, tmp_path, monkeypatch):
+    store = PriceStore(tmp_path / "prices.sqlite")
+
+    def down(*args, **kwargs):
+        raise ConnectionError("rate limited")
+
+    monkeypatch.setattr(price_provider.yf, "download", down)
+    monkeypatch.setattr(price_provider.time, "sleep", lambda seconds: None)
+    with pytest.raises(PriceDownloadError):
+        ticker_closed_price(["AAPL", "MSFT"], "2024-01-01", "2024-01-10", store=store)
+
+    assert store.coverage("AAPL") is None
+
+
+def test_negative_cache_skips_known_bad_tickers(fake_download):
+    from app_lib.stock_api import NegativeTickerCache
+
+    cache = NegativeTickerCache(ttl_seconds=60)
+
+    ticker_closed_price(["AAPL", "MSFT", "NOPE"], "2024-01-01", "2024-01-10", negative_cache=cache)
+    df, report = ticker_closed_price(["AAPL", "MSFT", "NOPE"], "2024-01-02", "2024-01-09", negative_cache=cache)
+
+    assert fake_download[-1][0] == ["AAPL", "MSFT"]
+    assert report["requested"] == ["AAPL", "MSFT", "NOPE"]
+    assert list(report["failed"]) == ["NOPE"]
+    assert report["failed"]["NOPE"].endswith("(cached)")
+
+
+def test_negative_cache_wider_range_is_fetched(fake_download):
+    from app_lib.stock_api import NegativeTickerCache
+
+    cache = NegativeTickerCache(ttl_seconds=60)
+    cache.add("NOPE", "No data", "2024-01-03", "2024-01-05")
+
+    ticker_closed_price(["AAPL", "MSFT", "NOPE"], "2024-01-01", "2024-01-10", negative_cache=cache)
+
+    assert fake_download[-1][0] == ["AAPL", "MSFT", "NOPE"]
+
+
+def test_negative_cache_ttl_and_purge():
+    from app_lib.stock_api import NegativeTickerCache
+
+    now = [0.0]
+    cache = NegativeTickerCache(ttl_seconds=10, clock=lambda: now[0])
+
+    cache.add("NOPE", "No data", "2024-01-01", "2024-02-01")
+    cache.add("TYPO", "No data", "2024-01-01", "2024-02-01")
+    cache.add("TYPO", "Bad format", "2024-01-01", "2024-02-01")
+
+    assert cache.lookup("NOPE", "2024-01-05", "2024-01-10") == "No data"
+    assert cache.entries()["Ticker"].tolist() == ["NOPE", "TYPO", "TYPO"]
+
+    assert cache.purge(ticker="TYPO", reason="Bad format") == 1
+    assert cache.purge(ticker="TYPO") == 1
+
+    now[0] = 11.0
+    assert cache.lookup("NOPE", "2024-01-05", "2024-01-10") is None
+    assert cache.entries().empty
+
+
+def test_negative_cache_ignores_download_failures():
+    from app_lib.stock_api import NegativeTickerCache
+
+    cache = NegativeTickerCache()
+    cache.add("AAPL", "Price download failed: rate limited", "2024-01-01", "2024-02-01")
+
+    assert cache.lookup("AAPL", "2024-01-01", "2024-02-01") is None
+
+
+def test_async_matches_sync(fake_download):
+    import asyncio
+    from app_lib.stock_api import async_ticker_closed_price
+
+    expected = ticker_closed_price(["AAPL", "MSFT", "NOPE"], "2024-01-01", "2024-01-10")
+    result = asyncio.run(
+        async_ticker_closed_price(["AAPL", "MSFT", "NOPE"], "2024-01-01", "2024-01-10", retry_sleep_seconds=0)
+    )
+
+    pd.testing.assert_frame_equal(result[0], expected[0])
+    assert result[1] == expected[1]
+    # one call per ticker; NOPE is a ticker-level failure so it is not retried
+    assert sorted(call[0][0] for call in fake_download[1:]) == ["AAPL", "MSFT", "NOPE"]
+
+
+def test_async_timeout_and_retry():
+    import asyncio
+    import threading
+    from app_lib.stock_api import async_ticker_closed_price
+    from app_lib.price_provider import PriceProvider, combine_close_series
+
+    dates = pd.to_datetime(["2024-01-02", "2024-01-03"])
+    calls = []
+
+    class SlowProvider(PriceProvider):
+        def fetch(self, tickers, start_date, end_date):
+            t = tickers[0]
+            calls.append(t)
+            if t == "SLOW":
+                threading.Event().wait(0.5)
+            if t == "FLAKY" and calls.count("FLAKY") == 1:
+                raise PriceDownloadError("Price download failed: rate limited")
+            s = pd.Series([1.0, 2.0], index=dates, name=t)
+            return combine_close_series(tickers, {t: s}, {})
+
+    df, report = asyncio.run(async_ticker_closed_price(
+        ["A", "FLAKY", "SLOW"], "2024-01-01", "2024-01-05",
+        max_retries=2, retry_sleep_seconds=0, timeout_seconds=0.1, provider=SlowProvider(),
+    ))
+
+    assert report["valid"] == ["A", "FLAKY"]
+    assert "timed out" in report["failed"]["SLOW"]
+    assert calls.count("FLAKY") == 2
+    assert calls.count("SLOW") == 2
+
+
+def test_async_timeouts_keep_the_concurrency_limit():
+    import asyncio
+    import threading
+    from app_lib.stock_api import async_ticker_closed_price
+    from app_lib.price_provider import PriceProvider
+
+    lock = threading.Lock()
+    running = []
+    peak = []
+
+    class SlowProvider(PriceProvider):
+        def fetch(self, tickers, start_date, end_date):
+            with lock:
+                running.append(tickers[0])
+                peak.append(len(running))
+            threading.Event().wait(0.1)
+            with lock:
+                running.remove(tickers[0])
+            raise PriceDownloadError("Price download failed: too slow")
+
+    with pytest.raises(PriceDownloadError):
+        asyncio.run(async_ticker_closed_price(
+            ["A", "B", "C"], "2024-01-01", "2024-01-05", max_retries=2, retry_sleep_seconds=0,
+            max_concurrency=2, timeout_seconds=0.01, provider=SlowProvider(),
+        ))
+
+    # timed-out threads still count until they end
+    assert len(peak) == 6
+    assert max(peak) == 2
+
+
+def test_async_can_be_cancelled():
+    import asyncio
+    import threading
+    from app_lib.stock_api import async_ticker_closed_price
+    from app_lib.price_provider import PriceProvider
+
+    class HangingProvider(PriceProvider):
+        def fetch(self, tickers, start_date, end_date):
+            threading.Event().wait(0.3)
+            raise PriceDownloadError("Price download failed: gave up")
+
+    async def run():
+        task = asyncio.create_task(async_ticker_closed_price(
+            ["A", "B"], "2024-01-01", "2024-01-05", timeout_seconds=None, provider=HangingProvider(),
+        ))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())